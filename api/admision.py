@@ -0,0 +1,211 @@
+"""
+Control de admisión y descarte de carga (load shedding) para /stress, /stress/batch y /cpu.
+
+Cada worker admite como máximo `limite` requests a la vez; los demás esperan
+en una cola acotada hasta `timeout_cola` segundos. Si la cola está llena o el
+timeout vence, se responde de inmediato 503 con Retry-After en vez de dejar
+que el request espere hasta el timeout del cliente.
+
+Modos del límite:
+- fijo:     el límite no cambia
+- aimd:     +1 por ventana si la latencia está bajo el objetivo, x0.9 si no
+            (una sola reducción por ventana: solo la dispara un request
+            admitido después de la reducción anterior)
+- gradient: límite * (latencia_minima / latencia_suavizada) + sqrt(límite),
+            con la latencia mínima de los últimos VENTANA_MIN_GRADIENTE segundos
+"""
+
+import asyncio
+import json
+import math
+import time
+from collections import deque
+
+MODOS_ADMISION = ('fijo', 'aimd', 'gradient')
+
+# Factor de reducción multiplicativa del modo AIMD
+FACTOR_AIMD = 0.9
+
+# Peso de la nueva muestra en la latencia suavizada del modo gradient
+ALFA_GRADIENTE = 0.1
+
+# Segundos tras los que se renueva la latencia mínima del modo gradient
+# (una muestra rápida aislada no debe fijar el gradiente para siempre)
+VENTANA_MIN_GRADIENTE = 30.0
+
+
+class Saturado(Exception):
+    """El controlador no pudo admitir el request (cola llena o timeout)"""
+
+
+class ControlAdmision:
+    """Límite de concurrencia con cola acotada y ajuste opcional del límite"""
+
+    def __init__(self, limite, max_cola, timeout_cola, modo='fijo',
+                 latencia_objetivo=1.0, limite_min=1, limite_max=1024):
+        if modo not in MODOS_ADMISION:
+            disponibles = ", ".join(MODOS_ADMISION)
+            raise ValueError(f"Modo de admisión desconocido '{modo}'. Disponibles: {disponibles}")
+
+        self.limite = float(limite)
+        self.max_cola = max_cola
+        self.timeout_cola = timeout_cola
+        self.modo = modo
+        self.latencia_objetivo = latencia_objetivo
+        self.limite_min = limite_min
+        self.limite_max = limite_max
+
+        self.en_curso = 0
+        self.cola = deque()
+        self.rechazados = 0
+
+        # Estado del modo aimd: instante de la última reducción
+        self.ultima_reduccion = 0.0
+
+        # Estado del modo gradient
+        self.latencia_min = None
+        self.latencia_suavizada = None
+        self._min_ventana = None
+        self._fin_ventana = time.perf_counter() + VENTANA_MIN_GRADIENTE
+
+    def _hay_cupo(self):
+        return self.en_curso < int(self.limite)
+
+    def _despertar(self):
+        """Entrega cupos libres a los requests que esperan en la cola"""
+        while self.cola and self._hay_cupo():
+            futuro = self.cola.popleft()
+            if not futuro.done():
+                self.en_curso += 1
+                futuro.set_result(None)
+
+    async def adquirir(self):
+        """
+        Espera un cupo. Lanza Saturado si la cola está llena o vence el timeout.
+
+        Retorna: segundos esperados en la cola
+        """
+        if self._hay_cupo() and not self.cola:
+            self.en_curso += 1
+            return 0.0
+
+        if len(self.cola) >= self.max_cola:
+            self.rechazados += 1
+            raise Saturado("cola de admisión llena")
+
+        futuro = asyncio.get_running_loop().create_future()
+        self.cola.append(futuro)
+        inicio = time.perf_counter()
+
+        try:
+            await asyncio.wait_for(futuro, self.timeout_cola)
+        except BaseException as e:
+            # Timeout o cancelación (cliente desconectado)
+            if futuro.done() and not futuro.cancelled():
+                # El cupo llegó justo al mismo tiempo: devolverlo
+                self.en_curso -= 1
+                self._despertar()
+            else:
+                futuro.cancel()
+            try:
+                self.cola.remove(futuro)
+            except ValueError:
+                pass
+
+            if isinstance(e, asyncio.TimeoutError):
+                self.rechazados += 1
+                raise Saturado("timeout en la cola de admisión") from None
+            raise
+
+        return time.perf_counter() - inicio
+
+    def liberar(self, latencia):
+        """Devuelve el cupo y ajusta el límite con la latencia de servicio observada"""
+        self.en_curso -= 1
+        self._ajustar(latencia)
+        self._despertar()
+
+    def _ajustar(self, latencia):
+        ahora = time.perf_counter()
+        if self.modo == 'aimd':
+            if latencia > self.latencia_objetivo:
+                # Los requests admitidos antes de la última reducción ya la
+                # causaron: con N lentos en vuelo, una reducción y no N
+                if ahora - latencia < self.ultima_reduccion:
+                    return
+                self.ultima_reduccion = ahora
+                nuevo = self.limite * FACTOR_AIMD
+            else:
+                # Suma ~1 por cada `limite` requests completados
+                nuevo = self.limite + 1 / self.limite
+        elif self.modo == 'gradient':
+            if self._min_ventana is None or latencia < self._min_ventana:
+                self._min_ventana = latencia
+            if self.latencia_min is None or latencia < self.latencia_min:
+                self.latencia_min = latencia
+            if ahora >= self._fin_ventana:
+                # Renovar el mínimo con el de la ventana que termina
+                self.latencia_min = self._min_ventana
+                self._min_ventana = None
+                self._fin_ventana = ahora + VENTANA_MIN_GRADIENTE
+            if self.latencia_suavizada is None:
+                self.latencia_suavizada = latencia
+            else:
+                self.latencia_suavizada += ALFA_GRADIENTE * (latencia - self.latencia_suavizada)
+
+            gradiente = self.latencia_min / self.latencia_suavizada if self.latencia_suavizada > 0 else 1.0
+            objetivo = self.limite * gradiente + math.sqrt(self.limite)
+            nuevo = 0.8 * self.limite + 0.2 * objetivo
+        else:
+            return
+
+        self.limite = min(self.limite_max, max(self.limite_min, nuevo))
+
+
+class MiddlewareAdmision:
+    """Middleware ASGI que aplica ControlAdmision a las rutas indicadas"""
+
+    def __init__(self, app, control, rutas=('/stress', '/stress/batch', '/cpu'), retry_after=1):
+        self.app = app
+        self.control = control
+        self.rutas = set(rutas)
+        self.retry_after = retry_after
+
+    async def _rechazar(self, send, motivo):
+        cuerpo = json.dumps({"detail": f"Servidor saturado: {motivo}"}).encode()
+        await send({
+            'type': 'http.response.start',
+            'status': 503,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(cuerpo)).encode()),
+                (b'retry-after', str(self.retry_after).encode()),
+                (b'x-admission-limit', str(int(self.control.limite)).encode()),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': cuerpo})
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope.get('path') not in self.rutas:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            espera = await self.control.adquirir()
+        except Saturado as e:
+            await self._rechazar(send, str(e))
+            return
+
+        async def send_con_headers(message):
+            if message['type'] == 'http.response.start':
+                headers = list(message.get('headers', []))
+                headers.append((b'x-admission-wait', f"{espera:.6f}".encode()))
+                headers.append((b'x-admission-limit', str(int(self.control.limite)).encode()))
+                message = {**message, 'headers': headers}
+            await send(message)
+
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_con_headers)
+        finally:
+            self.control.liberar(time.perf_counter() - inicio)
@@ -0,0 +1,194 @@
+"""
+Cache de resultados del segmento de CPU de /cpu y /stress.
+
+El cálculo es determinista para los mismos parámetros, así que el resultado
+se puede reutilizar. Dos capas:
+- CacheLRU:        por proceso, acotada en entradas, con TTL y desalojo LRU
+- CacheCompartida: tabla hash de tamaño fijo en un archivo mapeado en memoria
+                   (/dev/shm), compartida por todos los workers de Uvicorn
+
+Cada entrada guarda (resultado, elementos_en_memoria, memoria_bytes).
+"""
+
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+MODOS_CACHE = ('bypass', 'local', 'shared')
+
+# Slot de la cache compartida: clave, expira, resultado, elementos, memoria_bytes
+FORMATO_SLOT = struct.Struct('<Qddqq')
+# Cabecera compartida: hits, misses, desalojos
+FORMATO_CABECERA = struct.Struct('<QQQ')
+# Slots revisados por clave (tabla asociativa por conjuntos)
+VIAS = 4
+
+
+def clave_carga(kernel, iteraciones, coseno, muestreo):
+    """
+    Clave estable entre procesos (hash() de Python cambia en cada proceso).
+    No incluye el modo de ejecución: todos los modos dan el mismo resultado
+    (ver kernel_por_pasos), así que un resultado vale para cualquiera.
+    """
+    texto = f"{kernel}|{iteraciones}|{int(coseno)}|{muestreo}".encode()
+    clave = int.from_bytes(hashlib.blake2b(texto, digest_size=8).digest(), 'little')
+    # 0 marca un slot vacío
+    return clave or 1
+
+
+class CacheLRU:
+    """Cache en memoria del proceso con TTL y desalojo LRU"""
+
+    def __init__(self, max_entradas, ttl):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.entradas = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.desalojos = 0
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self.entradas.get(clave)
+            if entrada is not None:
+                valor, expira = entrada
+                if expira > time.monotonic():
+                    self.entradas.move_to_end(clave)
+                    self.hits += 1
+                    return valor
+                del self.entradas[clave]
+            self.misses += 1
+            return None
+
+    def guardar(self, clave, valor):
+        """Retorna cuántas entradas se desalojaron para hacerle lugar"""
+        desalojadas = 0
+        with self._lock:
+            self.entradas[clave] = (valor, time.monotonic() + self.ttl)
+            self.entradas.move_to_end(clave)
+            while len(self.entradas) > self.max_entradas:
+                self.entradas.popitem(last=False)
+                desalojadas += 1
+            self.desalojos += desalojadas
+        return desalojadas
+
+    def estadisticas(self):
+        return {'hits': self.hits, 'misses': self.misses, 'desalojos': self.desalojos}
+
+
+class CacheCompartida:
+    """
+    Tabla hash de tamaño fijo en un archivo mapeado en memoria.
+    Todas las operaciones se serializan entre procesos con flock, que puede
+    bloquear: desde código async llamarlas en un hilo (run_in_threadpool).
+    """
+
+    def __init__(self, ruta, slots, ttl):
+        self.ruta = ruta
+        self.slots = slots
+        self.ttl = ttl
+        self.archivo = None
+        self.mapa = None
+        # flock no excluye a hilos del mismo proceso (comparten el descriptor)
+        self._lock_hilos = threading.Lock()
+
+    def abrir(self):
+        """Crea o se adjunta al archivo compartido"""
+        if self.mapa is not None:
+            return
+
+        tamano = FORMATO_CABECERA.size + self.slots * FORMATO_SLOT.size
+        self.archivo = open(self.ruta, 'a+b')
+        with self._bloqueo():
+            if os.fstat(self.archivo.fileno()).st_size != tamano:
+                # Archivo nuevo (o de otra configuración): inicializar en ceros
+                self.archivo.truncate(0)
+                self.archivo.truncate(tamano)
+        self.mapa = mmap.mmap(self.archivo.fileno(), tamano)
+
+    def cerrar(self):
+        if self.mapa is not None:
+            self.mapa.close()
+            self.mapa = None
+        if self.archivo is not None:
+            self.archivo.close()
+            self.archivo = None
+
+    @contextmanager
+    def _bloqueo(self):
+        """Exclusión entre hilos (threading.Lock) y entre procesos (flock)"""
+        with self._lock_hilos:
+            fcntl.flock(self.archivo.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self.archivo.fileno(), fcntl.LOCK_UN)
+
+    def _offset(self, indice):
+        return FORMATO_CABECERA.size + (indice % self.slots) * FORMATO_SLOT.size
+
+    def _contar(self, campo):
+        """Incrementa un contador de la cabecera (llamar con el bloqueo tomado)"""
+        contadores = list(FORMATO_CABECERA.unpack_from(self.mapa, 0))
+        contadores[campo] += 1
+        FORMATO_CABECERA.pack_into(self.mapa, 0, *contadores)
+
+    def obtener(self, clave):
+        self.abrir()
+        ahora = time.time()
+        with self._bloqueo():
+            for via in range(VIAS):
+                offset = self._offset(clave + via)
+                slot_clave, expira, resultado, elementos, memoria = FORMATO_SLOT.unpack_from(self.mapa, offset)
+                if slot_clave == clave and expira > ahora:
+                    self._contar(0)
+                    return resultado, elementos, memoria
+            self._contar(1)
+            return None
+
+    def guardar(self, clave, valor):
+        """Retorna 1 si hubo que desalojar una entrada vigente, si no 0"""
+        self.abrir()
+        ahora = time.time()
+        resultado, elementos, memoria = valor
+        desalojadas = 0
+        with self._bloqueo():
+            # Reusar el slot de la misma clave o uno vacío/vencido;
+            # si no hay, desalojar el que vence primero
+            destino = None
+            expira_min = None
+            for via in range(VIAS):
+                offset = self._offset(clave + via)
+                slot_clave, expira, _, _, _ = FORMATO_SLOT.unpack_from(self.mapa, offset)
+                if slot_clave == clave or slot_clave == 0 or expira <= ahora:
+                    destino = offset
+                    break
+                if expira_min is None or expira < expira_min:
+                    destino, expira_min = offset, expira
+            else:
+                self._contar(2)
+                desalojadas = 1
+
+            FORMATO_SLOT.pack_into(self.mapa, destino, clave, ahora + self.ttl,
+                                   float(resultado), int(elementos), int(memoria))
+        return desalojadas
+
+    def estadisticas(self):
+        self.abrir()
+        with self._bloqueo():
+            hits, misses, desalojos = FORMATO_CABECERA.unpack_from(self.mapa, 0)
+        return {'hits': hits, 'misses': misses, 'desalojos': desalojos}
+
+
+def ruta_cache_compartida(nombre):
+    """Ruta del archivo compartido: /dev/shm si existe (RAM), si no el directorio temporal"""
+    directorio = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(directorio, nombre)
@@ -0,0 +1,131 @@
+"""
+Compresión de la respuesta de /stress negociada con Accept-Encoding.
+
+- gzip:    formato gzip (zlib con wbits=31)
+- deflate: formato zlib, que es lo que HTTP llama "deflate" (wbits=15)
+
+La compresión puede hacerse de una vez (cuerpo completo), en streaming por
+fragmentos, o servirse desde una cache de cuerpos ya comprimidos.
+"""
+
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+CODIFICACIONES = {
+    'gzip': 31,
+    'deflate': 15,
+}
+
+
+def negociar_codificacion(accept_encoding):
+    """
+    Elige gzip o deflate según Accept-Encoding (respetando q=0 y q-values).
+    Retorna 'identity' si el cliente no acepta ninguna.
+
+    Como pide RFC 9110, `*` solo da su q a las codificaciones que el header
+    no nombra: en "gzip;q=0, *" gzip sigue rechazada.
+    """
+    explicitas = {}
+    comodin = None
+
+    for parte in (accept_encoding or '').split(','):
+        nombre, *parametros = parte.split(';')
+        nombre = nombre.strip().lower()
+        if not nombre:
+            continue
+        q = 1.0
+        # Cada parámetro por separado: en "gzip;q=0.5;x=1" solo cuenta q=0.5
+        for parametro in parametros:
+            clave, _, valor = parametro.partition('=')
+            if clave.strip().lower() == 'q':
+                try:
+                    q = float(valor.strip())
+                except ValueError:
+                    q = 0.0
+
+        if nombre == '*':
+            comodin = q
+        else:
+            explicitas[nombre] = q
+
+    mejor, mejor_q = 'identity', 0.0
+    for candidato in CODIFICACIONES:
+        q = explicitas.get(candidato, comodin or 0.0)
+        # Ante empate se mantiene el primero (gzip antes que deflate)
+        if q > mejor_q:
+            mejor, mejor_q = candidato, q
+
+    return mejor
+
+
+def nuevo_compresor(codificacion, nivel):
+    return zlib.compressobj(nivel, zlib.DEFLATED, CODIFICACIONES[codificacion])
+
+
+def comprimir(datos, codificacion, nivel):
+    """Comprime el cuerpo completo. Retorna: (comprimido, segundos)"""
+    inicio = time.perf_counter_ns()
+    compresor = nuevo_compresor(codificacion, nivel)
+    comprimido = compresor.compress(datos) + compresor.flush()
+    return comprimido, (time.perf_counter_ns() - inicio) / 1e9
+
+
+async def stream_comprimido(fragmentos, codificacion, nivel, al_terminar=None):
+    """
+    Comprime los fragmentos a medida que se envían (sin tener el cuerpo completo).
+    Al terminar llama al_terminar(bytes_crudos, bytes_codificados, segundos).
+    """
+    compresor = nuevo_compresor(codificacion, nivel)
+    crudos = codificados = 0
+    tiempo_ns = 0
+
+    for fragmento in fragmentos:
+        inicio = time.perf_counter_ns()
+        salida = compresor.compress(fragmento)
+        tiempo_ns += time.perf_counter_ns() - inicio
+        crudos += len(fragmento)
+        if salida:
+            codificados += len(salida)
+            yield salida
+
+    inicio = time.perf_counter_ns()
+    salida = compresor.flush()
+    tiempo_ns += time.perf_counter_ns() - inicio
+    codificados += len(salida)
+    yield salida
+
+    if al_terminar is not None:
+        al_terminar(crudos, codificados, tiempo_ns / 1e9)
+
+
+class CachePrecomprimida:
+    """Cuerpos ya comprimidos por (contenido, tamaño, codificación, nivel), con LRU por bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entradas = OrderedDict()
+        self.bytes_usados = 0
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        """Retorna (comprimido, segundos_de_compresion) o None"""
+        with self._lock:
+            entrada = self.entradas.get(clave)
+            if entrada is not None:
+                self.entradas.move_to_end(clave)
+            return entrada
+
+    def guardar(self, clave, comprimido, segundos):
+        if len(comprimido) > self.max_bytes:
+            return
+        with self._lock:
+            anterior = self.entradas.pop(clave, None)
+            if anterior is not None:
+                self.bytes_usados -= len(anterior[0])
+            self.entradas[clave] = (comprimido, segundos)
+            self.bytes_usados += len(comprimido)
+            while self.bytes_usados > self.max_bytes:
+                _, (viejo, _) = self.entradas.popitem(last=False)
+                self.bytes_usados -= len(viejo)
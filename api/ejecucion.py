@@ -0,0 +1,161 @@
+"""
+Modos de ejecución del segmento de CPU de /cpu y /stress.
+
+- thread:      el kernel corre en el threadpool de anyio (comportamiento original,
+               todos los requests compiten por el GIL del worker)
+- process:     el kernel se envía a un ProcessPoolExecutor compartido, de modo que
+               un solo proceso de Uvicorn puede usar todos los núcleos
+- blocking:    el kernel corre directamente en el event loop (lo bloquea)
+- cooperative: el kernel corre en el event loop en tramos de `tramo_ms`,
+               cediendo el control al loop entre tramos
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from starlette.concurrency import run_in_threadpool
+
+from kernels import ejecutar_kernel, kernel_por_pasos
+
+MODOS = ('thread', 'process', 'blocking', 'cooperative')
+
+# Iteraciones por paso del modo cooperativo (se revisa el reloj entre pasos)
+PASO_COOPERATIVO = 2000
+
+
+class PoolProcesos:
+    """ProcessPoolExecutor compartido por todos los requests de un worker"""
+
+    def __init__(self, tamano=0):
+        # tamano = 0 usa un proceso por núcleo
+        self.tamano = tamano or os.cpu_count() or 1
+        self.executor = None
+        # Tareas enviadas que aún no terminan (corriendo + en cola)
+        self.en_curso = 0
+
+    def iniciar(self):
+        """Crea el pool si todavía no existe"""
+        if self.executor is None:
+            # spawn evita hacer fork de un proceso con hilos del event loop
+            contexto = multiprocessing.get_context('spawn')
+            self.executor = ProcessPoolExecutor(max_workers=self.tamano, mp_context=contexto)
+
+    def cerrar(self):
+        """Detiene el pool sin esperar tareas pendientes"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def ejecutar_kernel(self, nombre, iteraciones, coseno=False, muestreo=0):
+        """
+        Ejecuta un kernel en el pool.
+
+        Retorna: (resultado, muestras, duracion_seg, info) donde info tiene
+        'cola' (tareas esperando proceso libre al encolar, incluida esta),
+        'tarea' (tiempo dentro del proceso) y 'espera' (cola + serialización).
+        """
+        self.iniciar()
+
+        self.en_curso += 1
+        cola = max(0, self.en_curso - self.tamano)
+        inicio = time.perf_counter_ns()
+
+        try:
+            loop = asyncio.get_running_loop()
+            resultado, muestras, duracion = await loop.run_in_executor(
+                self.executor, ejecutar_kernel, nombre, iteraciones, coseno, muestreo
+            )
+        finally:
+            self.en_curso -= 1
+
+        total = (time.perf_counter_ns() - inicio) / 1e9
+        info = {
+            'cola': cola,
+            'tarea': duracion,
+            'espera': max(0.0, total - duracion),
+        }
+        return resultado, muestras, duracion, info
+
+
+async def ejecutar_cooperativo(nombre, iteraciones, coseno=False, muestreo=0, tramo_ms=5.0):
+    """
+    Ejecuta el kernel en el event loop, cediendo el control cada `tramo_ms`.
+
+    Retorna: (resultado, muestras, duracion_seg, cesiones) donde duracion_seg
+    es solo el tiempo de cálculo (sin contar lo que otros usaron el loop).
+    """
+    pasos = kernel_por_pasos(nombre, iteraciones, coseno, muestreo, PASO_COOPERATIVO)
+    limite_ns = int(tramo_ms * 1e6)
+    duracion_ns = 0
+    cesiones = 0
+
+    inicio_tramo = time.perf_counter_ns()
+    while True:
+        try:
+            next(pasos)
+        except StopIteration as fin:
+            resultado, muestras = fin.value
+            break
+
+        transcurrido = time.perf_counter_ns() - inicio_tramo
+        if transcurrido >= limite_ns:
+            duracion_ns += transcurrido
+            cesiones += 1
+            await asyncio.sleep(0)
+            inicio_tramo = time.perf_counter_ns()
+
+    duracion_ns += time.perf_counter_ns() - inicio_tramo
+    return resultado, muestras, duracion_ns / 1e9, cesiones
+
+
+async def ejecutar_cpu(pool, modo, nombre, iteraciones, coseno=False, muestreo=0, tramo_ms=5.0):
+    """
+    Ejecuta el segmento de CPU según el modo.
+
+    Retorna: (resultado, muestras, duracion_seg, espera_seg, headers) donde
+    espera_seg es el tiempo en cola del threadpool o del pool de procesos (o
+    cedido a otras tareas del loop en el modo cooperativo) y
+    headers son las métricas del modo de ejecución.
+    """
+    if modo not in MODOS:
+        disponibles = ", ".join(MODOS)
+        raise ValueError(f"Modo de ejecución desconocido '{modo}'. Disponibles: {disponibles}")
+
+    headers = {"X-Exec-Mode": modo}
+
+    if modo == 'process':
+        resultado, muestras, duracion, info = await pool.ejecutar_kernel(
+            nombre, iteraciones, coseno, muestreo
+        )
+        espera = info['espera']
+        headers.update({
+            "X-Pool-Size": str(pool.tamano),
+            "X-Pool-Queue-Depth": str(info['cola']),
+            "X-Pool-Task-Time": str(round(info['tarea'], 6)),
+            "X-Pool-Wait-Time": str(round(info['espera'], 6)),
+        })
+    elif modo == 'blocking':
+        resultado, muestras, duracion = ejecutar_kernel(nombre, iteraciones, coseno, muestreo)
+        espera = 0.0
+    elif modo == 'cooperative':
+        inicio = time.perf_counter_ns()
+        resultado, muestras, duracion, cesiones = await ejecutar_cooperativo(
+            nombre, iteraciones, coseno, muestreo, tramo_ms
+        )
+        # Tiempo que el request pasó cedido a otras tareas del loop
+        espera = max(0.0, (time.perf_counter_ns() - inicio) / 1e9 - duracion)
+        headers.update({
+            "X-Coop-Slice-Ms": str(tramo_ms),
+            "X-Coop-Yields": str(cesiones),
+        })
+    else:
+        inicio = time.perf_counter_ns()
+        resultado, muestras, duracion = await run_in_threadpool(
+            ejecutar_kernel, nombre, iteraciones, coseno, muestreo
+        )
+        espera = max(0.0, (time.perf_counter_ns() - inicio) / 1e9 - duracion)
+
+    return resultado, muestras, duracion, espera, headers
@@ -0,0 +1,98 @@
+"""
+Flujo sostenido de datos para medir ancho de banda (/stream y /stream/ws).
+
+Envía fragmentos del pool de payload durante `duracion` segundos, a toda
+velocidad o limitado a una tasa en bytes/s. La contrapresión la aplica el
+servidor: cada envío espera (await) a que el transporte drene su buffer,
+así un cliente o un Nginx lento frenan el flujo en vez de acumular memoria.
+"""
+
+import asyncio
+import time
+from collections import deque
+
+
+class EstadisticasFlujo:
+    """Bytes enviados y tasa lograda de una conexión"""
+
+    def __init__(self, tasa_objetivo):
+        self.tasa_objetivo = tasa_objetivo
+        self.inicio = time.perf_counter()
+        self.fin = None
+        self.bytes = 0
+        self.fragmentos = 0
+        # Tiempo total que el flujo estuvo frenado esperando el ritmo objetivo
+        self.espera_ritmo = 0.0
+
+    @property
+    def segundos(self):
+        return (self.fin or time.perf_counter()) - self.inicio
+
+    def resumen(self):
+        segundos = self.segundos
+        tasa = self.bytes / segundos if segundos > 0 else 0.0
+        return {
+            "bytes": self.bytes,
+            "fragmentos": self.fragmentos,
+            "segundos": round(segundos, 6),
+            "bytes_por_seg": round(tasa, 1),
+            "mbps": round(tasa * 8 / 1e6, 3),
+            "tasa_objetivo_bytes_por_seg": self.tasa_objetivo,
+            "espera_ritmo_seg": round(self.espera_ritmo, 6),
+        }
+
+
+async def flujo_sostenido(pool, duracion, tasa=0, fragmento=64 * 1024, estadisticas=None,
+                          al_terminar=None):
+    """
+    Genera vistas del pool durante `duracion` segundos.
+
+    - tasa: bytes/s objetivo (0 = a toda velocidad)
+    - fragmento: bytes de cada vista (como máximo el tamaño del pool)
+    - al_terminar(estadisticas): se llama al cerrar el flujo (también si el
+      cliente se desconecta antes)
+    """
+    estadisticas = estadisticas or EstadisticasFlujo(tasa)
+    limite = estadisticas.inicio + duracion
+
+    try:
+        while True:
+            ahora = time.perf_counter()
+            if ahora >= limite:
+                break
+
+            if tasa:
+                # Ritmo constante: el byte N debe salir en inicio + N / tasa
+                objetivo = estadisticas.inicio + estadisticas.bytes / tasa
+                if objetivo > ahora:
+                    espera = min(objetivo, limite) - ahora
+                    estadisticas.espera_ritmo += espera
+                    await asyncio.sleep(espera)
+                    continue
+            else:
+                # A toda velocidad el transporte casi nunca bloquea:
+                # ceder el loop para no acaparar el worker
+                await asyncio.sleep(0)
+
+            # Exactamente `fragmento` bytes por envío (un mensaje por fragmento en WebSocket)
+            vista = pool.fragmento(fragmento)
+            estadisticas.bytes += len(vista)
+            estadisticas.fragmentos += 1
+            yield vista
+    finally:
+        estadisticas.fin = time.perf_counter()
+        if al_terminar is not None:
+            al_terminar(estadisticas)
+
+
+class RegistroFlujos:
+    """Últimas conexiones terminadas de este worker (para /stream/stats)"""
+
+    def __init__(self, max_entradas=100):
+        self.entradas = deque(maxlen=max_entradas)
+
+    def agregar(self, tipo, estadisticas):
+        self.entradas.append({"tipo": tipo, **estadisticas.resumen()})
+
+    def recientes(self):
+        return list(self.entradas)
@@ -0,0 +1,237 @@
+"""
+Motores (kernels) de carga de CPU para los endpoints /cpu y /stress.
+
+Cada kernel recibe el mismo número de iteraciones y hace trabajo equivalente
+con una estrategia distinta:
+- python:  bucle puro de Python (el comportamiento original, retiene el GIL)
+- numpy:   la misma matemática vectorizada en lotes de arrays
+- hashlib: SHA-256 sobre un buffer (libera el GIL en bloques grandes)
+- zlib:    compresión de un buffer (libera el GIL mientras comprime)
+"""
+
+import hashlib
+import math
+import time
+import zlib
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy es opcional: sin él, el kernel "numpy" no está disponible
+    np = None
+
+# Tamaño de cada lote para el kernel vectorizado
+TAM_LOTE_NUMPY = 65536
+
+# Para hashlib/zlib cada iteración equivale a 8 bytes procesados (un float64)
+BYTES_POR_ITERACION = 8
+
+# Buffer pseudoaleatorio para los kernels que trabajan sobre bytes. Derivado
+# de una semilla fija (SHAKE-256), no de os.urandom: cada worker genera el mismo
+# buffer y un resultado de la cache compartida vale para todos
+SEMILLA_BUFFER = b'proyecto-redes-kernel'
+BUFFER_KERNEL = hashlib.shake_256(SEMILLA_BUFFER).digest(1024 * 1024)
+
+# Nivel de compresión del kernel zlib
+NIVEL_ZLIB = 6
+
+
+def kernel_python(iteraciones, coseno=False, muestreo=0, inicio=0, acumulado=0):
+    """
+    Bucle puro de Python: sqrt(i) * sin(i) [* cos(i)] para i en [inicio, iteraciones).
+    Si muestreo > 0, retiene 1 de cada `muestreo` valores en una lista.
+    `acumulado` es la suma de los pasos anteriores (modo cooperativo), para
+    sumar en el mismo orden que una ejecución de una vez.
+    """
+    resultado = acumulado
+    muestras = []
+
+    for i in range(inicio, iteraciones):
+        valor = math.sqrt(i) * math.sin(i)
+        if coseno:
+            valor *= math.cos(i)
+        resultado += valor
+
+        if muestreo and i % muestreo == 0:
+            muestras.append(valor)
+
+    return resultado, muestras
+
+
+def kernel_numpy(iteraciones, coseno=False, muestreo=0, inicio=0, acumulado=0.0):
+    """
+    Misma matemática que kernel_python, vectorizada en lotes de TAM_LOTE_NUMPY.
+    Las muestras retenidas se devuelven como un único array float64.
+    """
+    if np is None:
+        raise ValueError("El kernel 'numpy' requiere tener NumPy instalado")
+
+    resultado = acumulado
+    muestras = []
+
+    for lote in range(inicio, iteraciones, TAM_LOTE_NUMPY):
+        fin = min(lote + TAM_LOTE_NUMPY, iteraciones)
+        i = np.arange(lote, fin, dtype=np.float64)
+
+        valores = np.sin(i)
+        valores *= np.sqrt(i)
+        if coseno:
+            valores *= np.cos(i)
+        resultado += float(valores.sum())
+
+        if muestreo:
+            # Primer índice del lote que es múltiplo de `muestreo`
+            desde = (-lote) % muestreo
+            muestras.append(valores[desde::muestreo].copy())
+
+    if muestras:
+        muestras = np.concatenate(muestras)
+    else:
+        muestras = np.empty(0, dtype=np.float64)
+
+    return resultado, muestras
+
+
+def _recorrer_buffer(total_bytes, desde=0):
+    """
+    Genera vistas del buffer compartido hasta cubrir total_bytes, empezando en
+    la posición `desde` del flujo (el buffer se repite cíclicamente)
+    """
+    vista = memoryview(BUFFER_KERNEL)
+    posicion = desde % len(vista)
+    restante = total_bytes
+    while restante > 0:
+        n = min(restante, len(vista) - posicion)
+        yield vista[posicion:posicion + n]
+        restante -= n
+        posicion = 0
+
+
+class _EstadoHash:
+    """SHA-256 incremental: el resultado son los primeros 6 bytes del digest"""
+
+    def __init__(self):
+        self.h = hashlib.sha256()
+
+    def procesar(self, bloque):
+        self.h.update(bloque)
+
+    def resultado(self):
+        return float(int.from_bytes(self.h.digest()[:6], 'big'))
+
+
+class _EstadoZlib:
+    """Compresor incremental: el resultado es el tamaño comprimido total"""
+
+    def __init__(self):
+        self.compresor = zlib.compressobj(NIVEL_ZLIB)
+        self.comprimidos = 0
+
+    def procesar(self, bloque):
+        self.comprimidos += len(self.compresor.compress(bloque))
+
+    def resultado(self):
+        return float(self.comprimidos + len(self.compresor.flush()))
+
+
+def _procesar_iteraciones(estado, inicio, fin):
+    """Pasa al estado los bytes de las iteraciones [inicio, fin)"""
+    total = (fin - inicio) * BYTES_POR_ITERACION
+    for bloque in _recorrer_buffer(total, inicio * BYTES_POR_ITERACION):
+        estado.procesar(bloque)
+
+
+def kernel_hashlib(iteraciones, coseno=False, muestreo=0, inicio=0):
+    """SHA-256 sobre (iteraciones - inicio) * BYTES_POR_ITERACION bytes"""
+    estado = _EstadoHash()
+    _procesar_iteraciones(estado, inicio, iteraciones)
+    return estado.resultado(), []
+
+
+def kernel_zlib(iteraciones, coseno=False, muestreo=0, inicio=0):
+    """Comprime (iteraciones - inicio) * BYTES_POR_ITERACION bytes, devuelve el tamaño comprimido"""
+    estado = _EstadoZlib()
+    _procesar_iteraciones(estado, inicio, iteraciones)
+    return estado.resultado(), []
+
+
+# Kernels de bytes: en el modo cooperativo se mantiene un solo estado entre pasos
+ESTADOS_BYTES = {
+    'hashlib': _EstadoHash,
+    'zlib': _EstadoZlib,
+}
+
+
+KERNELS = {
+    'python': kernel_python,
+    'numpy': kernel_numpy,
+    'hashlib': kernel_hashlib,
+    'zlib': kernel_zlib,
+}
+
+
+def obtener_kernel(nombre):
+    """Devuelve la función del kernel o lanza ValueError si no existe"""
+    if nombre not in KERNELS:
+        disponibles = ", ".join(KERNELS)
+        raise ValueError(f"Kernel desconocido '{nombre}'. Disponibles: {disponibles}")
+    if nombre == 'numpy' and np is None:
+        raise ValueError("El kernel 'numpy' requiere tener NumPy instalado")
+    return KERNELS[nombre]
+
+
+def ejecutar_kernel(nombre, iteraciones, coseno=False, muestreo=0):
+    """
+    Ejecuta el kernel indicado y mide su tiempo.
+
+    Retorna: (resultado, muestras, duracion_seg)
+    """
+    kernel = obtener_kernel(nombre)
+
+    inicio = time.perf_counter_ns()
+    resultado, muestras = kernel(iteraciones, coseno, muestreo)
+    duracion = (time.perf_counter_ns() - inicio) / 1e9
+
+    return resultado, muestras, duracion
+
+
+def kernel_por_pasos(nombre, iteraciones, coseno=False, muestreo=0, paso=2000):
+    """
+    Generador que ejecuta el kernel en pasos de `paso` iteraciones, para que
+    quien lo consume pueda ceder el control entre pasos (modo cooperativo).
+
+    Cada `next()` ejecuta un paso; el valor de retorno del generador
+    (StopIteration.value) es (resultado, muestras), el mismo que da el kernel
+    de una vez: hashlib/zlib usan un solo hash/compresor para todos los pasos
+    y python/numpy arrastran la suma parcial. Por eso la cache de resultados
+    no necesita el modo de ejecución en su clave.
+    """
+    kernel = obtener_kernel(nombre)
+
+    if nombre in ESTADOS_BYTES:
+        estado = ESTADOS_BYTES[nombre]()
+        for inicio in range(0, iteraciones, paso):
+            _procesar_iteraciones(estado, inicio, min(inicio + paso, iteraciones))
+            yield
+        return estado.resultado(), []
+
+    if nombre == 'numpy':
+        # Pasos alineados a los lotes, para sumar exactamente los mismos lotes
+        paso = max(1, round(paso / TAM_LOTE_NUMPY)) * TAM_LOTE_NUMPY
+
+    resultado = 0.0
+    partes = []
+
+    for inicio in range(0, iteraciones, paso):
+        fin = min(inicio + paso, iteraciones)
+        resultado, muestras = kernel(fin, coseno, muestreo, inicio, resultado)
+        if len(muestras):
+            partes.append(muestras)
+        yield
+
+    if nombre == 'numpy':
+        muestras = np.concatenate(partes) if partes else np.empty(0, dtype=np.float64)
+    else:
+        muestras = [valor for parte in partes for valor in parte]
+
+    return resultado, muestras
@@ -0,0 +1,225 @@
+"""
+Lanzador pre-fork de la API con SO_REUSEPORT.
+
+El proceso padre crea N workers. Cada worker:
+1. se fija opcionalmente a un núcleo (sched_setaffinity)
+2. se calienta (pools de payload, primera llamada a los kernels) ANTES de abrir el socket
+3. abre su propio socket con SO_REUSEPORT en el mismo puerto, así el kernel
+   reparte las conexiones entre workers
+4. se reinicia de forma ordenada al llegar a `max_requests` o a `max_rss_mb`
+
+El padre reinicia los workers que terminan y reporta cuántos requests atendió
+cada uno, para verificar que el kernel balancea las conexiones.
+"""
+
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from multiprocessing.connection import wait
+
+import uvicorn
+
+# Cola de conexiones pendientes del socket de cada worker
+BACKLOG = 2048
+
+# Segundos entre reportes de distribución de requests
+INTERVALO_REPORTE = 10
+
+# Segundos entre chequeos del RSS de cada worker
+INTERVALO_RSS = 1.0
+
+
+def rss_mb():
+    """RSS del proceso actual en MB (Linux, /proc/self/statm)"""
+    with open('/proc/self/statm') as f:
+        paginas = int(f.read().split()[1])
+    return paginas * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def crear_socket(host, port):
+    """Socket de escucha propio del worker, compartiendo el puerto con SO_REUSEPORT"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(BACKLOG)
+    return sock
+
+
+class ContadorRequests:
+    """ASGI: cuenta los requests del worker en un array compartido y agrega X-Worker-Id"""
+
+    def __init__(self, app, contadores, indice):
+        self.app = app
+        self.contadores = contadores
+        self.indice = indice
+        self.header = (b'x-worker-id', str(indice).encode())
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        # Cada worker escribe solo su posición: no hace falta lock
+        self.contadores[self.indice] += 1
+
+        async def send_con_worker(message):
+            if message['type'] == 'http.response.start':
+                message = {**message, 'headers': [*message.get('headers', []), self.header]}
+            await send(message)
+
+        await self.app(scope, receive, send_con_worker)
+
+
+def _vigilar_rss(server, max_rss_mb):
+    """Hilo del worker: pide un apagado ordenado si el RSS supera el límite"""
+    while not server.should_exit:
+        if rss_mb() > max_rss_mb:
+            print(f"[worker {os.getpid()}] RSS > {max_rss_mb}MB, reiniciando")
+            server.should_exit = True
+            return
+        time.sleep(INTERVALO_RSS)
+
+
+def _ejecutar_worker(app, calentar, indice, cpu, host, port, contadores,
+                     max_requests, max_rss_mb, log_level):
+    """Cuerpo de cada worker (proceso hijo)"""
+    if cpu is not None and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {cpu})
+
+    # Calentar antes de aceptar tráfico
+    inicio = time.perf_counter()
+    if calentar is not None:
+        calentar()
+    print(f"[worker {indice}] pid={os.getpid()} cpu={cpu} "
+          f"calentado en {time.perf_counter() - inicio:.2f}s")
+
+    sock = crear_socket(host, port)
+    config = uvicorn.Config(
+        ContadorRequests(app, contadores, indice),
+        limit_max_requests=max_requests or None,
+        log_level=log_level,
+    )
+    server = uvicorn.Server(config)
+
+    if max_rss_mb:
+        threading.Thread(target=_vigilar_rss, args=(server, max_rss_mb), daemon=True).start()
+
+    server.run(sockets=[sock])
+
+
+def reportar_distribucion(contadores, reinicios, cpus):
+    """Imprime los requests por worker y qué tan parejo es el reparto"""
+    valores = list(contadores)
+    total = sum(valores)
+    print(f"\n{'='*60}")
+    print(f"DISTRIBUCIÓN DE REQUESTS POR WORKER (total: {total})")
+    print(f"{'='*60}")
+    for indice, n in enumerate(valores):
+        porcentaje = n / total * 100 if total else 0
+        print(f"  worker {indice:<3} cpu={str(cpus[indice]):<5} "
+              f"requests={n:<8} ({porcentaje:5.1f}%)  reinicios={reinicios[indice]}")
+
+    if total and len(valores) > 1:
+        media = total / len(valores)
+        desviacion = (sum((n - media) ** 2 for n in valores) / len(valores)) ** 0.5
+        minimo = min(valores)
+        relacion = max(valores) / minimo if minimo else float('inf')
+        print(f"  max/min: {relacion:.2f} | coef. de variación: {desviacion / media:.3f}")
+    print(f"{'='*60}\n")
+
+
+def lanzar(app, calentar=None, host="0.0.0.0", port=5000, workers=0, fijar_cpus=False,
+           max_requests=0, max_rss_mb=0, log_level="info", al_iniciar=None,
+           al_terminar_worker=None):
+    """
+    Arranca `workers` procesos (0 = uno por núcleo) y los supervisa hasta Ctrl+C.
+    Con un solo worker, sin fijar CPUs ni límites de reinicio, llama a
+    uvicorn.run directamente en este proceso.
+
+    - al_iniciar(): se llama en el padre antes de crear los workers
+    - al_terminar_worker(pid): se llama en el padre cada vez que un worker
+      termina, también si se cayó sin apagarse en orden
+    """
+    # sched_getaffinity/sched_setaffinity solo existen en Linux (no en macOS)
+    if fijar_cpus and not hasattr(os, 'sched_getaffinity'):
+        print("[lanzador] sched_setaffinity no disponible en este sistema, sin fijar CPUs")
+        fijar_cpus = False
+
+    if fijar_cpus:
+        disponibles = sorted(os.sched_getaffinity(0))
+        workers = workers or len(disponibles)
+        cpus = [disponibles[i % len(disponibles)] for i in range(workers)]
+    else:
+        workers = workers or os.cpu_count() or 1
+        cpus = [None] * workers
+
+    # Un solo worker sin fijar CPU ni reinicios: no hace falta el padre supervisor
+    if workers == 1 and not (fijar_cpus or max_requests or max_rss_mb):
+        print(f"\nLanzando un solo proceso en {host}:{port} (uvicorn.run, sin pre-fork)")
+        if al_iniciar is not None:
+            al_iniciar()
+        if calentar is not None:
+            calentar()
+        uvicorn.run(app, host=host, port=port, log_level=log_level)
+        return
+
+    contexto = multiprocessing.get_context('fork')
+    contadores = contexto.Array('q', workers, lock=False)
+    reinicios = [0] * workers
+    procesos = {}
+    detener = False
+
+    def iniciar_worker(indice):
+        proceso = contexto.Process(
+            target=_ejecutar_worker,
+            args=(app, calentar, indice, cpus[indice], host, port, contadores,
+                  max_requests, max_rss_mb, log_level),
+            name=f"api-worker-{indice}",
+        )
+        proceso.start()
+        procesos[proceso.sentinel] = (indice, proceso)
+
+    def al_recibir_senal(signum, frame):
+        nonlocal detener
+        detener = True
+
+    signal.signal(signal.SIGINT, al_recibir_senal)
+    signal.signal(signal.SIGTERM, al_recibir_senal)
+
+    print(f"\nLanzando {workers} workers en {host}:{port} (SO_REUSEPORT, "
+          f"fijar_cpus={fijar_cpus}, max_requests={max_requests}, max_rss_mb={max_rss_mb})")
+    if al_iniciar is not None:
+        al_iniciar()
+    for indice in range(workers):
+        iniciar_worker(indice)
+
+    ultimo_reporte = time.monotonic()
+    while not detener:
+        for sentinel in wait(list(procesos), timeout=1.0):
+            indice, proceso = procesos.pop(sentinel)
+            proceso.join()
+            if al_terminar_worker is not None:
+                al_terminar_worker(proceso.pid)
+            if not detener:
+                # Reinicio ordenado (max_requests / RSS) o caída: reemplazar
+                reinicios[indice] += 1
+                print(f"[lanzador] worker {indice} terminó (exit={proceso.exitcode}), reiniciando")
+                iniciar_worker(indice)
+
+        if time.monotonic() - ultimo_reporte >= INTERVALO_REPORTE:
+            reportar_distribucion(contadores, reinicios, cpus)
+            ultimo_reporte = time.monotonic()
+
+    print("\n[lanzador] Deteniendo workers...")
+    for _, proceso in procesos.values():
+        proceso.terminate()
+    for _, proceso in procesos.values():
+        proceso.join()
+        if al_terminar_worker is not None:
+            al_terminar_worker(proceso.pid)
+
+    reportar_distribucion(contadores, reinicios, cpus)
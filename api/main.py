@@ -1,12 +1,187 @@
 import fastapi
-from fastapi import Response
-import uvicorn
-import math
+from fastapi import Request, Response, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+from typing import List
+from pydantic import BaseModel, Field
+import asyncio
+import json
 import time
 import sys
 import os
 
-app = fastapi.FastAPI()
+# Agregar el directorio actual (módulos de la API) y el padre (config) al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kernels import KERNELS, obtener_kernel, ejecutar_kernel
+from ejecucion import MODOS, PoolProcesos, ejecutar_cpu
+from payload import (MOTORES_PAYLOAD, CONTENIDOS_PAYLOAD, PoolPayload, PoolPayloadMmap,
+                     generar_contenido)
+from compresion import (negociar_codificacion, comprimir, stream_comprimido,
+                        CachePrecomprimida)
+from memoria import MOTORES_MEMORIA, PoolRetencion, reservar_memoria, liberar_memoria
+from metricas import (MiddlewareMetricas, registrar_fase, exportar_metricas,
+                      marcar_proceso_terminado, limpiar_directorio_multiproc,
+                      espera_en_cola, server_timing,
+                      registrar_cache, registrar_lag, registrar_compresion,
+                      registrar_flujo)
+from monitor_loop import MonitorLag
+from flujo import EstadisticasFlujo, RegistroFlujos, flujo_sostenido
+from admision import ControlAdmision, MiddlewareAdmision
+from cache import (MODOS_CACHE, CacheLRU, CacheCompartida, clave_carga,
+                   ruta_cache_compartida)
+from lanzador import lanzar
+
+try:
+    from config import (DEFAULT_KERNEL, DEFAULT_EXEC_MODE, PROCESS_POOL_WORKERS,
+                        DEFAULT_PAYLOAD_ENGINE, PAYLOAD_POOL_MB, PAYLOAD_CHUNK_KB,
+                        DEFAULT_MEMORY_ENGINE, MEMORY_RETAIN_LIMIT_MB)
+except ImportError:
+    DEFAULT_KERNEL = "python"
+    DEFAULT_EXEC_MODE = "thread"
+    PROCESS_POOL_WORKERS = 0
+    DEFAULT_PAYLOAD_ENGINE = "urandom"
+    PAYLOAD_POOL_MB = 8
+    PAYLOAD_CHUNK_KB = 64
+    DEFAULT_MEMORY_ENGINE = "chunks"
+    MEMORY_RETAIN_LIMIT_MB = 512
+
+try:
+    from config import (ADMISSION_ENABLED, ADMISSION_MODE, ADMISSION_LIMIT,
+                        ADMISSION_QUEUE_SIZE, ADMISSION_QUEUE_TIMEOUT,
+                        ADMISSION_TARGET_LATENCY, ADMISSION_MIN_LIMIT,
+                        ADMISSION_MAX_LIMIT, ADMISSION_RETRY_AFTER)
+except ImportError:
+    ADMISSION_ENABLED = False
+    ADMISSION_MODE = "fijo"
+    ADMISSION_LIMIT = 32
+    ADMISSION_QUEUE_SIZE = 64
+    ADMISSION_QUEUE_TIMEOUT = 5.0
+    ADMISSION_TARGET_LATENCY = 1.0
+    ADMISSION_MIN_LIMIT = 1
+    ADMISSION_MAX_LIMIT = 256
+    ADMISSION_RETRY_AFTER = 1
+
+try:
+    from config import (DEFAULT_CACHE_MODE, CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS,
+                        SHARED_CACHE_NAME, SHARED_CACHE_SLOTS)
+except ImportError:
+    DEFAULT_CACHE_MODE = "bypass"
+    CACHE_MAX_ENTRIES = 1024
+    CACHE_TTL_SECONDS = 300
+    SHARED_CACHE_NAME = "proyecto_redes_cache"
+    SHARED_CACHE_SLOTS = 4096
+
+try:
+    from config import DEFAULT_PAYLOAD_TYPE, COMPRESSION_LEVEL, PRECOMPRESSED_CACHE_MB
+except ImportError:
+    DEFAULT_PAYLOAD_TYPE = "random"
+    COMPRESSION_LEVEL = 6
+    PRECOMPRESSED_CACHE_MB = 64
+
+try:
+    from config import DEFAULT_SLICE_MS, LOOP_LAG_INTERVAL, LOOP_LAG_WINDOW
+except ImportError:
+    DEFAULT_SLICE_MS = 5.0
+    LOOP_LAG_INTERVAL = 0.05
+    LOOP_LAG_WINDOW = 1200
+
+try:
+    from config import BATCH_MAX_ITEMS, STREAM_MAX_SECONDS
+except ImportError:
+    BATCH_MAX_ITEMS = 64
+    STREAM_MAX_SECONDS = 300
+
+try:
+    from config import (API_PORT, API_WORKERS, API_PIN_CPUS,
+                        API_MAX_REQUESTS_PER_WORKER, API_MAX_RSS_MB)
+except ImportError:
+    API_PORT = 5000
+    API_WORKERS = 1
+    API_PIN_CPUS = False
+    API_MAX_REQUESTS_PER_WORKER = 0
+    API_MAX_RSS_MB = 0
+
+# Pool de procesos compartido para el modo de ejecución "process"
+pool_procesos = PoolProcesos(PROCESS_POOL_WORKERS)
+
+# Buffers de payload pregenerados (motores "pool" y "mmap"), uno por tipo de contenido
+pools_payload = {
+    (motor, contenido): clase(PAYLOAD_POOL_MB * 1024 * 1024, PAYLOAD_CHUNK_KB * 1024, contenido)
+    for motor, clase in (('pool', PoolPayload), ('mmap', PoolPayloadMmap))
+    for contenido in CONTENIDOS_PAYLOAD
+}
+
+# Cuerpos ya comprimidos (precompressed=true)
+cache_precomprimida = CachePrecomprimida(PRECOMPRESSED_CACHE_MB * 1024 * 1024)
+
+# Memoria retenida entre requests (retain=true) con desalojo LRU
+pool_retencion = PoolRetencion(MEMORY_RETAIN_LIMIT_MB * 1024 * 1024)
+
+# Cache de resultados de CPU: local (por worker) y compartida (entre workers)
+cache_local = CacheLRU(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+cache_compartida = CacheCompartida(
+    ruta_cache_compartida(SHARED_CACHE_NAME), SHARED_CACHE_SLOTS, CACHE_TTL_SECONDS
+)
+
+# Últimos flujos sostenidos terminados en este worker (/stream/stats)
+registro_flujos = RegistroFlujos()
+
+# Muestreador del lag del event loop de este worker
+monitor_lag = MonitorLag(LOOP_LAG_INTERVAL, LOOP_LAG_WINDOW, al_medir=registrar_lag)
+
+
+def calentar():
+    """
+    Prepara el worker antes de que abra su socket: genera los buffers de
+    payload y hace la primera llamada de cada kernel (imports perezosos,
+    inicialización de NumPy), para que el primer request no pague ese costo.
+    """
+    for pool in pools_payload.values():
+        pool.iniciar()
+    for nombre in KERNELS:
+        try:
+            ejecutar_kernel(nombre, 1000, coseno=True)
+        except ValueError:
+            # Kernel no disponible (p.ej. NumPy no instalado)
+            pass
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Inicialización y limpieza de recursos compartidos del worker"""
+    for pool in pools_payload.values():
+        pool.iniciar()
+    monitor_lag.iniciar()
+    yield
+    await monitor_lag.detener()
+    pool_procesos.cerrar()
+    for pool in pools_payload.values():
+        pool.cerrar()
+    pool_retencion.vaciar()
+    cache_compartida.cerrar()
+    marcar_proceso_terminado()
+
+
+app = fastapi.FastAPI(lifespan=lifespan)
+
+# Control de admisión (por worker) delante de /stress y /cpu.
+# Se agrega antes que el de métricas para quedar por dentro de él:
+# así los 503 y la espera de admisión también quedan medidos.
+if ADMISSION_ENABLED:
+    control_admision = ControlAdmision(
+        ADMISSION_LIMIT, ADMISSION_QUEUE_SIZE, ADMISSION_QUEUE_TIMEOUT,
+        modo=ADMISSION_MODE,
+        latencia_objetivo=ADMISSION_TARGET_LATENCY,
+        limite_min=ADMISSION_MIN_LIMIT,
+        limite_max=ADMISSION_MAX_LIMIT,
+    )
+    app.add_middleware(MiddlewareAdmision, control=control_admision,
+                       retry_after=ADMISSION_RETRY_AFTER)
+
+app.add_middleware(MiddlewareMetricas)
 
 @app.get("/health")
 def health_check():
@@ -16,63 +191,253 @@ def health_check():
     """
     return {"status": "ok"}
 
+
+@app.get("/metrics")
+def metrics():
+    """
+    Métricas del servidor en formato Prometheus, agregadas de todos los workers:
+    histogramas de latencia por ruta, requests en curso, bytes enviados y
+    tiempo por segmento de /stress.
+    """
+    contenido, content_type = exportar_metricas()
+    return Response(content=contenido, media_type=content_type)
+
+
+@app.get("/loop-lag")
+def loop_lag():
+    """
+    Percentiles del lag del event loop de este worker (últimas muestras).
+    Un lag alto indica handlers que bloquean el loop sin ceder el control.
+    """
+    return {"pid": os.getpid(), **monitor_lag.resumen}
+
+
+async def headers_cache(estado):
+    """Headers con el resultado de la cache y sus contadores"""
+    local = cache_local.estadisticas()
+    headers = {
+        "X-Cache": estado,
+        "X-Cache-Hits": str(local['hits']),
+        "X-Cache-Misses": str(local['misses']),
+        "X-Cache-Evictions": str(local['desalojos']),
+    }
+    if estado != 'BYPASS' and cache_compartida.mapa is not None:
+        # flock puede bloquear: fuera del event loop
+        compartida = await run_in_threadpool(cache_compartida.estadisticas)
+        headers.update({
+            "X-Cache-Shared-Hits": str(compartida['hits']),
+            "X-Cache-Shared-Misses": str(compartida['misses']),
+            "X-Cache-Shared-Evictions": str(compartida['desalojos']),
+        })
+    return headers
+
+
+async def segmento_cpu(kernel, iteraciones, mode, cache, coseno=False, muestreo=0,
+                       slice_ms=DEFAULT_SLICE_MS):
+    """
+    Valida kernel, modo y cache, y ejecuta el segmento de CPU (400 si son inválidos).
+
+    Retorna: (resultado, elementos_en_memoria, memoria_bytes, duracion, espera, headers)
+    Con cache local/shared, un hit devuelve el resultado guardado sin ejecutar el kernel.
+    """
+    if cache not in MODOS_CACHE:
+        disponibles = ", ".join(MODOS_CACHE)
+        raise HTTPException(
+            status_code=400,
+            detail=f"Modo de cache desconocido '{cache}'. Disponibles: {disponibles}"
+        )
+
+    try:
+        obtener_kernel(kernel)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    clave = clave_carga(kernel, iteraciones, coseno, muestreo)
+    if cache != 'bypass':
+        valor = cache_local.obtener(clave)
+        estado = 'HIT-LOCAL'
+        if valor is None and cache == 'shared':
+            registrar_cache('local', 'miss')
+            valor = await run_in_threadpool(cache_compartida.obtener, clave)
+            estado = 'HIT-SHARED'
+            if valor is not None:
+                registrar_cache('local', 'eviction', cache_local.guardar(clave, valor))
+
+        if valor is not None:
+            registrar_cache('local' if estado == 'HIT-LOCAL' else 'shared', 'hit')
+            resultado, elementos, memoria_bytes = valor
+            return resultado, elementos, memoria_bytes, 0.0, 0.0, await headers_cache(estado)
+
+        registrar_cache(cache, 'miss')
+
+    try:
+        resultado, muestras, duracion, espera, headers = await ejecutar_cpu(
+            pool_procesos, mode, kernel, iteraciones, coseno, muestreo, slice_ms
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Cada float de Python: ~28 bytes; los arrays de NumPy reportan nbytes
+    elementos = len(muestras)
+    memoria_bytes = getattr(muestras, 'nbytes', elementos * 28)
+
+    if cache != 'bypass':
+        valor = (resultado, elementos, memoria_bytes)
+        registrar_cache('local', 'eviction', cache_local.guardar(clave, valor))
+        if cache == 'shared':
+            desalojadas = await run_in_threadpool(cache_compartida.guardar, clave, valor)
+            registrar_cache('shared', 'eviction', desalojadas)
+
+    headers.update(await headers_cache('MISS' if cache != 'bypass' else 'BYPASS'))
+    return resultado, elementos, memoria_bytes, duracion, espera, headers
+
+
 @app.get("/cpu")
-def procesar_carga(iteraciones: int = 1000000):
+async def procesar_carga(
+    request: Request,
+    http_response: Response,
+    iteraciones: int = 1000000,
+    kernel: str = DEFAULT_KERNEL,
+    mode: str = DEFAULT_EXEC_MODE,
+    cache: str = DEFAULT_CACHE_MODE,
+    slice_ms: float = DEFAULT_SLICE_MS
+):
     """
     Este endpoint consume CPU y RAM de manera proporcional y controlada.
 
     Parámetros:
     - iteraciones: Número de operaciones matemáticas (controla CPU y RAM)
+    - kernel: Motor de cálculo (python, numpy, hashlib, zlib)
+    - mode: Dónde corre el cálculo (thread, process, blocking, cooperative)
+    - cache: Cache de resultados (bypass, local, shared)
+    - slice_ms: Tramo de cálculo antes de ceder el loop (mode=cooperative)
 
     Complejidad:
     - CPU: O(N) lineal con iteraciones
     - RAM: O(N/1000) - almacena solo 1 de cada 1000 iteraciones
     """
 
-    start_time = time.time()
-
-    # Lista para almacenar resultados (consumo de RAM proporcional)
-    resultados_memoria = []
-    resultado = 0
+    inicio_handler = time.perf_counter_ns()
 
-    for i in range(iteraciones):
-        # Cálculo CPU-intensivo
-        valor = math.sqrt(i) * math.sin(i)
-        resultado += valor
-
-        # Consumo de RAM reducido: almacenar solo 1 de cada 50 valores
-        # Cada float consume ~28 bytes aproximadamente
-        if i % 25 == 0:
-            resultados_memoria.append(valor)
-
-    end_time = time.time()
-    execution_time = (end_time - start_time)
+    # Cálculo CPU-intensivo: el kernel retiene 1 de cada 25 valores
+    # (consumo de RAM proporcional)
+    (resultado, elementos_memoria, memoria_bytes,
+     execution_time, espera_cpu, exec_headers) = await segmento_cpu(
+        kernel, iteraciones, mode, cache, coseno=False, muestreo=25, slice_ms=slice_ms
+    )
 
-    # Calcular memoria utilizada (solo guardamos 1 de cada 1000)
-    # Cada float: ~28 bytes aproximadamente
-    memoria_bytes = len(resultados_memoria) * 28
+    # Calcular memoria utilizada
     memoria_kb = memoria_bytes / 1024
 
+    http_response.headers.update(exec_headers)
+    http_response.headers.update(monitor_lag.headers())
+    http_response.headers["X-Kernel"] = kernel
+    http_response.headers["X-Kernel-Time"] = str(round(execution_time, 6))
+    http_response.headers["Server-Timing"] = server_timing({
+        'queue': espera_en_cola(request, inicio_handler),
+        'pool': espera_cpu,
+        'cpu': execution_time,
+    })
+
     # Devuelve una respuesta JSON
     response = {
         "mensaje": "Carga procesada con FastAPI.",
         "iteraciones_realizadas": iteraciones,
+        "kernel": kernel,
         "tiempo_ejecucion_seg": execution_time,
-        "elementos_en_memoria": len(resultados_memoria),
+        "elementos_en_memoria": elementos_memoria,
         "memoria_consumida_kb": round(memoria_kb, 2)
     }
 
-    # # Limpiar memoria explícitamente antes de retornar
-    # del resultados_memoria
-
     return response
 
 
+def construir_payload(response_kb, payload_engine, payload, codificacion, nivel, precomprimido):
+    """
+    Genera el cuerpo de /stress cuando no se sirve en streaming.
+
+    Retorna: (cuerpo o None, info_compresion o None). cuerpo es None cuando el
+    payload se envía en streaming desde un pool (motores "pool" y "mmap").
+    """
+    total_bytes = response_kb * 1024
+
+    if codificacion != 'identity' and precomprimido:
+        clave = (payload, total_bytes, codificacion, nivel)
+        entrada = cache_precomprimida.obtener(clave)
+        if entrada is not None:
+            # En un HIT no se comprime nada: el costo original va aparte
+            cuerpo, segundos = entrada
+            return cuerpo, {'crudos': total_bytes, 'segundos': 0.0,
+                            'segundos_original': segundos, 'cache': 'HIT'}
+
+        # Siempre el mismo segmento del pool, para que la entrada sea reutilizable
+        pool = pools_payload[('pool', payload)]
+        crudo = b"".join(pool.fragmentos(total_bytes, offset=0))
+        cuerpo, segundos = comprimir(crudo, codificacion, nivel)
+        cache_precomprimida.guardar(clave, cuerpo, segundos)
+        return cuerpo, {'crudos': total_bytes, 'segundos': segundos, 'cache': 'MISS'}
+
+    if payload_engine != 'urandom':
+        return None, None
+
+    crudo = generar_contenido(payload, total_bytes)
+    if codificacion == 'identity':
+        return crudo, None
+
+    cuerpo, segundos = comprimir(crudo, codificacion, nivel)
+    return cuerpo, {'crudos': total_bytes, 'segundos': segundos, 'cache': 'NONE'}
+
+
+def estres_memoria_y_red(memory_mb, response_kb, payload_engine, memory_engine, retain,
+                         payload='random', codificacion='identity', nivel=COMPRESSION_LEVEL,
+                         precomprimido=False):
+    """
+    Segmentos de RAM y RED de /stress (bloqueantes, corren en el threadpool).
+    Con los motores "pool" y "mmap" el payload no se genera aquí (response_data = None).
+    """
+    # 2. ESTRÉS DE RAM - Crear datos en memoria
+    inicio_mem = time.perf_counter_ns()
+    memory_data, memory_bytes_used = reservar_memoria(memory_engine, memory_mb)
+
+    # Con retain=true el bloque sobrevive al request (hasta ser desalojado)
+    if not (retain and pool_retencion.retener(memory_data, memory_bytes_used)):
+        liberar_memoria(memory_data)
+
+    # 3. ESTRÉS DE RED - Generar respuesta grande
+    inicio_payload = time.perf_counter_ns()
+    response_data, compresion = construir_payload(
+        response_kb, payload_engine, payload, codificacion, nivel, precomprimido
+    )
+    fin = time.perf_counter_ns()
+
+    # La compresión ocurre dentro de construir_payload: se separa de 'payload'
+    # para que Server-Timing no la cuente dos veces
+    compresion_s = compresion['segundos'] if compresion is not None else 0.0
+    tiempos = {
+        'mem': (inicio_payload - inicio_mem) / 1e9,
+        'payload': max(0.0, (fin - inicio_payload) / 1e9 - compresion_s),
+        'compress': compresion_s,
+    }
+    return memory_bytes_used, response_data, tiempos, compresion
+
+
 @app.get("/stress")
-def full_stress(
+async def full_stress(
+    request: Request,
     cpu_iterations: int = 500000,
     memory_mb: int = 10,
-    response_kb: int = 512
+    response_kb: int = 512,
+    kernel: str = DEFAULT_KERNEL,
+    mode: str = DEFAULT_EXEC_MODE,
+    payload_engine: str = DEFAULT_PAYLOAD_ENGINE,
+    memory_engine: str = DEFAULT_MEMORY_ENGINE,
+    retain: bool = False,
+    cache: str = DEFAULT_CACHE_MODE,
+    slice_ms: float = DEFAULT_SLICE_MS,
+    payload: str = DEFAULT_PAYLOAD_TYPE,
+    compress: bool = False,
+    compression_level: int = COMPRESSION_LEVEL,
+    precompressed: bool = False
 ):
     """
     Endpoint que estresa CPU, RAM y RED simultáneamente.
@@ -81,40 +446,442 @@ def full_stress(
     - cpu_iterations: Número de operaciones matemáticas (controla CPU)
     - memory_mb: Megabytes de datos a mantener en memoria (controla RAM)
     - response_kb: Kilobytes de datos en la respuesta (controla tráfico de RED)
+    - kernel: Motor de cálculo de CPU (python, numpy, hashlib, zlib)
+    - mode: Dónde corre el cálculo (thread, process, blocking, cooperative)
+    - payload_engine: Cómo se genera la respuesta (urandom, pool, mmap)
+    - memory_engine: Cómo se reserva la RAM (chunks, bytearray, mmap)
+    - retain: Mantener la RAM reservada entre requests (pool LRU con techo)
+    - cache: Cache del resultado de CPU (bypass, local, shared)
+    - slice_ms: Tramo de cálculo antes de ceder el loop (mode=cooperative)
+    - payload: Tipo de contenido de la respuesta (random, text, repetitive)
+    - compress: Comprimir según Accept-Encoding (gzip, deflate)
+    - compression_level: Nivel de compresión zlib (0-9)
+    - precompressed: Servir el cuerpo comprimido desde la cache de precomprimidos
     """
-    start_time = time.time()
+    if payload_engine not in MOTORES_PAYLOAD:
+        disponibles = ", ".join(MOTORES_PAYLOAD)
+        raise HTTPException(
+            status_code=400,
+            detail=f"Motor de payload desconocido '{payload_engine}'. Disponibles: {disponibles}"
+        )
+    if memory_engine not in MOTORES_MEMORIA:
+        disponibles = ", ".join(MOTORES_MEMORIA)
+        raise HTTPException(
+            status_code=400,
+            detail=f"Motor de memoria desconocido '{memory_engine}'. Disponibles: {disponibles}"
+        )
+    if payload not in CONTENIDOS_PAYLOAD:
+        disponibles = ", ".join(CONTENIDOS_PAYLOAD)
+        raise HTTPException(
+            status_code=400,
+            detail=f"Tipo de payload desconocido '{payload}'. Disponibles: {disponibles}"
+        )
+    if not 0 <= compression_level <= 9:
+        raise HTTPException(status_code=400, detail="compression_level debe estar entre 0 y 9")
+
+    codificacion = 'identity'
+    if compress:
+        codificacion = negociar_codificacion(request.headers.get('accept-encoding'))
+
+    start_time = time.perf_counter_ns()
 
     # 1. ESTRÉS DE CPU - Cálculos matemáticos intensivos
-    resultado_cpu = 0
-    for i in range(cpu_iterations):
-        resultado_cpu += math.sqrt(i) * math.sin(i) * math.cos(i)
+    resultado_cpu, _, _, kernel_time, espera_cpu, exec_headers = await segmento_cpu(
+        kernel, cpu_iterations, mode, cache, coseno=True, slice_ms=slice_ms
+    )
 
-    # 2. ESTRÉS DE RAM - Crear datos en memoria
-    # Cada chunk es 1KB, creamos memory_mb * 1024 chunks
-    memory_data = [os.urandom(1024) for _ in range(memory_mb * 1024)]
-    memory_bytes_used = len(memory_data) * 1024
+    # 2 y 3. ESTRÉS DE RAM y RED
+    inicio_ram_red = time.perf_counter_ns()
+    memory_bytes_used, response_data, tiempos, compresion = await run_in_threadpool(
+        estres_memoria_y_red, memory_mb, response_kb, payload_engine, memory_engine, retain,
+        payload, codificacion, compression_level, precompressed
+    )
+    fin_ram_red = time.perf_counter_ns()
+    espera_ram_red = max(0.0, (fin_ram_red - inicio_ram_red) / 1e9
+                         - tiempos['mem'] - tiempos['payload'] - tiempos['compress'])
+    retencion = pool_retencion.estado()
 
-    # 3. ESTRÉS DE RED - Generar respuesta grande
-    response_data = os.urandom(response_kb * 1024)
+    registrar_fase('cpu', kernel_time)
+    registrar_fase('mem', tiempos['mem'])
+    registrar_fase('payload', tiempos['payload'])
 
-    elapsed = time.time() - start_time
+    elapsed = (time.perf_counter_ns() - start_time) / 1e9
+
+    etapas = {
+        'queue': espera_en_cola(request, start_time),
+        'pool': espera_cpu + espera_ram_red,
+        'cpu': kernel_time,
+        'mem': tiempos['mem'],
+        'payload': tiempos['payload'],
+    }
+    if compresion is not None:
+        etapas['compress'] = tiempos['compress']
+    etapas['total'] = elapsed
+
+    headers = {
+        "X-CPU-Iterations": str(cpu_iterations),
+        "X-Memory-MB": str(memory_mb),
+        "X-Response-KB": str(response_kb),
+        "X-Memory-Bytes-Used": str(memory_bytes_used),
+        "X-Server-Time": str(round(elapsed, 6)),
+        "X-CPU-Result": str(round(resultado_cpu, 2)),
+        "X-Kernel": kernel,
+        "X-Kernel-Time": str(round(kernel_time, 6)),
+        "X-Payload-Engine": payload_engine,
+        "X-Payload-Type": payload,
+        "X-Payload-Raw-Bytes": str(response_kb * 1024),
+        "X-Memory-Engine": memory_engine,
+        "X-Memory-Retained-Bytes": str(retencion['bytes']),
+        "X-Memory-Retained-Blocks": str(retencion['bloques']),
+        "X-Memory-Evictions": str(retencion['desalojos']),
+        # Desglose por etapa: queue = aceptado -> inicio del handler,
+        # pool = espera en threadpool/pool de procesos
+        "Server-Timing": server_timing(etapas),
+        **monitor_lag.headers(),
+        **exec_headers
+    }
+
+    if compress:
+        headers["Vary"] = "Accept-Encoding"
+    if codificacion != 'identity':
+        headers["Content-Encoding"] = codificacion
+        headers["X-Compression-Level"] = str(compression_level)
 
     # Retornar respuesta binaria con headers de métricas
-    return Response(
-        content=response_data,
+    if response_data is not None:
+        if compresion is not None:
+            registrar_compresion(compresion['crudos'], len(response_data), compresion['segundos'])
+            headers["X-Payload-Encoded-Bytes"] = str(len(response_data))
+            headers["X-Compression-Time"] = str(round(compresion['segundos'], 6))
+            headers["X-Compression-Cache"] = compresion['cache']
+            if 'segundos_original' in compresion:
+                headers["X-Compression-Original-Time"] = str(round(compresion['segundos_original'], 6))
+        return Response(
+            content=response_data,
+            media_type="application/octet-stream",
+            headers=headers
+        )
+
+    # Motores sin copia: vistas del buffer pregenerado servidas por fragmentos
+    total_bytes = response_kb * 1024
+    pool = pools_payload[(payload_engine, payload)]
+
+    if codificacion == 'identity':
+        headers["Content-Length"] = str(total_bytes)
+        cuerpo = pool.stream(total_bytes)
+    else:
+        # Compresión en streaming: el tamaño final no se conoce al enviar los
+        # headers, así que el tamaño codificado y el tiempo van a /metrics
+        cuerpo = stream_comprimido(
+            pool.fragmentos(total_bytes), codificacion, compression_level,
+            al_terminar=registrar_compresion
+        )
+
+    return StreamingResponse(
+        cuerpo,
+        media_type="application/octet-stream",
+        headers=headers
+    )
+
+
+class CargaLote(BaseModel):
+    """Una carga de trabajo de /stress/batch (mismo significado que en /stress)"""
+    cpu_iterations: int = Field(500000, ge=0)
+    memory_mb: int = Field(10, ge=0)
+    response_kb: int = Field(512, ge=0)
+
+
+class Lote(BaseModel):
+    items: List[CargaLote]
+    parallel: bool = True
+    kernel: str = DEFAULT_KERNEL
+    mode: str = DEFAULT_EXEC_MODE
+    payload_engine: str = DEFAULT_PAYLOAD_ENGINE
+    memory_engine: str = DEFAULT_MEMORY_ENGINE
+
+
+async def ejecutar_carga_lote(indice, item, lote, inicio_lote):
+    """
+    Ejecuta una carga del lote (CPU, RAM y payload, como /stress).
+
+    Retorna: (metadatos con tiempos por etapa, cuerpo). cuerpo es bytes o un
+    iterable de vistas del pool de payload. Si la carga falla, retorna
+    ({"item": indice, "error": ..., "bytes": 0}, None): en modo paralelo el
+    índice es lo único que dice qué carga falló.
+    """
+    try:
+        return await _ejecutar_carga_lote(indice, item, lote, inicio_lote)
+    except Exception as e:
+        detalle = e.detail if isinstance(e, HTTPException) else str(e)
+        return {"item": indice, "error": detalle, "bytes": 0}, None
+
+
+async def _ejecutar_carga_lote(indice, item, lote, inicio_lote):
+    inicio = time.perf_counter_ns()
+    resultado, _, _, cpu_time, espera_cpu, _ = await segmento_cpu(
+        lote.kernel, item.cpu_iterations, lote.mode, 'bypass', coseno=True
+    )
+
+    inicio_ram_red = time.perf_counter_ns()
+    memory_bytes_used, response_data, tiempos, _ = await run_in_threadpool(
+        estres_memoria_y_red, item.memory_mb, item.response_kb,
+        lote.payload_engine, lote.memory_engine, False
+    )
+    fin = time.perf_counter_ns()
+    espera_ram_red = max(0.0, (fin - inicio_ram_red) / 1e9 - tiempos['mem'] - tiempos['payload'])
+
+    registrar_fase('cpu', cpu_time)
+    registrar_fase('mem', tiempos['mem'])
+    registrar_fase('payload', tiempos['payload'])
+
+    total_bytes = item.response_kb * 1024
+    if response_data is None:
+        cuerpo = pools_payload[(lote.payload_engine, DEFAULT_PAYLOAD_TYPE)].fragmentos(total_bytes)
+    else:
+        cuerpo = response_data
+
+    meta = {
+        "item": indice,
+        "cpu_iterations": item.cpu_iterations,
+        "memory_mb": item.memory_mb,
+        "response_kb": item.response_kb,
+        "cpu_result": round(resultado, 2),
+        "memory_bytes_used": memory_bytes_used,
+        "bytes": total_bytes,
+        # Segundos desde que empezó el lote hasta que empezó esta carga
+        "start": (inicio - inicio_lote) / 1e9,
+        "pool": espera_cpu + espera_ram_red,
+        "cpu": cpu_time,
+        "mem": tiempos['mem'],
+        "payload": tiempos['payload'],
+        "total": (fin - inicio) / 1e9,
+    }
+    return meta, cuerpo
+
+
+async def stream_lote(lote, inicio_lote):
+    """
+    Resultados del lote en orden de finalización: por cada carga una línea
+    JSON con sus tiempos seguida de exactamente `bytes` bytes de payload, y al
+    final una línea JSON de resumen.
+    """
+    if lote.parallel:
+        tareas = [
+            asyncio.ensure_future(ejecutar_carga_lote(i, item, lote, inicio_lote))
+            for i, item in enumerate(lote.items)
+        ]
+        pendientes = asyncio.as_completed(tareas)
+    else:
+        tareas = []
+        pendientes = (ejecutar_carga_lote(i, item, lote, inicio_lote)
+                      for i, item in enumerate(lote.items))
+
+    trabajo = 0.0
+    total_bytes = 0
+    errores = 0
+    try:
+        for pendiente in pendientes:
+            meta, cuerpo = await pendiente
+            if 'error' in meta:
+                errores += 1
+                yield (json.dumps(meta) + "\n").encode()
+                continue
+
+            trabajo += meta['cpu'] + meta['mem'] + meta['payload']
+            total_bytes += meta['bytes']
+            yield (json.dumps(meta) + "\n").encode()
+            if isinstance(cuerpo, bytes):
+                yield cuerpo
+            else:
+                for fragmento in cuerpo:
+                    yield fragmento
+    finally:
+        # Cliente desconectado: no dejar cargas corriendo
+        for tarea in tareas:
+            tarea.cancel()
+
+    total = (time.perf_counter_ns() - inicio_lote) / 1e9
+    yield (json.dumps({
+        "summary": True,
+        "items": len(lote.items),
+        "errors": errores,
+        "parallel": lote.parallel,
+        "bytes": total_bytes,
+        "total": total,
+        # Suma de cpu+mem+payload de todas las cargas (el trabajo "real")
+        "work": trabajo,
+    }) + "\n").encode()
+
+
+@app.post("/stress/batch")
+async def stress_batch(request: Request, lote: Lote):
+    """
+    Ejecuta varias cargas de /stress en un solo request, en paralelo o en
+    secuencia, y devuelve un stream multiplexado con los tiempos de cada una.
+
+    Comparando contra N requests /stress separados se aísla el costo del
+    framework (parseo HTTP, ruteo, headers) del trabajo real.
+    """
+    if not 0 < len(lote.items) <= BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"El lote debe tener entre 1 y {BATCH_MAX_ITEMS} items"
+        )
+    # Validar antes de empezar el stream: después ya no se puede responder 400
+    try:
+        obtener_kernel(lote.kernel)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if lote.mode not in MODOS:
+        disponibles = ", ".join(MODOS)
+        raise HTTPException(
+            status_code=400,
+            detail=f"Modo de ejecución desconocido '{lote.mode}'. Disponibles: {disponibles}"
+        )
+    if lote.payload_engine not in MOTORES_PAYLOAD:
+        disponibles = ", ".join(MOTORES_PAYLOAD)
+        raise HTTPException(
+            status_code=400,
+            detail=f"Motor de payload desconocido '{lote.payload_engine}'. Disponibles: {disponibles}"
+        )
+    if lote.memory_engine not in MOTORES_MEMORIA:
+        disponibles = ", ".join(MOTORES_MEMORIA)
+        raise HTTPException(
+            status_code=400,
+            detail=f"Motor de memoria desconocido '{lote.memory_engine}'. Disponibles: {disponibles}"
+        )
+
+    inicio_lote = time.perf_counter_ns()
+    headers = {
+        "X-Batch-Items": str(len(lote.items)),
+        "X-Batch-Mode": "parallel" if lote.parallel else "sequential",
+        "Server-Timing": server_timing({'queue': espera_en_cola(request, inicio_lote)}),
+    }
+    return StreamingResponse(
+        stream_lote(lote, inicio_lote),
+        media_type="application/octet-stream",
+        headers=headers
+    )
+
+
+def validar_flujo(duration, rate_kb, chunk_kb, payload):
+    """Mensaje de error de los parámetros de /stream y /stream/ws, o None"""
+    if not 0 < duration <= STREAM_MAX_SECONDS:
+        return f"duration debe estar entre 0 y {STREAM_MAX_SECONDS} segundos"
+    if rate_kb < 0:
+        return "rate_kb no puede ser negativo"
+    if not 1 <= chunk_kb <= PAYLOAD_POOL_MB * 1024:
+        # Cada fragmento es una vista contigua del pool de payload
+        return f"chunk_kb debe estar entre 1 y {PAYLOAD_POOL_MB * 1024} (PAYLOAD_POOL_MB)"
+    if payload not in CONTENIDOS_PAYLOAD:
+        disponibles = ", ".join(CONTENIDOS_PAYLOAD)
+        return f"Tipo de payload desconocido '{payload}'. Disponibles: {disponibles}"
+    return None
+
+
+def cerrar_flujo(transporte):
+    """Callback al terminar un flujo: métricas de Prometheus y registro del worker"""
+    def al_terminar(estadisticas):
+        registrar_flujo(transporte, estadisticas.bytes, estadisticas.segundos)
+        registro_flujos.agregar(transporte, estadisticas)
+    return al_terminar
+
+
+@app.get("/stream")
+async def stream_sostenido(
+    duration: float = 10.0,
+    rate_kb: float = 0,
+    chunk_kb: int = PAYLOAD_CHUNK_KB,
+    payload: str = DEFAULT_PAYLOAD_TYPE,
+    buffering: bool = True
+):
+    """
+    Flujo HTTP chunked de larga duración para medir ancho de banda sostenido.
+
+    Parámetros:
+    - duration: Segundos que dura el flujo
+    - rate_kb: KB/s objetivo (0 = a toda velocidad)
+    - chunk_kb: Tamaño de cada fragmento enviado
+    - payload: Tipo de contenido (random, text, repetitive)
+    - buffering: false agrega X-Accel-Buffering: no (Nginx no bufferiza la respuesta)
+
+    La tasa lograda por conexión queda en /stream/stats y en /metrics.
+    """
+    error = validar_flujo(duration, rate_kb, chunk_kb, payload)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+
+    headers = {
+        "X-Stream-Duration": str(duration),
+        "X-Stream-Rate-Target": str(int(rate_kb * 1024)),
+        "X-Payload-Type": payload,
+    }
+    if not buffering:
+        headers["X-Accel-Buffering"] = "no"
+
+    # Sin Content-Length: la respuesta sale con Transfer-Encoding: chunked
+    return StreamingResponse(
+        flujo_sostenido(
+            pools_payload[('pool', payload)], duration, rate_kb * 1024, chunk_kb * 1024,
+            al_terminar=cerrar_flujo('http')
+        ),
         media_type="application/octet-stream",
-        headers={
-            "X-CPU-Iterations": str(cpu_iterations),
-            "X-Memory-MB": str(memory_mb),
-            "X-Response-KB": str(response_kb),
-            "X-Memory-Bytes-Used": str(memory_bytes_used),
-            "X-Server-Time": str(round(elapsed, 6)),
-            "X-CPU-Result": str(round(resultado_cpu, 2))
-        }
+        headers=headers
     )
 
 
+@app.websocket("/stream/ws")
+async def stream_websocket(
+    websocket: WebSocket,
+    duration: float = 10.0,
+    rate_kb: float = 0,
+    chunk_kb: int = PAYLOAD_CHUNK_KB,
+    payload: str = DEFAULT_PAYLOAD_TYPE
+):
+    """
+    Igual que /stream pero por WebSocket: un mensaje binario por fragmento y,
+    al terminar, un mensaje JSON con la tasa lograda.
+    """
+    error = validar_flujo(duration, rate_kb, chunk_kb, payload)
+    if error:
+        # 1008 = violación de política (parámetros inválidos)
+        await websocket.close(code=1008, reason=error)
+        return
+
+    await websocket.accept()
+    estadisticas = EstadisticasFlujo(rate_kb * 1024)
+    try:
+        async for vista in flujo_sostenido(
+            pools_payload[('pool', payload)], duration, rate_kb * 1024, chunk_kb * 1024,
+            estadisticas=estadisticas, al_terminar=cerrar_flujo('ws')
+        ):
+            # send_bytes espera al transporte: contrapresión del cliente
+            await websocket.send_bytes(bytes(vista))
+        await websocket.send_json(estadisticas.resumen())
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+
+@app.get("/stream/stats")
+def stream_stats():
+    """Últimos flujos terminados en este worker con bytes/s logrados por conexión"""
+    return {"pid": os.getpid(), "flujos": registro_flujos.recientes()}
+
+
 # Ejecutar el script directamente con: python main.py
+# (workers pre-fork con SO_REUSEPORT, ver API_* en config.py)
 if __name__ == "__main__":
-    # Esto hay que ajustarlo segun el script
-    uvicorn.run(app, host="0.0.0.0", port=5000)
\ No newline at end of file
+    lanzar(
+        app,
+        calentar=calentar,
+        host="0.0.0.0",
+        port=API_PORT,
+        workers=API_WORKERS,
+        fijar_cpus=API_PIN_CPUS,
+        max_requests=API_MAX_REQUESTS_PER_WORKER,
+        max_rss_mb=API_MAX_RSS_MB,
+        # /metrics: sin archivos de corridas anteriores ni gauges de workers caídos
+        al_iniciar=limpiar_directorio_multiproc,
+        al_terminar_worker=marcar_proceso_terminado,
+    )
\ No newline at end of file
@@ -0,0 +1,122 @@
+"""
+Motores de presión de memoria para el segmento de RAM de /stress.
+
+- chunks:    memory_mb * 1024 objetos os.urandom(1024) (comportamiento original)
+- bytearray: un bloque contiguo con todas sus páginas escritas
+- mmap:      un mmap anónimo con todas sus páginas escritas
+
+Opcionalmente el bloque se guarda en un pool de retención por proceso, con
+desalojo LRU y un techo configurable, para que el RSS crezca entre requests.
+"""
+
+import mmap
+import os
+import threading
+from collections import OrderedDict
+
+MOTORES_MEMORIA = ('chunks', 'bytearray', 'mmap')
+
+TAM_PAGINA = mmap.PAGESIZE
+
+
+def _tocar_paginas(bloque, tamano):
+    """Escribe un byte por página para forzar que el kernel las asigne"""
+    paginas = len(range(0, tamano, TAM_PAGINA))
+    bloque[0:tamano:TAM_PAGINA] = b'\x01' * paginas
+
+
+def reservar_memoria(motor, memory_mb):
+    """
+    Reserva memory_mb megabytes con el motor indicado.
+
+    Retorna: (bloque, bytes_reservados)
+    """
+    if motor not in MOTORES_MEMORIA:
+        disponibles = ", ".join(MOTORES_MEMORIA)
+        raise ValueError(f"Motor de memoria desconocido '{motor}'. Disponibles: {disponibles}")
+
+    tamano = memory_mb * 1024 * 1024
+
+    if motor == 'chunks':
+        # Cada chunk es 1KB, creamos memory_mb * 1024 chunks
+        bloque = [os.urandom(1024) for _ in range(memory_mb * 1024)]
+        return bloque, len(bloque) * 1024
+
+    if tamano == 0:
+        return None, 0
+
+    if motor == 'bytearray':
+        bloque = bytearray(tamano)
+    else:
+        bloque = mmap.mmap(-1, tamano)
+
+    _tocar_paginas(bloque, tamano)
+    return bloque, tamano
+
+
+def liberar_memoria(bloque):
+    """Libera el bloque (los mmap se desmapean de inmediato)"""
+    if isinstance(bloque, mmap.mmap):
+        bloque.close()
+
+
+class PoolRetencion:
+    """
+    Bloques de memoria retenidos entre requests dentro de un proceso.
+    Al superar limite_bytes se desalojan los bloques menos recientes (LRU).
+    """
+
+    def __init__(self, limite_bytes):
+        self.limite_bytes = limite_bytes
+        self.bloques = OrderedDict()
+        self.bytes_retenidos = 0
+        self.desalojos = 0
+        self._siguiente_id = 0
+        # El segmento de RAM corre en el threadpool: proteger el estado
+        self._lock = threading.Lock()
+
+    def retener(self, bloque, tamano):
+        """
+        Guarda el bloque y desaloja los más antiguos si se supera el techo.
+        Un bloque mayor que el techo no se retiene.
+
+        Retorna: True si el bloque quedó retenido
+        """
+        if tamano == 0 or tamano > self.limite_bytes:
+            return False
+
+        desalojados = []
+        with self._lock:
+            while self.bytes_retenidos + tamano > self.limite_bytes:
+                _, (viejo, viejo_tamano) = self.bloques.popitem(last=False)
+                self.bytes_retenidos -= viejo_tamano
+                self.desalojos += 1
+                desalojados.append(viejo)
+
+            self.bloques[self._siguiente_id] = (bloque, tamano)
+            self._siguiente_id += 1
+            self.bytes_retenidos += tamano
+
+        # Liberar fuera del lock
+        for viejo in desalojados:
+            liberar_memoria(viejo)
+
+        return True
+
+    def estado(self):
+        """Resumen del pool para los headers de respuesta"""
+        with self._lock:
+            return {
+                'bloques': len(self.bloques),
+                'bytes': self.bytes_retenidos,
+                'desalojos': self.desalojos,
+            }
+
+    def vaciar(self):
+        """Libera todos los bloques retenidos"""
+        with self._lock:
+            bloques = [b for b, _ in self.bloques.values()]
+            self.bloques.clear()
+            self.bytes_retenidos = 0
+        for bloque in bloques:
+            liberar_memoria(bloque)
@@ -0,0 +1,208 @@
+"""
+Instrumentación del lado del servidor en formato Prometheus.
+
+Usa el modo multiproceso de prometheus_client: cada worker de Uvicorn escribe
+sus métricas en archivos de PROMETHEUS_MULTIPROC_DIR y /metrics agrega los de
+todos los workers. Los archivos de corridas anteriores se sumarían a los
+nuevos: el lanzador vacía el directorio antes de crear los workers
+(limpiar_directorio_multiproc); con `uvicorn --workers` hay que vaciarlo a mano.
+"""
+
+import glob
+import os
+import tempfile
+import time
+
+# El directorio debe existir antes de importar prometheus_client
+DIRECTORIO_MULTIPROC = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR',
+    os.path.join(tempfile.gettempdir(), 'proyecto_redes_prometheus')
+)
+os.makedirs(DIRECTORIO_MULTIPROC, exist_ok=True)
+
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter,
+                               Gauge, Histogram, generate_latest, multiprocess)
+
+# Buckets fijos de latencia en segundos (hasta el timeout de 300s del cliente)
+BUCKETS_LATENCIA = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0,
+)
+
+LATENCIA = Histogram(
+    'http_request_duration_seconds',
+    'Latencia de los requests por ruta',
+    ['route', 'method', 'status'],
+    buckets=BUCKETS_LATENCIA,
+)
+
+EN_CURSO = Gauge(
+    'http_requests_in_flight',
+    'Requests en curso por ruta',
+    ['route'],
+    multiprocess_mode='livesum',
+)
+
+BYTES_ENVIADOS = Counter(
+    'http_response_bytes',
+    'Bytes enviados en el cuerpo de las respuestas',
+    ['route'],
+)
+
+TIEMPO_FASE = Counter(
+    'stress_phase_seconds',
+    'Tiempo acumulado por segmento de /stress (cpu, mem, payload)',
+    ['phase'],
+)
+
+EVENTOS_CACHE = Counter(
+    'result_cache_events',
+    'Eventos de la cache de resultados de CPU por capa (local, shared): hit, miss, eviction',
+    ['layer', 'event'],
+)
+
+LAG_LOOP = Histogram(
+    'event_loop_lag_seconds',
+    'Retraso del event loop de cada worker al despertar de un sleep',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+BYTES_PAYLOAD = Counter(
+    'payload_bytes',
+    'Bytes del payload de /stress antes (raw) y después (encoded) de comprimir',
+    ['kind'],
+)
+
+TIEMPO_COMPRESION = Counter(
+    'payload_compression_seconds',
+    'Tiempo acumulado comprimiendo respuestas de /stress',
+)
+
+BYTES_FLUJO = Counter(
+    'stream_bytes',
+    'Bytes enviados por los flujos sostenidos (/stream) por transporte',
+    ['transport'],
+)
+
+TASA_FLUJO = Histogram(
+    'stream_throughput_bytes_per_second',
+    'Tasa lograda por conexión de /stream al cerrarse',
+    ['transport'],
+    buckets=(1e5, 1e6, 5e6, 1e7, 2.5e7, 5e7, 1e8, 2.5e8, 5e8, 1e9, 2.5e9),
+)
+
+# Rutas no registradas en la app se agrupan en esta etiqueta
+RUTA_DESCONOCIDA = 'otro'
+
+# Clave en scope["state"] con el instante (perf_counter_ns) en que se aceptó el request
+CLAVE_ACEPTADO = 't_aceptado_ns'
+
+
+def registrar_fase(fase, segundos):
+    """Suma tiempo a un segmento de /stress"""
+    TIEMPO_FASE.labels(phase=fase).inc(segundos)
+
+
+def registrar_cache(capa, evento, veces=1):
+    """Cuenta hits, misses o desalojos (eviction) de la cache de resultados"""
+    if veces:
+        EVENTOS_CACHE.labels(layer=capa, event=evento).inc(veces)
+
+
+def registrar_lag(segundos):
+    """Observa una muestra del lag del event loop"""
+    LAG_LOOP.observe(segundos)
+
+
+def registrar_compresion(crudos, codificados, segundos):
+    """Suma los tamaños y el tiempo de una respuesta comprimida"""
+    BYTES_PAYLOAD.labels(kind='raw').inc(crudos)
+    BYTES_PAYLOAD.labels(kind='encoded').inc(codificados)
+    TIEMPO_COMPRESION.inc(segundos)
+
+
+def registrar_flujo(transporte, enviados, segundos):
+    """Suma los bytes de un flujo terminado y observa su tasa lograda"""
+    BYTES_FLUJO.labels(transport=transporte).inc(enviados)
+    if segundos > 0:
+        TASA_FLUJO.labels(transport=transporte).observe(enviados / segundos)
+
+
+def espera_en_cola(request, inicio_handler_ns):
+    """Segundos entre que el middleware aceptó el request y el inicio del handler"""
+    aceptado = getattr(request.state, CLAVE_ACEPTADO, inicio_handler_ns)
+    return max(0, inicio_handler_ns - aceptado) / 1e9
+
+
+def server_timing(etapas):
+    """
+    Construye el header Server-Timing a partir de {nombre: segundos}.
+    Ejemplo: "queue;dur=0.120, cpu;dur=512.004"  (dur en milisegundos)
+    """
+    return ", ".join(f"{nombre};dur={segundos * 1000:.3f}" for nombre, segundos in etapas.items())
+
+
+def exportar_metricas():
+    """Texto Prometheus agregado de todos los workers: (contenido, content_type)"""
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def marcar_proceso_terminado(pid=None):
+    """Elimina los gauges 'live' de un worker terminado (por defecto el proceso actual)"""
+    multiprocess.mark_process_dead(os.getpid() if pid is None else pid)
+
+
+def limpiar_directorio_multiproc():
+    """Borra los .db de corridas anteriores (llamar antes de crear los workers)"""
+    for archivo in glob.glob(os.path.join(DIRECTORIO_MULTIPROC, '*.db')):
+        os.remove(archivo)
+
+
+class MiddlewareMetricas:
+    """Middleware ASGI: latencia, requests en curso y bytes enviados por ruta"""
+
+    def __init__(self, app):
+        self.app = app
+        self.rutas = None
+
+    def _ruta(self, scope):
+        """Etiqueta de ruta acotada a las rutas registradas (evita cardinalidad infinita)"""
+        if self.rutas is None:
+            app_principal = scope.get('app')
+            self.rutas = {getattr(r, 'path', None) for r in getattr(app_principal, 'routes', [])}
+        ruta = scope.get('path', '')
+        return ruta if ruta in self.rutas else RUTA_DESCONOCIDA
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        ruta = self._ruta(scope)
+        estado = 500
+        bytes_enviados = 0
+
+        async def send_instrumentado(message):
+            nonlocal estado, bytes_enviados
+            if message['type'] == 'http.response.start':
+                estado = message['status']
+            elif message['type'] == 'http.response.body':
+                bytes_enviados += len(message.get('body', b''))
+            await send(message)
+
+        inicio = time.perf_counter_ns()
+        # Instante de aceptación, leído por los handlers para medir la espera en cola
+        scope.setdefault('state', {})[CLAVE_ACEPTADO] = inicio
+
+        en_curso = EN_CURSO.labels(route=ruta)
+        en_curso.inc()
+
+        try:
+            await self.app(scope, receive, send_instrumentado)
+        finally:
+            duracion = (time.perf_counter_ns() - inicio) / 1e9
+            en_curso.dec()
+            LATENCIA.labels(route=ruta, method=scope['method'], status=str(estado)).observe(duracion)
+            BYTES_ENVIADOS.labels(route=ruta).inc(bytes_enviados)
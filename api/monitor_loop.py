@@ -0,0 +1,81 @@
+"""
+Monitor del retraso (lag) del event loop de cada worker.
+
+Una tarea de fondo duerme `intervalo` segundos y mide cuánto tarde despierta:
+ese retraso es el tiempo que el loop estuvo bloqueado por handlers que no
+ceden el control. Se guardan las últimas `ventana` muestras para percentiles.
+"""
+
+import asyncio
+import time
+from collections import deque
+
+
+def percentil(ordenados, p):
+    """Percentil p (0-100) de una lista ya ordenada"""
+    if not ordenados:
+        return 0.0
+    indice = min(len(ordenados) - 1, int(len(ordenados) * p / 100))
+    return ordenados[indice]
+
+
+class MonitorLag:
+    """Muestreador del lag del event loop en segundo plano"""
+
+    def __init__(self, intervalo=0.05, ventana=1200, al_medir=None):
+        self.intervalo = intervalo
+        self.muestras = deque(maxlen=ventana)
+        # Callback opcional por muestra (p.ej. histograma de Prometheus)
+        self.al_medir = al_medir
+        self.tarea = None
+        self.resumen = self._calcular_resumen()
+
+    def iniciar(self):
+        """Lanza la tarea de muestreo en el loop actual"""
+        if self.tarea is None:
+            self.tarea = asyncio.get_running_loop().create_task(self._muestrear())
+
+    async def detener(self):
+        if self.tarea is not None:
+            self.tarea.cancel()
+            try:
+                await self.tarea
+            except asyncio.CancelledError:
+                pass
+            self.tarea = None
+
+    async def _muestrear(self):
+        contador = 0
+        while True:
+            esperado = time.perf_counter() + self.intervalo
+            await asyncio.sleep(self.intervalo)
+            lag = max(0.0, time.perf_counter() - esperado)
+
+            self.muestras.append(lag)
+            if self.al_medir is not None:
+                self.al_medir(lag)
+
+            # Recalcular percentiles cada 20 muestras (~1s con el intervalo por defecto)
+            contador += 1
+            if contador % 20 == 0:
+                self.resumen = self._calcular_resumen()
+
+    def _calcular_resumen(self):
+        ordenados = sorted(self.muestras)
+        return {
+            'muestras': len(ordenados),
+            'intervalo_seg': self.intervalo,
+            'p50_seg': percentil(ordenados, 50),
+            'p95_seg': percentil(ordenados, 95),
+            'p99_seg': percentil(ordenados, 99),
+            'max_seg': ordenados[-1] if ordenados else 0.0,
+        }
+
+    def headers(self):
+        """Headers con los percentiles más recientes (en milisegundos)"""
+        r = self.resumen
+        return {
+            "X-Loop-Lag-P50": f"{r['p50_seg'] * 1000:.3f}",
+            "X-Loop-Lag-P99": f"{r['p99_seg'] * 1000:.3f}",
+            "X-Loop-Lag-Max": f"{r['max_seg'] * 1000:.3f}",
+        }
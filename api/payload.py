@@ -0,0 +1,148 @@
+"""
+Motores de generación del payload de /stress.
+
+- urandom: os.urandom(response_kb * 1024) por request (comportamiento original)
+- pool:    buffer aleatorio en memoria generado una vez al arrancar
+- mmap:    buffer aleatorio en un archivo temporal mapeado en memoria
+
+Los motores "pool" y "mmap" sirven la respuesta como StreamingResponse de
+vistas (memoryview) del buffer, sin copiar bytes por request, de modo que el
+tiempo hasta el primer byte no crece con response_kb.
+
+Tipos de contenido (qué tan comprimible es el payload):
+- random:     bytes aleatorios (incomprimible)
+- text:       texto con palabras al azar (comprime ~5x con gzip)
+- repetitive: una frase corta repetida (comprime >100x)
+"""
+
+import mmap
+import os
+import random
+import tempfile
+
+MOTORES_PAYLOAD = ('urandom', 'pool', 'mmap')
+CONTENIDOS_PAYLOAD = ('random', 'text', 'repetitive')
+
+# Vocabulario del contenido "text"
+PALABRAS = (
+    "el la de que y en un una los las por con para como pero más servidor red "
+    "latencia carga cliente respuesta paquete nodo proceso memoria tiempo datos "
+    "conexión prueba sistema usuario archivo puerto socket ancho banda retardo"
+).split()
+
+# Bloque base del contenido "text": mayor que la ventana de 32KB de deflate,
+# para que repetirlo no haga el texto artificialmente comprimible
+TAM_BLOQUE_TEXTO = 256 * 1024
+
+FRASE_REPETITIVA = b"proyecto-redes payload repetitivo 0123456789 "
+
+
+def _repetir(bloque, tamano):
+    """Repite bloque hasta completar tamano bytes"""
+    veces = tamano // len(bloque) + 1
+    return (bloque * veces)[:tamano]
+
+
+def generar_contenido(contenido, tamano):
+    """Genera tamano bytes del tipo de contenido indicado"""
+    if contenido == 'random':
+        return os.urandom(tamano)
+
+    if contenido == 'text':
+        palabras = random.choices(PALABRAS, k=TAM_BLOQUE_TEXTO // 6)
+        bloque = " ".join(palabras).encode()
+        return _repetir(bloque, tamano)
+
+    if contenido == 'repetitive':
+        return _repetir(FRASE_REPETITIVA, tamano)
+
+    disponibles = ", ".join(CONTENIDOS_PAYLOAD)
+    raise ValueError(f"Tipo de payload desconocido '{contenido}'. Disponibles: {disponibles}")
+
+
+class PoolPayload:
+    """Buffer de bytes compartido, servido por vistas sin copia"""
+
+    def __init__(self, tamano_bytes, chunk_bytes, contenido='random'):
+        self.tamano_bytes = tamano_bytes
+        self.chunk_bytes = chunk_bytes
+        self.contenido = contenido
+        self.vista = None
+
+    def iniciar(self):
+        """Genera el buffer una sola vez"""
+        if self.vista is None:
+            self.vista = memoryview(generar_contenido(self.contenido, self.tamano_bytes))
+
+    def cerrar(self):
+        """Libera la vista del buffer"""
+        self.vista = None
+
+    def fragmentos(self, total_bytes, offset=None):
+        """
+        Genera vistas del buffer que suman total_bytes.
+        Empieza en `offset` (aleatorio si es None) y da la vuelta al llegar al final.
+        """
+        self.iniciar()
+        vista = self.vista
+        tamano = len(vista)
+        if offset is None:
+            offset = random.randrange(tamano)
+        restante = total_bytes
+
+        while restante > 0:
+            n = min(restante, self.chunk_bytes, tamano - offset)
+            yield vista[offset:offset + n]
+            restante -= n
+            offset = (offset + n) % tamano
+
+    def fragmento(self, tamano):
+        """Una sola vista contigua de `tamano` bytes (como máximo el tamaño del pool)"""
+        self.iniciar()
+        tamano_pool = len(self.vista)
+        if tamano > tamano_pool:
+            raise ValueError(f"fragmento de {tamano} bytes mayor que el pool ({tamano_pool} bytes)")
+        offset = random.randrange(tamano_pool - tamano + 1)
+        return self.vista[offset:offset + tamano]
+
+    async def stream(self, total_bytes):
+        """Iterador asíncrono para StreamingResponse (sin saltos al threadpool)"""
+        for fragmento in self.fragmentos(total_bytes):
+            yield fragmento
+
+
+class PoolPayloadMmap(PoolPayload):
+    """Igual que PoolPayload, pero el buffer vive en un archivo mapeado en memoria"""
+
+    def __init__(self, tamano_bytes, chunk_bytes, contenido='random'):
+        super().__init__(tamano_bytes, chunk_bytes, contenido)
+        self.archivo = None
+        self.mapa = None
+
+    def iniciar(self):
+        if self.vista is not None:
+            return
+
+        self.archivo = tempfile.TemporaryFile()
+        escrito = 0
+        while escrito < self.tamano_bytes:
+            bloque = generar_contenido(self.contenido, min(1024 * 1024, self.tamano_bytes - escrito))
+            self.archivo.write(bloque)
+            escrito += len(bloque)
+        self.archivo.flush()
+
+        self.mapa = mmap.mmap(self.archivo.fileno(), self.tamano_bytes, access=mmap.ACCESS_READ)
+        self.vista = memoryview(self.mapa)
+
+    def cerrar(self):
+        super().cerrar()
+        if self.mapa is not None:
+            try:
+                self.mapa.close()
+            except BufferError:
+                # Aún hay vistas en uso por respuestas en curso
+                pass
+            self.mapa = None
+        if self.archivo is not None:
+            self.archivo.close()
+            self.archivo = None
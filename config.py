@@ -49,6 +49,105 @@ DEFAULT_CPU_ITERATIONS = 500000
 DEFAULT_MEMORY_MB = 10
 DEFAULT_RESPONSE_KB = 512
 
+# =============================================================================
+# CONFIGURACIÓN DE LA API
+# =============================================================================
+
+# Kernel de CPU por defecto para /cpu y /stress (python, numpy, hashlib, zlib)
+DEFAULT_KERNEL = "python"
+
+# Modo de ejecución del segmento de CPU por defecto
+# (thread, process, blocking, cooperative)
+DEFAULT_EXEC_MODE = "thread"
+
+# Milisegundos de cálculo antes de ceder el event loop en mode=cooperative
+DEFAULT_SLICE_MS = 5.0
+
+# Muestreo del lag del event loop: intervalo (s) y muestras guardadas (60s)
+LOOP_LAG_INTERVAL = 0.05
+LOOP_LAG_WINDOW = 1200
+
+# Procesos del pool compartido para mode=process (0 = un proceso por núcleo)
+PROCESS_POOL_WORKERS = 0
+
+# Motor del payload de /stress por defecto (urandom, pool, mmap)
+DEFAULT_PAYLOAD_ENGINE = "urandom"
+
+# Tamaño del buffer aleatorio pregenerado y de cada fragmento enviado
+PAYLOAD_POOL_MB = 8
+PAYLOAD_CHUNK_KB = 64
+
+# Tipo de contenido del payload por defecto (random, text, repetitive)
+DEFAULT_PAYLOAD_TYPE = "random"
+
+# Nivel de compresión (0-9) con compress=true y tamaño de la cache de precomprimidos
+COMPRESSION_LEVEL = 6
+PRECOMPRESSED_CACHE_MB = 64
+
+# Motor de memoria de /stress por defecto (chunks, bytearray, mmap)
+DEFAULT_MEMORY_ENGINE = "chunks"
+
+# Techo de la memoria retenida entre requests (retain=true) por proceso
+MEMORY_RETAIN_LIMIT_MB = 512
+
+# -----------------------------------------------------------------------------
+# Control de admisión (load shedding) para /stress y /cpu, por worker
+# -----------------------------------------------------------------------------
+ADMISSION_ENABLED = False
+
+# fijo = límite constante | aimd = aumento aditivo / reducción multiplicativa
+# gradient = ajuste por gradiente de latencia (mínima / suavizada)
+ADMISSION_MODE = "fijo"
+
+# Requests concurrentes admitidos (límite inicial en los modos adaptativos)
+ADMISSION_LIMIT = 32
+
+# Requests que pueden esperar cupo y segundos máximos de espera antes del 503
+ADMISSION_QUEUE_SIZE = 64
+ADMISSION_QUEUE_TIMEOUT = 5.0
+
+# Latencia de servicio objetivo (s) del modo aimd y rango del límite adaptativo
+ADMISSION_TARGET_LATENCY = 1.0
+ADMISSION_MIN_LIMIT = 1
+ADMISSION_MAX_LIMIT = 256
+
+# Valor del header Retry-After (s) en las respuestas 503
+ADMISSION_RETRY_AFTER = 1
+
+# -----------------------------------------------------------------------------
+# Cache de resultados de CPU para /cpu y /stress
+# -----------------------------------------------------------------------------
+# bypass = sin cache | local = LRU por worker | shared = LRU + cache entre workers
+DEFAULT_CACHE_MODE = "bypass"
+
+# Entradas máximas de la LRU local y vida de cada entrada (ambas capas)
+CACHE_MAX_ENTRIES = 1024
+CACHE_TTL_SECONDS = 300
+
+# Archivo en /dev/shm y número de slots de la cache compartida
+SHARED_CACHE_NAME = "proyecto_redes_cache"
+SHARED_CACHE_SLOTS = 4096
+
+# Máximo de cargas por request en POST /stress/batch
+BATCH_MAX_ITEMS = 64
+
+# Duración máxima (s) de una conexión de /stream y /stream/ws
+STREAM_MAX_SECONDS = 300
+
+# -----------------------------------------------------------------------------
+# Lanzador pre-fork (python api/main.py)
+# -----------------------------------------------------------------------------
+# Puerto de la API y número de workers (0 = uno por núcleo disponible)
+API_PORT = 5000
+API_WORKERS = 1
+
+# Fijar cada worker a un núcleo (sched_setaffinity)
+API_PIN_CPUS = False
+
+# Reinicio ordenado de un worker tras N requests o al superar el RSS (0 = sin límite)
+API_MAX_REQUESTS_PER_WORKER = 0
+API_MAX_RSS_MB = 0
+
 # =============================================================================
 # CONFIGURACIÓN DE MONITOREO
 # =============================================================================
@@ -64,10 +163,96 @@ GRAPHS_DIR = "graficos"
 # FASES DE RAMP-UP GRADUAL
 # =============================================================================
 
+# "tasa" = requests/s que se programan en modo abierto (en modo cerrado no se usa)
+#
+# Una fase puede llevar "mezcla" en vez de cpu/ram/red: clases de request con
+# peso y parámetros fijos o con distribución (fija, uniforme, lognormal), p.ej.
+#   {"nombre": "Mixta", "usuarios": 100, "duracion": 60, "tasa": 50, "mezcla": [
+#       {"nombre": "health", "endpoint": "/health", "peso": 60},
+#       {"nombre": "cpu", "endpoint": "/cpu", "peso": 30,
+#        "params": {"iteraciones": {"dist": "lognormal", "mediana": 200000, "sigma": 0.8}}},
+#       {"nombre": "stress", "endpoint": "/stress", "peso": 10,
+#        "params": {"cpu_iterations": 500000, "memory_mb": {"dist": "uniforme", "min": 5, "max": 20},
+#                   "response_kb": {"dist": "lognormal", "mediana": 256, "sigma": 1.0, "max": 4096}}},
+#   ]}
 RAMPUP_PHASES = [
-    {"nombre": "Baseline",    "usuarios": 10,  "duracion": 30, "cpu": 100000,  "ram": 5,  "red": 256},
-    {"nombre": "Moderada",    "usuarios": 50,  "duracion": 30, "cpu": 300000,  "ram": 10, "red": 512},
-    {"nombre": "Alta",        "usuarios": 100, "duracion": 30, "cpu": 500000,  "ram": 15, "red": 768},
-    {"nombre": "Sobrecarga",  "usuarios": 200, "duracion": 60, "cpu": 750000,  "ram": 20, "red": 1024},
-    {"nombre": "Saturacion",  "usuarios": 500, "duracion": 60, "cpu": 1000000, "ram": 25, "red": 1024},
+    {"nombre": "Baseline",    "usuarios": 10,  "duracion": 30, "cpu": 100000,  "ram": 5,  "red": 256,  "tasa": 5},
+    {"nombre": "Moderada",    "usuarios": 50,  "duracion": 30, "cpu": 300000,  "ram": 10, "red": 512,  "tasa": 20},
+    {"nombre": "Alta",        "usuarios": 100, "duracion": 30, "cpu": 500000,  "ram": 15, "red": 768,  "tasa": 40},
+    {"nombre": "Sobrecarga",  "usuarios": 200, "duracion": 60, "cpu": 750000,  "ram": 20, "red": 1024, "tasa": 80},
+    {"nombre": "Saturacion",  "usuarios": 500, "duracion": 60, "cpu": 1000000, "ram": 25, "red": 1024, "tasa": 200},
 ]
+
+# cerrado = oleadas de `usuarios` requests (cada oleada espera a la anterior)
+# abierto = llegadas a `tasa` req/s sin importar cuántos requests siguen en vuelo
+LOAD_TEST_MODE = "cerrado"
+
+# Proceso de llegadas del modo abierto: constante o poisson
+ARRIVAL_PROCESS = "constante"
+
+# Procesos generadores de carga, cada uno con su event loop (1 = un solo proceso)
+LOAD_TEST_PROCESSES = 1
+
+# Histogramas de latencia de las pruebas de carga: dígitos de precisión
+# (2 = error < 1%) y ancho de cada ventana de tiempo en segundos
+HISTOGRAM_PRECISION = 2
+HISTOGRAM_WINDOW_SECONDS = 5
+
+# Guardar además una fila por request (archivo .bin de ancho fijo, escrito
+# desde un hilo) y exportarla al final al CSV de resultados (lo usa graficar.py)
+RAW_RESULTS = True
+RESULTS_EXPORT_CSV = True
+
+# Pool de conexiones del cliente (una sesión por proceso generador):
+# límite total y por host (0 = sin límite), segundos que una conexión ociosa
+# sigue abierta, TTL del cache de DNS (0 = sin cache) y force_close para
+# abrir una conexión nueva por request (sin keep-alive)
+CLIENT_LIMIT = 0
+CLIENT_LIMIT_PER_HOST = 0
+CLIENT_KEEPALIVE_TIMEOUT = 15
+CLIENT_DNS_CACHE_TTL = 300
+CLIENT_FORCE_CLOSE = False
+
+# Lectura del cuerpo de las respuestas en los clientes de carga:
+# 'streaming' = se cuenta por fragmentos y se descarta (memoria plana)
+# 'completo'  = response.read() (todo el cuerpo en memoria)
+# BODY_CHECKSUM calcula además el CRC32 de lo recibido
+BODY_CONSUMPTION = "streaming"
+BODY_CHECKSUM = False
+
+# Búsqueda automática de capacidad (scripts/buscar_capacidad.py). La carga que
+# se varía es la tasa en req/s (LOAD_TEST_MODE = 'abierto') o los usuarios
+# concurrentes (modo 'cerrado'). Se busca la mayor carga que cumple el SLO.
+CAPACITY_SEARCH = "escalones"       # 'escalones' | 'binaria'
+CAPACITY_SLO_P99 = 0.5              # segundos
+CAPACITY_SLO_ERROR_RATE = 0.01      # fracción de requests fallidos
+CAPACITY_START = 10
+CAPACITY_STEP = 10                  # incremento de cada escalón
+CAPACITY_MAX = 1000
+CAPACITY_TOLERANCE = 0.05           # binaria: ancho relativo final del intervalo
+CAPACITY_PROBE_SECONDS = 30         # duración de cada punto medido
+CAPACITY_COOLDOWN_SECONDS = 5       # pausa entre puntos para vaciar colas
+CAPACITY_PARAMS = {"cpu": 300000, "ram": 10, "red": 512}
+
+# Modo distribuido (scripts/distribuido.py): el coordinador espera
+# DISTRIBUTED_AGENTS agentes en DISTRIBUTED_PORT y les reparte cada fase;
+# todos arrancan DISTRIBUTED_START_MARGIN segundos después de la orden
+DISTRIBUTED_PORT = 7700
+DISTRIBUTED_AGENTS = 2
+DISTRIBUTED_START_MARGIN = 2.0
+
+# Métricas del cliente en vivo: cada proceso generador manda por UDP al
+# dashboard un resumen por intervalo (rps, errores, histograma de latencia).
+# LIVE_METRICS_HOST = None usa el host de SERVER_URL
+LIVE_METRICS = True
+LIVE_METRICS_HOST = None
+LIVE_METRICS_PORT = 5002
+LIVE_METRICS_INTERVAL = 1.0
+
+# Reproducción de una prueba grabada (scripts/reproducir.py): los mismos
+# requests en los mismos instantes relativos. REPLAY_SPEED > 1 comprime el
+# tiempo (2.0 = el doble de rápido). REPLAY_REORDER_WINDOW: segundos de filas
+# que se ordenan por instante de envío (el log se escribe al completar cada
+# request; debe ser mayor que el timeout de los requests)
+REPLAY_SPEED = 1.0
+REPLAY_REORDER_WINDOW = 310
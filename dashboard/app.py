@@ -14,6 +14,7 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from metrics_reader import get_all_metrics
+from client_metrics import get_client_metrics, start_receiver, LIVE_METRICS_PORT
 
 app = Flask(__name__)
 
@@ -21,6 +22,13 @@ app = Flask(__name__)
 UPDATE_INTERVAL = 2
 
 
+def collect_metrics():
+    """Métricas del servidor (CSVs) más las del cliente de carga (UDP)"""
+    metrics = get_all_metrics()
+    metrics['client'] = get_client_metrics()
+    return metrics
+
+
 @app.route('/')
 def index():
     """Página principal del dashboard"""
@@ -30,7 +38,7 @@ def index():
 @app.route('/api/metrics')
 def api_metrics():
     """Endpoint REST para obtener métricas actuales"""
-    return jsonify(get_all_metrics())
+    return jsonify(collect_metrics())
 
 
 @app.route('/api/stream')
@@ -42,7 +50,7 @@ def stream():
     def generate():
         while True:
             try:
-                metrics = get_all_metrics()
+                metrics = collect_metrics()
                 # Formato SSE: data: {json}\n\n
                 yield f"data: {json.dumps(metrics)}\n\n"
                 time.sleep(UPDATE_INTERVAL)
@@ -77,6 +85,11 @@ if __name__ == '__main__':
     print("="*60)
     print(f"\n  URL: http://localhost:5001")
     print(f"  Intervalo de actualización: {UPDATE_INTERVAL}s")
+    try:
+        start_receiver()
+        print(f"  Métricas del cliente: UDP {LIVE_METRICS_PORT}")
+    except OSError as e:
+        print(f"  Métricas del cliente desactivadas: {e}")
     print("\n  Presiona Ctrl+C para detener")
     print("="*60 + "\n")
 
@@ -0,0 +1,131 @@
+"""
+Receptor de métricas del cliente (pruebas de carga) en tiempo real.
+
+Los generadores de carga mandan por UDP un resumen por intervalo (ver
+scripts/metricas_vivas.py). Un hilo los recibe y suma los histogramas de
+todos los procesos/agentes del mismo intervalo; get_client_metrics() arma
+las series de rps, tasa de errores y p50/p95/p99 para el dashboard.
+"""
+
+import os
+import sys
+import json
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+# Raíz del proyecto (config.py) y scripts/ (histograma.py)
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'scripts'))
+
+try:
+    from config import LIVE_METRICS_PORT
+except ImportError:
+    LIVE_METRICS_PORT = 5002
+
+from histograma import Histograma
+
+# Intervalos que se guardan (mismo largo que el historial de metrics_reader)
+MAX_HISTORY = 100
+
+# Segundos sin datos para considerar que no hay prueba en curso
+IDLE_SECONDS = 10
+
+# Margen para que lleguen los datagramas de todos los procesos de un intervalo
+GRACE_SECONDS = 1.5
+
+# {inicio_intervalo: {'intervalo', 'total', 'errores', 'latencia', 'fases', 'origenes'}}
+intervals = OrderedDict()
+lock = threading.Lock()
+last_received = 0.0
+receiver_thread = None
+
+
+def _merge(datos):
+    global last_received
+    inicio = round(datos['inicio'], 3)
+    latencia = Histograma.desde_dict(datos['latencia'])
+
+    with lock:
+        last_received = time.time()
+        actual = intervals.get(inicio)
+        if actual is None:
+            actual = intervals[inicio] = {
+                'intervalo': datos['intervalo'],
+                'total': 0,
+                'errores': 0,
+                'latencia': Histograma(latencia.digitos, latencia.minimo, latencia.maximo),
+                'fases': set(),
+                'origenes': set(),
+            }
+            # Los datagramas pueden llegar desordenados
+            if len(intervals) > 1 and inicio < next(reversed(intervals)):
+                for clave in sorted(intervals):
+                    intervals.move_to_end(clave)
+            while len(intervals) > MAX_HISTORY:
+                intervals.popitem(last=False)
+
+        actual['total'] += datos['total']
+        actual['errores'] += datos['errores']
+        if actual['latencia'].compatible(latencia):
+            actual['latencia'].fusionar(latencia)
+        actual['fases'].add(datos['fase'])
+        actual['origenes'].add(datos['origen'])
+
+
+def _receive_loop(sock):
+    while True:
+        try:
+            paquete, _ = sock.recvfrom(65535)
+            _merge(json.loads(paquete))
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Error reading CLIENT metrics: {e}")
+
+
+def start_receiver(port=LIVE_METRICS_PORT):
+    """Escucha los datagramas UDP en un hilo de fondo (una sola vez)"""
+    global receiver_thread
+    if receiver_thread is not None:
+        return
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('0.0.0.0', port))
+    receiver_thread = threading.Thread(target=_receive_loop, args=(sock,),
+                                       name="client-metrics", daemon=True)
+    receiver_thread.start()
+
+
+def get_client_metrics():
+    """Último intervalo completo y series de los últimos MAX_HISTORY intervalos"""
+    ahora = time.time()
+    history = {'rps': [], 'error_rate': [], 'p50': [], 'p95': [], 'p99': []}
+    latest = None
+
+    with lock:
+        active = ahora - last_received < IDLE_SECONDS
+        for inicio, datos in intervals.items():
+            # El intervalo en curso (o recién cerrado) todavía puede recibir datos
+            if inicio + datos['intervalo'] + GRACE_SECONDS > ahora:
+                break
+            p = datos['latencia'].percentiles((50, 95, 99))
+            latest = {
+                'rps': round(datos['total'] / datos['intervalo'], 1),
+                'error_rate': round(datos['errores'] / datos['total'] * 100, 1) if datos['total'] else 0,
+                'p50_ms': round(p[50] * 1000, 1),
+                'p95_ms': round(p[95] * 1000, 1),
+                'p99_ms': round(p[99] * 1000, 1),
+                'phase': ', '.join(sorted(datos['fases'])),
+                'sources': len(datos['origenes']),
+            }
+            history['rps'].append(latest['rps'])
+            history['error_rate'].append(latest['error_rate'])
+            history['p50'].append(latest['p50_ms'])
+            history['p95'].append(latest['p95_ms'])
+            history['p99'].append(latest['p99_ms'])
+
+    return {
+        'active': active,
+        'latest': latest,
+        'history': history,
+    }
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Búsqueda automática de capacidad del servidor.
+
+En vez de editar RAMPUP_PHASES a mano y leer los gráficos, sube la carga
+ofrecida (tasa de llegadas en modo abierto, usuarios concurrentes en modo
+cerrado) por escalones o por búsqueda binaria, midiendo cada punto con el
+mismo generador de load_test_gradual.py, hasta encontrar la mayor carga que
+cumple el SLO (p99 y tasa de errores).
+
+Reporta la curva latencia/throughput, el punto de quiebre (mayor throughput
+sostenible dentro del SLO) y la concurrencia que predice la ley de Little
+para ese punto: L = X * W (throughput por tiempo de respuesta medio).
+
+Configuración: CAPACITY_* y LOAD_TEST_MODE en config.py
+"""
+
+import asyncio
+import csv
+import sys
+import os
+
+# Agregar el directorio padre al path para importar config
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from config import (CAPACITY_SEARCH, CAPACITY_SLO_P99, CAPACITY_SLO_ERROR_RATE,
+                        CAPACITY_START, CAPACITY_STEP, CAPACITY_MAX, CAPACITY_TOLERANCE,
+                        CAPACITY_PROBE_SECONDS, CAPACITY_COOLDOWN_SECONDS, CAPACITY_PARAMS)
+except ImportError:
+    CAPACITY_SEARCH = "escalones"
+    CAPACITY_SLO_P99 = 0.5
+    CAPACITY_SLO_ERROR_RATE = 0.01
+    CAPACITY_START = 10
+    CAPACITY_STEP = 10
+    CAPACITY_MAX = 1000
+    CAPACITY_TOLERANCE = 0.05
+    CAPACITY_PROBE_SECONDS = 30
+    CAPACITY_COOLDOWN_SECONDS = 5
+    CAPACITY_PARAMS = {"cpu": 300000, "ram": 10, "red": 512}
+
+from load_test_gradual import (ENDPOINT, LOAD_TEST_MODE, SERVER_URL, cerrar_generadores,
+                               ejecutar_fase, iniciar_generadores)
+
+CURVE_FILE = "capacidad_curva.csv"
+
+
+def ajustar(carga):
+    """Usuarios enteros en modo cerrado; req/s con dos decimales en modo abierto"""
+    if LOAD_TEST_MODE == 'abierto':
+        return round(carga, 2)
+    return max(1, int(round(carga)))
+
+
+def unidad():
+    return "req/s" if LOAD_TEST_MODE == 'abierto' else "usuarios"
+
+
+def crear_fase(carga):
+    """Fase de RAMPUP_PHASES para un punto de la búsqueda (sin log crudo por request)"""
+    return {
+        "nombre": f"carga-{carga:g}",
+        "usuarios": max(1, int(carga)),
+        "tasa": carga,
+        "duracion": CAPACITY_PROBE_SECONDS,
+        "crudos": False,
+        **CAPACITY_PARAMS,
+    }
+
+
+async def medir(carga, generadores):
+    """Corre un punto de carga y retorna sus métricas y si cumple el SLO"""
+    fase = crear_fase(carga)
+    stats = {}
+    await ejecutar_fase(fase, stats, generadores)
+    s = stats[fase['nombre']]
+
+    total = s['total']
+    errores = s['fallidos'] / total if total else 1.0
+    # Throughput útil: solo los exitosos
+    throughput = s.get('tasa_lograda', 0.0) * s['exitosos'] / total if total else 0.0
+    punto = {
+        'carga': carga,
+        'throughput': throughput,
+        'media': s.get('tiempo_mean', 0.0),
+        'p50': s.get('tiempo_median', 0.0),
+        'p95': s.get('tiempo_p95', 0.0),
+        'p99': s.get('tiempo_p99', float('inf')),
+        'errores': errores,
+    }
+    punto['cumple'] = punto['p99'] <= CAPACITY_SLO_P99 and errores <= CAPACITY_SLO_ERROR_RATE
+    # Ley de Little: requests en el sistema = throughput * tiempo en el sistema
+    punto['concurrencia_little'] = throughput * punto['media']
+
+    print(f"\n  >> Carga {carga:g} {unidad()}: throughput {throughput:.1f} req/s | "
+          f"p99 {punto['p99']:.3f}s | errores {errores*100:.1f}% -> "
+          f"{'CUMPLE' if punto['cumple'] else 'NO CUMPLE'} el SLO")
+
+    # Dejar que el servidor vacíe sus colas antes del siguiente punto
+    await asyncio.sleep(CAPACITY_COOLDOWN_SECONDS)
+    return punto
+
+
+async def buscar_escalones(generadores, curva):
+    """Sube CAPACITY_STEP por punto hasta violar el SLO o llegar a CAPACITY_MAX"""
+    carga = ajustar(CAPACITY_START)
+    while carga <= CAPACITY_MAX:
+        punto = await medir(carga, generadores)
+        curva.append(punto)
+        if not punto['cumple']:
+            return
+        carga = ajustar(carga + CAPACITY_STEP)
+
+
+async def buscar_binaria(generadores, curva):
+    """
+    Duplica la carga hasta violar el SLO y luego biseca el intervalo
+    [último que cumple, primero que no] hasta CAPACITY_TOLERANCE.
+    """
+    bajo = alto = None
+    carga = ajustar(CAPACITY_START)
+    while True:
+        punto = await medir(carga, generadores)
+        curva.append(punto)
+        if not punto['cumple']:
+            alto = carga
+            break
+        bajo = carga
+        if carga >= CAPACITY_MAX:
+            return
+        carga = min(ajustar(carga * 2), CAPACITY_MAX)
+
+    if bajo is None:
+        return
+
+    while (alto - bajo) / bajo > CAPACITY_TOLERANCE:
+        medio = ajustar((bajo + alto) / 2)
+        if medio in (bajo, alto):
+            return
+        punto = await medir(medio, generadores)
+        curva.append(punto)
+        if punto['cumple']:
+            bajo = medio
+        else:
+            alto = medio
+
+
+def guardar_curva(curva):
+    with open(CURVE_FILE, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['carga', 'unidad', 'throughput', 'media', 'p50', 'p95', 'p99',
+                         'tasa_errores', 'cumple_slo', 'concurrencia_little'])
+        for p in sorted(curva, key=lambda p: p['carga']):
+            writer.writerow([p['carga'], unidad(), round(p['throughput'], 3), round(p['media'], 6),
+                             round(p['p50'], 6), round(p['p95'], 6), round(p['p99'], 6),
+                             round(p['errores'], 6), p['cumple'], round(p['concurrencia_little'], 2)])
+
+
+def imprimir_resultado(curva):
+    print(f"\n{'#'*70}")
+    print(f"#  CURVA LATENCIA / THROUGHPUT")
+    print(f"{'#'*70}")
+    print(f"{'Carga':>10} {'Throughput':>12} {'Media':>9} {'P99':>9} {'Errores':>8} {'SLO':>5}")
+    print(f"{'-'*10} {'-'*12} {'-'*9} {'-'*9} {'-'*8} {'-'*5}")
+    for p in sorted(curva, key=lambda p: p['carga']):
+        print(f"{p['carga']:>10g} {p['throughput']:>8.1f}r/s {p['media']:>8.3f}s {p['p99']:>8.3f}s "
+              f"{p['errores']*100:>7.1f}% {'ok' if p['cumple'] else 'X':>5}")
+
+    validos = [p for p in curva if p['cumple']]
+    if not validos:
+        print(f"\nNingún punto cumple el SLO: bajar CAPACITY_START "
+              f"(p99 <= {CAPACITY_SLO_P99}s, errores <= {CAPACITY_SLO_ERROR_RATE*100:.1f}%)")
+        return
+
+    quiebre = max(validos, key=lambda p: p['throughput'])
+    print(f"\nPunto de quiebre (mayor throughput dentro del SLO):")
+    print(f"   Carga ofrecida: {quiebre['carga']:g} {unidad()}")
+    print(f"   Throughput: {quiebre['throughput']:.1f} req/s")
+    print(f"   Tiempo medio: {quiebre['media']:.3f}s | p99: {quiebre['p99']:.3f}s")
+    print(f"   Ley de Little: L = X * W = {quiebre['throughput']:.1f} * {quiebre['media']:.3f}s "
+          f"= {quiebre['concurrencia_little']:.1f} requests en el sistema")
+    if LOAD_TEST_MODE == 'cerrado':
+        print(f"   (concurrencia real del generador: {quiebre['carga']:g} usuarios)")
+
+    fallidos = [p for p in curva if not p['cumple'] and p['carga'] > quiebre['carga']]
+    if fallidos:
+        limite = min(fallidos, key=lambda p: p['carga'])
+        print(f"   Primer punto fuera del SLO: {limite['carga']:g} {unidad()} "
+              f"(p99 {limite['p99']:.3f}s, errores {limite['errores']*100:.1f}%)")
+    elif quiebre['carga'] >= CAPACITY_MAX:
+        print(f"   Se llegó a CAPACITY_MAX sin violar el SLO: la capacidad real es mayor")
+
+
+async def ejecutar_busqueda():
+    print(f"\n{'#'*70}")
+    print(f"#  BÚSQUEDA DE CAPACIDAD")
+    print(f"{'#'*70}")
+    print(f"\nServidor: {SERVER_URL}{ENDPOINT}")
+    print(f"Modo: {LOAD_TEST_MODE} (carga en {unidad()}) | Búsqueda: {CAPACITY_SEARCH}")
+    print(f"SLO: p99 <= {CAPACITY_SLO_P99}s y errores <= {CAPACITY_SLO_ERROR_RATE*100:.1f}%")
+    print(f"Rango: {CAPACITY_START:g} .. {CAPACITY_MAX:g} | {CAPACITY_PROBE_SECONDS}s por punto")
+
+    curva = []
+    generadores = iniciar_generadores()
+    try:
+        if CAPACITY_SEARCH == 'binaria':
+            await buscar_binaria(generadores, curva)
+        else:
+            await buscar_escalones(generadores, curva)
+    except KeyboardInterrupt:
+        print("\n\nBúsqueda interrumpida por el usuario")
+    finally:
+        await cerrar_generadores(generadores)
+
+    if curva:
+        guardar_curva(curva)
+        imprimir_resultado(curva)
+        print(f"\nCurva guardada en: {CURVE_FILE}")
+    print(f"{'#'*70}\n")
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(ejecutar_busqueda())
+    except KeyboardInterrupt:
+        print("\n\nBúsqueda cancelada\n")
@@ -0,0 +1,249 @@
+"""
+Pool de conexiones HTTP compartido por todos los usuarios simulados.
+
+Una sola ClientSession (y un solo TCPConnector) por proceso generador, con
+límites, keep-alive y cache de DNS configurables en config.py. Un TraceConfig
+cuenta cuántas conexiones se abrieron y cuántas se reutilizaron, para medir el
+beneficio del keep-alive (o su ausencia con CLIENT_FORCE_CLOSE = True).
+
+Otro TraceConfig desglosa cada request (TiemposRequest): espera en el pool,
+DNS, connect, envío, espera de la respuesta y transferencia del cuerpo.
+
+consumir_cuerpo() drena las respuestas por fragmentos en vez de leerlas enteras.
+"""
+
+import os
+import sys
+import time
+import zlib
+
+import aiohttp
+
+# Agregar el directorio padre al path para importar config
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from config import (CLIENT_LIMIT, CLIENT_LIMIT_PER_HOST, CLIENT_KEEPALIVE_TIMEOUT,
+                        CLIENT_DNS_CACHE_TTL, CLIENT_FORCE_CLOSE)
+except ImportError:
+    CLIENT_LIMIT = 0
+    CLIENT_LIMIT_PER_HOST = 0
+    CLIENT_KEEPALIVE_TIMEOUT = 15
+    CLIENT_DNS_CACHE_TTL = 300
+    CLIENT_FORCE_CLOSE = False
+
+try:
+    from config import BODY_CONSUMPTION, BODY_CHECKSUM
+except ImportError:
+    BODY_CONSUMPTION = "streaming"
+    BODY_CHECKSUM = False
+
+
+class ContadorConexiones:
+    """Conexiones nuevas y reutilizadas (se puede sumar entre procesos)"""
+
+    def __init__(self, nuevas=0, reusadas=0):
+        self.nuevas = nuevas
+        self.reusadas = reusadas
+
+    def trace_config(self):
+        trace = aiohttp.TraceConfig()
+
+        async def al_crear(session, contexto, params):
+            self.nuevas += 1
+
+        async def al_reusar(session, contexto, params):
+            self.reusadas += 1
+
+        trace.on_connection_create_end.append(al_crear)
+        trace.on_connection_reuseconn.append(al_reusar)
+        return trace
+
+    def copia(self):
+        return ContadorConexiones(self.nuevas, self.reusadas)
+
+    def diferencia(self, anterior):
+        """Conexiones contadas desde la copia `anterior`"""
+        return ContadorConexiones(self.nuevas - anterior.nuevas, self.reusadas - anterior.reusadas)
+
+    def fusionar(self, otro):
+        self.nuevas += otro.nuevas
+        self.reusadas += otro.reusadas
+        return self
+
+    def resumen(self):
+        total = self.nuevas + self.reusadas
+        reuso = self.reusadas / total * 100 if total else 0.0
+        return f"Conexiones nuevas: {self.nuevas} | reutilizadas: {self.reusadas} ({reuso:.1f}% reuso)"
+
+
+def crear_connector():
+    """TCPConnector según la configuración CLIENT_*"""
+    opciones = {
+        'limit': CLIENT_LIMIT,
+        'limit_per_host': CLIENT_LIMIT_PER_HOST,
+        'ttl_dns_cache': CLIENT_DNS_CACHE_TTL,
+        'use_dns_cache': CLIENT_DNS_CACHE_TTL > 0,
+    }
+    # aiohttp no admite keepalive_timeout junto con force_close
+    if CLIENT_FORCE_CLOSE:
+        opciones['force_close'] = True
+    else:
+        opciones['keepalive_timeout'] = CLIENT_KEEPALIVE_TIMEOUT
+    return aiohttp.TCPConnector(**opciones)
+
+
+# Componentes del desglose de cada request (columnas y histogramas)
+FASES_RED = ('pool_wait', 'dns_time', 'connect_time', 'send_time', 'wait_time', 'transfer_time')
+
+
+ETIQUETAS_RED = {
+    'pool_wait': 'pool',
+    'dns_time': 'dns',
+    'connect_time': 'connect',
+    'send_time': 'envío',
+    'wait_time': 'espera',
+    'transfer_time': 'transferencia',
+}
+
+
+def resumen_desglose(desglose):
+    """Línea 'componente p50/p99' para {campo: Histograma} (RegistroResultados.desglose)"""
+    return " | ".join(
+        f"{ETIQUETAS_RED.get(campo, campo)} {h.percentil(50):.3f}/{h.percentil(99):.3f}s"
+        for campo, h in desglose.items()
+    )
+
+
+class TiemposRequest:
+    """
+    Marcas de tiempo (perf_counter) de un request, llenadas por los hooks de
+    trace_tiempos() al pasarla como trace_request_ctx, más el primer y el
+    último byte que marca quien lee la respuesta.
+    """
+
+    __slots__ = ('marcas',)
+
+    def __init__(self):
+        self.marcas = {}
+
+    def marcar(self, nombre):
+        self.marcas[nombre] = time.perf_counter()
+
+    def _duracion(self, inicio, fin):
+        if inicio in self.marcas and fin in self.marcas:
+            return max(self.marcas[fin] - self.marcas[inicio], 0.0)
+        return 0.0
+
+    def desglose(self):
+        """
+        {componente: segundos}:
+          pool_wait     espera de una conexión libre en el pool (CLIENT_LIMIT*)
+          dns_time      resolución DNS (0 con el cache)
+          connect_time  TCP (y TLS) de una conexión nueva, sin el DNS
+          send_time     escritura del request ya con conexión
+          wait_time     de enviado el request a recibir los headers (Nginx + app + red)
+          transfer_time del primer al último byte del cuerpo
+        """
+        dns = self._duracion('dns_inicio', 'dns_fin')
+        # Con conexión reutilizada no hay create: se parte de cuando salió del pool
+        conexion = 'conexion' if 'conexion' in self.marcas else 'inicio'
+        enviado = 'enviado' if 'enviado' in self.marcas else conexion
+        return {
+            'pool_wait': self._duracion('cola_inicio', 'cola_fin'),
+            'dns_time': dns,
+            'connect_time': max(self._duracion('crear_inicio', 'crear_fin') - dns, 0.0),
+            'send_time': self._duracion(conexion, enviado),
+            'wait_time': self._duracion(enviado, 'primer_byte'),
+            'transfer_time': self._duracion('primer_byte', 'ultimo_byte'),
+        }
+
+
+def trace_tiempos():
+    """TraceConfig que marca las etapas en la TiemposRequest del request (si la tiene)"""
+    trace = aiohttp.TraceConfig()
+
+    def marca(nombre):
+        async def hook(session, contexto, params):
+            tiempos = contexto.trace_request_ctx
+            if isinstance(tiempos, TiemposRequest):
+                tiempos.marcar(nombre)
+        return hook
+
+    for senal, nombre in (
+        ('on_request_start', 'inicio'),
+        ('on_connection_queued_start', 'cola_inicio'),
+        ('on_connection_queued_end', 'cola_fin'),
+        ('on_dns_resolvehost_start', 'dns_inicio'),
+        ('on_dns_resolvehost_end', 'dns_fin'),
+        ('on_connection_create_start', 'crear_inicio'),
+        ('on_connection_create_end', 'conexion'),
+        ('on_connection_reuseconn', 'conexion'),
+        # on_request_headers_sent no existe en aiohttp < 3.8
+        ('on_request_headers_sent', 'enviado'),
+    ):
+        if hasattr(trace, senal):
+            getattr(trace, senal).append(marca(nombre))
+    # crear_fin es la misma marca que conexion, pero solo para conexiones nuevas
+    trace.on_connection_create_end.append(marca('crear_fin'))
+    return trace
+
+
+# Sesión única del proceso (se crea en el primer uso, dentro del event loop)
+_sesion = None
+_contador = None
+
+
+async def sesion_compartida():
+    """Retorna (session, contador) compartidos por todo el proceso"""
+    global _sesion, _contador
+    if _sesion is None or _sesion.closed:
+        _contador = ContadorConexiones()
+        _sesion = aiohttp.ClientSession(
+            connector=crear_connector(),
+            trace_configs=[_contador.trace_config(), trace_tiempos()],
+        )
+    return _sesion, _contador
+
+
+async def cerrar_sesion_compartida():
+    global _sesion
+    if _sesion is not None and not _sesion.closed:
+        await _sesion.close()
+    _sesion = None
+
+
+def descripcion_pool():
+    """Línea con la configuración del pool para el encabezado de las pruebas"""
+    if CLIENT_FORCE_CLOSE:
+        keepalive = "desactivado (force_close)"
+    else:
+        keepalive = f"{CLIENT_KEEPALIVE_TIMEOUT}s"
+    return (f"Pool de conexiones: límite {CLIENT_LIMIT or 'sin límite'} | "
+            f"por host {CLIENT_LIMIT_PER_HOST or 'sin límite'} | keep-alive {keepalive} | "
+            f"cache DNS {CLIENT_DNS_CACHE_TTL}s")
+
+
+async def consumir_cuerpo(response, modo=BODY_CONSUMPTION, verificar=BODY_CHECKSUM):
+    """
+    Lee el cuerpo de la respuesta hasta el final sin juntarlo en memoria.
+
+    modo 'streaming': cada fragmento que entrega el socket se cuenta (y se
+    suma al CRC32 si verificar) y se descarta; la memoria del cliente no crece
+    con response_kb. modo 'completo': response.read() como antes.
+
+    Retorna: (bytes_recibidos, crc32 o 0)
+    """
+    crc = 0
+    if modo == 'completo':
+        datos = await response.read()
+        if verificar:
+            crc = zlib.crc32(datos)
+        return len(datos), crc
+
+    recibidos = 0
+    async for fragmento in response.content.iter_any():
+        recibidos += len(fragmento)
+        if verificar:
+            crc = zlib.crc32(fragmento, crc)
+    return recibidos, crc
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga gradual distribuida: un coordinador y varios agentes por TCP.
+
+Un solo host generador comparte red (y CPU) con todo lo demás; aquí cada
+agente (otro proceso en localhost u otra máquina) genera su parte de la carga
+y el coordinador junta los histogramas en un único reporte por fase.
+
+Protocolo (tramas [uint32 largo][JSON]):
+    agente -> coordinador  {"tipo": "reloj", "t_agente": t}      (varias veces)
+    coordinador -> agente  {"tipo": "reloj", "t_agente": t, "t_coord": t'}
+    agente -> coordinador  {"tipo": "registro", "nombre": "host:pid"}
+    coordinador -> agente  {"tipo": "bienvenida", "indice": i, "agentes": n}
+    coordinador -> agente  {"tipo": "ejecutar", "funcion": ..., "args": [...], "inicio": t}
+    agente -> coordinador  {"tipo": "ok" | "error", "valor": ...}
+    coordinador -> agente  {"tipo": "fin"}
+
+El inicio de cada fase es un instante del reloj del coordinador; cada agente
+lo traduce a su reloj con el desfase estimado al conectarse (como NTP: la
+muestra de menor ida y vuelta). Los resultados vuelven como histogramas
+(RegistroResultados.a_dict), que se suman sin perder precisión.
+
+Todos usan el mismo config.py (fases, modo, parámetros). Uso:
+    python distribuido.py coordinador [agentes] [puerto]
+    python distribuido.py agente <host_coordinador>[:puerto]
+"""
+
+import asyncio
+import json
+import os
+import socket
+import struct
+import sys
+import time
+
+# Agregar el directorio padre al path para importar config
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from config import DISTRIBUTED_PORT, DISTRIBUTED_AGENTS, DISTRIBUTED_START_MARGIN
+except ImportError:
+    DISTRIBUTED_PORT = 7700
+    DISTRIBUTED_AGENTS = 2
+    DISTRIBUTED_START_MARGIN = 2.0
+
+from histograma import RegistroResultados
+from conexiones import ContadorConexiones, cerrar_sesion_compartida
+from load_test_gradual import BINARY_FILE, correr_fase, ejecutar_prueba
+from resultados_binarios import ruta_parte
+
+LARGO = struct.Struct('>I')
+
+# Muestras de ida y vuelta para estimar el desfase de reloj de cada agente
+MUESTRAS_RELOJ = 8
+
+# Funciones que el coordinador puede pedirle a un agente
+FUNCIONES = {
+    'correr_fase': correr_fase,
+    'cerrar_sesion_compartida': cerrar_sesion_compartida,
+}
+
+
+def trama(mensaje):
+    datos = json.dumps(mensaje).encode()
+    return LARGO.pack(len(datos)) + datos
+
+
+async def enviar(writer, mensaje):
+    writer.write(trama(mensaje))
+    await writer.drain()
+
+
+async def recibir(reader):
+    """Siguiente mensaje, o None si se cerró la conexión"""
+    try:
+        (largo,) = LARGO.unpack(await reader.readexactly(LARGO.size))
+        return json.loads(await reader.readexactly(largo))
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+
+
+def codificar(valor):
+    """Resultado de una función de agente -> JSON"""
+    if isinstance(valor, RegistroResultados):
+        conexiones = valor.conexiones
+        return {
+            'registro': valor.a_dict(),
+            'conexiones': [conexiones.nuevas, conexiones.reusadas] if conexiones else None,
+        }
+    return valor
+
+
+def decodificar(valor):
+    if isinstance(valor, dict) and 'registro' in valor:
+        registro = RegistroResultados.desde_dict(valor['registro'])
+        if valor['conexiones'] is not None:
+            registro.conexiones = ContadorConexiones(*valor['conexiones'])
+        return registro
+    return valor
+
+
+# ============== COORDINADOR ==============
+
+class Agente:
+    def __init__(self, nombre, writer, indice):
+        self.nombre = nombre
+        self.writer = writer
+        self.indice = indice
+        self.respuestas = asyncio.Queue()
+
+
+class CoordinadorAgentes:
+    """
+    Misma interfaz que GeneradoresCarga (procesos, margen, ejecutar, cerrar),
+    pero cada "proceso" es un agente conectado por TCP. ejecutar() se llama
+    desde otro hilo (asyncio.to_thread), como con los procesos locales.
+    """
+
+    def __init__(self, agentes=DISTRIBUTED_AGENTS, host="0.0.0.0", puerto=DISTRIBUTED_PORT,
+                 margen=DISTRIBUTED_START_MARGIN):
+        self.procesos = agentes
+        self.host = host
+        self.puerto = puerto
+        self.margen = margen
+        # Cada agente escribe su .bin en su propio host
+        self.crudos_locales = False
+        self.agentes = []
+        self.servidor = None
+        self.loop = None
+        self.completo = asyncio.Event()
+
+    async def iniciar(self):
+        """Abre el puerto y espera a que se registren todos los agentes"""
+        self.loop = asyncio.get_running_loop()
+        self.servidor = await asyncio.start_server(self._atender, self.host, self.puerto)
+        print(f"Esperando {self.procesos} agentes en el puerto {self.puerto}...")
+        await self.completo.wait()
+        print(f"Agentes: {', '.join(a.nombre for a in self.agentes)}")
+
+    async def _atender(self, reader, writer):
+        agente = None
+        try:
+            while True:
+                mensaje = await recibir(reader)
+                if mensaje is None:
+                    return
+                tipo = mensaje.get('tipo')
+                if tipo == 'reloj':
+                    await enviar(writer, {'tipo': 'reloj', 't_agente': mensaje['t_agente'],
+                                          't_coord': time.time()})
+                elif tipo == 'registro':
+                    if agente is not None or self.completo.is_set():
+                        await enviar(writer, {'tipo': 'fin', 'motivo': 'no se esperan más agentes'})
+                        return
+                    agente = Agente(mensaje['nombre'], writer, len(self.agentes))
+                    self.agentes.append(agente)
+                    await enviar(writer, {'tipo': 'bienvenida', 'indice': agente.indice,
+                                          'agentes': self.procesos})
+                    print(f"  Agente {agente.indice}: {agente.nombre} "
+                          f"({len(self.agentes)}/{self.procesos})")
+                    if len(self.agentes) == self.procesos:
+                        self.completo.set()
+                elif tipo in ('ok', 'error') and agente is not None:
+                    agente.respuestas.put_nowait(mensaje)
+        finally:
+            if agente is not None:
+                # Desconexión: destrabar a quien espere su respuesta
+                agente.respuestas.put_nowait(None)
+            writer.close()
+
+    async def _ejecutar(self, funcion, args_por_proceso):
+        if len(args_por_proceso) > len(self.agentes):
+            raise ValueError("más partes que agentes")
+        if funcion.__name__ not in FUNCIONES:
+            raise ValueError(f"función no disponible en los agentes: {funcion.__name__}")
+
+        # Instante común en el reloj del coordinador
+        inicio = time.time() + self.margen
+        for agente, args in zip(self.agentes, args_por_proceso):
+            await enviar(agente.writer, {'tipo': 'ejecutar', 'funcion': funcion.__name__,
+                                         'args': list(args), 'inicio': inicio})
+
+        # Esperar a TODOS antes de fallar: una respuesta sin leer se tomaría
+        # como la de la próxima ejecución
+        resultados = []
+        errores = []
+        for agente in self.agentes[:len(args_por_proceso)]:
+            respuesta = await agente.respuestas.get()
+            if respuesta is None:
+                errores.append(f"agente {agente.nombre} desconectado")
+            elif respuesta['tipo'] == 'error':
+                errores.append(f"agente {agente.nombre}: {respuesta['valor']}")
+            else:
+                resultados.append(decodificar(respuesta['valor']))
+        if errores:
+            raise RuntimeError("; ".join(errores))
+        return resultados
+
+    def ejecutar(self, funcion, args_por_proceso):
+        """Ejecuta funcion(*args) en cada agente con inicio sincronizado (desde otro hilo)"""
+        futuro = asyncio.run_coroutine_threadsafe(self._ejecutar(funcion, args_por_proceso), self.loop)
+        return futuro.result()
+
+    def cerrar(self):
+        for agente in self.agentes:
+            if not agente.writer.is_closing():
+                agente.writer.write(trama({'tipo': 'fin'}))
+                agente.writer.close()
+        if self.servidor is not None:
+            self.servidor.close()
+
+
+async def coordinar(agentes, puerto):
+    coordinador = CoordinadorAgentes(agentes, puerto=puerto)
+    await coordinador.iniciar()
+    # La misma prueba de load_test_gradual.py, con los agentes como generadores
+    await ejecutar_prueba(coordinador)
+
+
+# ============== AGENTE ==============
+
+async def sincronizar_reloj(reader, writer):
+    """
+    Retorna (desfase, ida_y_vuelta): reloj del coordinador - reloj local,
+    de la muestra con menor ida y vuelta.
+    """
+    mejor = None
+    for _ in range(MUESTRAS_RELOJ):
+        t_envio = time.time()
+        await enviar(writer, {'tipo': 'reloj', 't_agente': t_envio})
+        respuesta = await recibir(reader)
+        t_recibo = time.time()
+        if respuesta is None:
+            raise ConnectionError("el coordinador cerró la conexión")
+        ida_y_vuelta = t_recibo - t_envio
+        desfase = respuesta['t_coord'] - (t_envio + t_recibo) / 2
+        if mejor is None or ida_y_vuelta < mejor[1]:
+            mejor = (desfase, ida_y_vuelta)
+    return mejor
+
+
+async def agente(host, puerto):
+    reader, writer = await asyncio.open_connection(host, puerto)
+    desfase, ida_y_vuelta = await sincronizar_reloj(reader, writer)
+    print(f"Conectado a {host}:{puerto} | desfase de reloj {desfase*1000:+.1f}ms "
+          f"(ida y vuelta {ida_y_vuelta*1000:.1f}ms)")
+
+    await enviar(writer, {'tipo': 'registro', 'nombre': f"{socket.gethostname()}:{os.getpid()}"})
+
+    try:
+        while True:
+            mensaje = await recibir(reader)
+            if mensaje is None or mensaje['tipo'] == 'fin':
+                print("Coordinador terminó la prueba")
+                return
+            if mensaje['tipo'] == 'bienvenida':
+                print(f"Registrado como agente {mensaje['indice']} de {mensaje['agentes']}")
+                # Log crudo de este agente (modo append): empezar vacío
+                ruta = ruta_parte(BINARY_FILE, mensaje['indice'])
+                if os.path.exists(ruta):
+                    os.remove(ruta)
+                continue
+            if mensaje['tipo'] != 'ejecutar':
+                continue
+
+            funcion = FUNCIONES[mensaje['funcion']]
+            espera = mensaje['inicio'] - desfase - time.time()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            try:
+                valor = codificar(await funcion(*mensaje['args']))
+                await enviar(writer, {'tipo': 'ok', 'valor': valor})
+            except Exception as e:
+                await enviar(writer, {'tipo': 'error', 'valor': repr(e)})
+    finally:
+        await cerrar_sesion_compartida()
+        writer.close()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in ('coordinador', 'agente'):
+        print("Uso: python distribuido.py coordinador [agentes] [puerto]")
+        print("     python distribuido.py agente <host_coordinador>[:puerto]")
+        sys.exit(1)
+
+    try:
+        if sys.argv[1] == 'coordinador':
+            agentes = int(sys.argv[2]) if len(sys.argv) > 2 else DISTRIBUTED_AGENTS
+            puerto = int(sys.argv[3]) if len(sys.argv) > 3 else DISTRIBUTED_PORT
+            asyncio.run(coordinar(agentes, puerto))
+        else:
+            if len(sys.argv) < 3:
+                print("Falta el host del coordinador")
+                sys.exit(1)
+            host, _, puerto = sys.argv[2].partition(':')
+            asyncio.run(agente(host, int(puerto) if puerto else DISTRIBUTED_PORT))
+    except KeyboardInterrupt:
+        print("\n\nPrueba cancelada\n")
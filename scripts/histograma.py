@@ -0,0 +1,294 @@
+"""
+Histogramas de latencia de memoria constante (estilo HDR).
+
+En vez de guardar un dict por request y ordenar la lista al final, cada
+latencia se cuenta en un bucket logarítmico: con `digitos` = 2 el valor
+reportado de cualquier percentil está a menos de 1% del real, y la cantidad
+de buckets depende solo del rango (mínimo..máximo) y de la precisión, no de
+la cantidad de requests. Los histogramas se suman (fusionar) entre procesos
+generadores, fases o ventanas de tiempo.
+"""
+
+import math
+import time
+
+# Percentiles del espectro que se imprime por fase
+ESPECTRO = (50, 75, 90, 95, 99, 99.9, 99.99, 100)
+
+
+class Histograma:
+    """Histograma log-bucketed con error relativo 10^-digitos"""
+
+    def __init__(self, digitos=2, minimo=1e-6, maximo=3600.0):
+        self.digitos = digitos
+        self.minimo = minimo
+        self.maximo = maximo
+        # Ancho relativo de cada bucket: valor * (1 + error)
+        self.error = 10 ** -digitos
+        self._log_base = math.log1p(self.error)
+        self.cuentas = {}
+        self.total = 0
+        self.suma = 0.0
+        self.valor_min = None
+        self.valor_max = None
+
+    def _indice(self, valor):
+        valor = min(max(valor, self.minimo), self.maximo)
+        return int(math.log(valor / self.minimo) / self._log_base)
+
+    def _valor(self, indice):
+        """Valor representativo del bucket (punto medio geométrico)"""
+        return self.minimo * math.exp((indice + 0.5) * self._log_base)
+
+    def registrar(self, valor, veces=1):
+        indice = self._indice(valor)
+        self.cuentas[indice] = self.cuentas.get(indice, 0) + veces
+        self.total += veces
+        self.suma += valor * veces
+        if self.valor_min is None or valor < self.valor_min:
+            self.valor_min = valor
+        if self.valor_max is None or valor > self.valor_max:
+            self.valor_max = valor
+
+    def compatible(self, otro):
+        return (self.digitos, self.minimo, self.maximo) == (otro.digitos, otro.minimo, otro.maximo)
+
+    def fusionar(self, otro):
+        """Suma las cuentas de otro histograma con la misma configuración"""
+        if not self.compatible(otro):
+            raise ValueError("Histogramas con distinta precisión o rango")
+        for indice, cuenta in otro.cuentas.items():
+            self.cuentas[indice] = self.cuentas.get(indice, 0) + cuenta
+        self.total += otro.total
+        self.suma += otro.suma
+        if otro.valor_min is not None:
+            self.valor_min = otro.valor_min if self.valor_min is None else min(self.valor_min, otro.valor_min)
+            self.valor_max = otro.valor_max if self.valor_max is None else max(self.valor_max, otro.valor_max)
+        return self
+
+    def media(self):
+        return self.suma / self.total if self.total else 0.0
+
+    def a_dict(self):
+        """Estado serializable a JSON (para mandarlo a otra máquina)"""
+        return {
+            'digitos': self.digitos, 'minimo': self.minimo, 'maximo': self.maximo,
+            'cuentas': sorted(self.cuentas.items()), 'total': self.total, 'suma': self.suma,
+            'valor_min': self.valor_min, 'valor_max': self.valor_max,
+        }
+
+    @classmethod
+    def desde_dict(cls, datos):
+        histograma = cls(datos['digitos'], datos['minimo'], datos['maximo'])
+        histograma.cuentas = {indice: cuenta for indice, cuenta in datos['cuentas']}
+        histograma.total = datos['total']
+        histograma.suma = datos['suma']
+        histograma.valor_min = datos['valor_min']
+        histograma.valor_max = datos['valor_max']
+        return histograma
+
+    def percentil(self, p):
+        """Valor del percentil p (0-100); los extremos son exactos"""
+        if not self.total:
+            return 0.0
+        if p <= 0:
+            return self.valor_min
+        if p >= 100:
+            return self.valor_max
+
+        objetivo = math.ceil(self.total * p / 100)
+        acumulado = 0
+        for indice in sorted(self.cuentas):
+            acumulado += self.cuentas[indice]
+            if acumulado >= objetivo:
+                return min(max(self._valor(indice), self.valor_min), self.valor_max)
+        return self.valor_max
+
+    def percentiles(self, lista=ESPECTRO):
+        """{p: valor} recorriendo los buckets una sola vez"""
+        resultado = {}
+        if not self.total:
+            return {p: 0.0 for p in lista}
+
+        pendientes = sorted(lista)
+        acumulado = 0
+        indices = iter(sorted(self.cuentas))
+        indice = None
+        for p in pendientes:
+            if p <= 0:
+                resultado[p] = self.valor_min
+                continue
+            if p >= 100:
+                resultado[p] = self.valor_max
+                continue
+            objetivo = math.ceil(self.total * p / 100)
+            while acumulado < objetivo:
+                indice = next(indices)
+                acumulado += self.cuentas[indice]
+            resultado[p] = min(max(self._valor(indice), self.valor_min), self.valor_max)
+        return resultado
+
+    def distribucion(self):
+        """
+        Filas (valor, percentil, cuenta_acumulada) por bucket no vacío,
+        como la salida de percentiles de HdrHistogram.
+        """
+        filas = []
+        acumulado = 0
+        for indice in sorted(self.cuentas):
+            acumulado += self.cuentas[indice]
+            filas.append((self._valor(indice), acumulado / self.total * 100, acumulado))
+        return filas
+
+
+class ResumenClase:
+    """Requests y latencia de una clase de request (endpoint de una mezcla)"""
+
+    def __init__(self, digitos=2):
+        self.total = 0
+        self.exitosos = 0
+        self.latencia = Histograma(digitos)
+
+    def fusionar(self, otro):
+        self.total += otro.total
+        self.exitosos += otro.exitosos
+        self.latencia.fusionar(otro.latencia)
+        return self
+
+    def a_dict(self):
+        return {'total': self.total, 'exitosos': self.exitosos, 'latencia': self.latencia.a_dict()}
+
+    @classmethod
+    def desde_dict(cls, datos):
+        resumen = cls()
+        resumen.total = datos['total']
+        resumen.exitosos = datos['exitosos']
+        resumen.latencia = Histograma.desde_dict(datos['latencia'])
+        return resumen
+
+
+class RegistroResultados:
+    """
+    Resultados de una fase en memoria constante: histogramas de latencia
+    (hasta el último byte) y de TTFB de los exitosos, histograma del atraso
+    de envío (send_lag) y un histograma por ventana de `ventana` segundos.
+    Las filas crudas, si se quieren, van a un sumidero con método
+    escribir(fila) (p.ej. EscritorResultados).
+
+    `desglose`: campos de la fila con componentes de la latencia (p.ej. FASES_RED
+    de conexiones.py); cada uno tiene su histograma en self.desglose.
+    Las filas con 'clase' (mezclas de endpoints) se resumen además por clase.
+    """
+
+    def __init__(self, digitos=2, ventana=5, sumidero=None, inicio=None, desglose=()):
+        self.digitos = digitos
+        self.ventana = ventana
+        self.sumidero = sumidero
+        # Reloj de pared: comparable entre procesos generadores
+        self.inicio = time.time() if inicio is None else inicio
+        self.latencia = Histograma(digitos)
+        self.ttfb = Histograma(digitos)
+        self.atraso = Histograma(digitos)
+        self.desglose = {campo: Histograma(digitos) for campo in desglose}
+        self.clases = {}
+        self.ventanas = {}
+        self.total = 0
+        self.exitosos = 0
+        # Conexiones abiertas/reutilizadas (ContadorConexiones), si se midieron
+        self.conexiones = None
+        # Publicador de métricas en vivo (registrar(fila)), opcional
+        self.vivo = None
+
+    @property
+    def fallidos(self):
+        return self.total - self.exitosos
+
+    def __getstate__(self):
+        # El sumidero (hilo y archivo) y el publicador quedan en el proceso que los creó
+        estado = self.__dict__.copy()
+        estado['sumidero'] = None
+        estado['vivo'] = None
+        return estado
+
+    def agregar(self, r):
+        self.total += 1
+        if 'send_lag' in r:
+            self.atraso.registrar(r['send_lag'])
+        clase = None
+        if 'clase' in r:
+            clase = self.clases.get(r['clase'])
+            if clase is None:
+                clase = self.clases[r['clase']] = ResumenClase(self.digitos)
+            clase.total += 1
+        if r['success']:
+            self.exitosos += 1
+            if clase is not None:
+                clase.exitosos += 1
+                clase.latencia.registrar(r['response_time'])
+            self.latencia.registrar(r['response_time'])
+            if 'ttfb' in r:
+                self.ttfb.registrar(r['ttfb'])
+            for campo, histograma in self.desglose.items():
+                histograma.registrar(r.get(campo, 0.0))
+            indice = int((time.time() - self.inicio) // self.ventana)
+            if indice not in self.ventanas:
+                self.ventanas[indice] = Histograma(self.digitos)
+            self.ventanas[indice].registrar(r['response_time'])
+        if self.sumidero is not None:
+            self.sumidero.escribir(r)
+        if self.vivo is not None:
+            self.vivo.registrar(r)
+
+    def a_dict(self):
+        """Histogramas y cuentas serializables a JSON (sin sumidero ni conexiones)"""
+        return {
+            'digitos': self.digitos, 'ventana': self.ventana, 'inicio': self.inicio,
+            'total': self.total, 'exitosos': self.exitosos,
+            'latencia': self.latencia.a_dict(), 'ttfb': self.ttfb.a_dict(),
+            'atraso': self.atraso.a_dict(),
+            'desglose': {campo: h.a_dict() for campo, h in self.desglose.items()},
+            'clases': {nombre: c.a_dict() for nombre, c in self.clases.items()},
+            'ventanas': [(indice, h.a_dict()) for indice, h in sorted(self.ventanas.items())],
+        }
+
+    @classmethod
+    def desde_dict(cls, datos):
+        registro = cls(datos['digitos'], datos['ventana'], inicio=datos['inicio'])
+        registro.total = datos['total']
+        registro.exitosos = datos['exitosos']
+        registro.latencia = Histograma.desde_dict(datos['latencia'])
+        registro.ttfb = Histograma.desde_dict(datos['ttfb'])
+        registro.atraso = Histograma.desde_dict(datos['atraso'])
+        registro.desglose = {campo: Histograma.desde_dict(h) for campo, h in datos['desglose'].items()}
+        registro.clases = {nombre: ResumenClase.desde_dict(c) for nombre, c in datos['clases'].items()}
+        registro.ventanas = {indice: Histograma.desde_dict(h) for indice, h in datos['ventanas']}
+        return registro
+
+    def fusionar(self, otro):
+        """Suma otro registro (p.ej. de otro proceso generador)"""
+        self.total += otro.total
+        self.exitosos += otro.exitosos
+        self.latencia.fusionar(otro.latencia)
+        self.ttfb.fusionar(otro.ttfb)
+        self.atraso.fusionar(otro.atraso)
+        for campo, histograma in otro.desglose.items():
+            if campo in self.desglose:
+                self.desglose[campo].fusionar(histograma)
+            else:
+                self.desglose[campo] = histograma
+        for nombre, clase in otro.clases.items():
+            if nombre in self.clases:
+                self.clases[nombre].fusionar(clase)
+            else:
+                self.clases[nombre] = clase
+        for indice, histograma in otro.ventanas.items():
+            if indice in self.ventanas:
+                self.ventanas[indice].fusionar(histograma)
+            else:
+                self.ventanas[indice] = histograma
+        if otro.conexiones is not None:
+            if self.conexiones is None:
+                self.conexiones = otro.conexiones
+            else:
+                self.conexiones.fusionar(otro.conexiones)
+        return self
@@ -8,8 +8,7 @@ import asyncio
 import aiohttp
 import time
 from datetime import datetime
-from statistics import mean, median
-import csv
+from urllib.parse import urlencode
 import sys
 import os
 
@@ -21,9 +20,33 @@ try:
 except ImportError:
     BASE_URL = "http://localhost:5000"
 
+try:
+    from config import LOAD_TEST_PROCESSES
+except ImportError:
+    LOAD_TEST_PROCESSES = 1
+
+try:
+    from config import (HISTOGRAM_PRECISION, HISTOGRAM_WINDOW_SECONDS, RAW_RESULTS,
+                        RESULTS_EXPORT_CSV)
+except ImportError:
+    HISTOGRAM_PRECISION = 2
+    HISTOGRAM_WINDOW_SECONDS = 5
+    RAW_RESULTS = True
+    RESULTS_EXPORT_CSV = True
+
+from server_timing import dividir_latencia
+from multiproceso import GeneradoresCarga, MARGEN_INICIO, repartir
+from histograma import ESPECTRO, RegistroResultados
+from conexiones import (FASES_RED, TiemposRequest, cerrar_sesion_compartida, consumir_cuerpo,
+                        descripcion_pool, resumen_desglose, sesion_compartida)
+from metricas_vivas import crear_publicador
+from resultados_binarios import (Esquema, EscritorResultados, borrar_archivos,
+                                 archivos_partes, exportar_csv, ruta_parte)
+
 # Configuración
 SERVER_URL = f"{BASE_URL}/stress"
 OUTPUT_FILE = "load_test_results.csv"
+BINARY_FILE = "load_test_results.bin"
 
 # Aumentamos para saturar los workers
 USUARIOS_CONCURRENTES = 500
@@ -36,47 +59,121 @@ STRESS_PARAMS = {
     'response_kb': 512
 }
 
+# Ruta de cada request (para poder reproducir la prueba con reproducir.py)
+RUTA = f"/stress?{urlencode(STRESS_PARAMS)}"
+
+# Registro binario de cada request (mismas columnas que el CSV; 's' = texto)
+ESQUEMA = Esquema([
+    ('timestamp', 's'),
+    ('user_id', 'q'),
+    ('request_num', 'q'),
+    ('ruta', 's'),
+    ('status', 's'),
+    ('response_time', 'd'),
+    ('ttfb', 'd'),
+    ('server_time', 'd'),
+    ('queue_time', 'd'),
+    ('service_time', 'd'),
+    *((campo, 'd') for campo in FASES_RED),
+    ('response_bytes', 'q'),
+    ('checksum', 'I'),
+    ('success', '?'),
+])
+
 
 async def hacer_request(session, user_id, request_num):
     """Hace un request y retorna las métricas"""
-    start = time.time()
+    start = time.perf_counter()
+    tiempos = TiemposRequest()
 
     try:
-        async with session.get(SERVER_URL, params=STRESS_PARAMS, timeout=aiohttp.ClientTimeout(total=300)) as response:
-            # /stress devuelve datos binarios, leer para completar la transferencia
-            await response.read()
-            elapsed = time.time() - start
+        async with session.get(SERVER_URL, params=STRESS_PARAMS, timeout=aiohttp.ClientTimeout(total=300),
+                               trace_request_ctx=tiempos) as response:
+            tiempos.marcar('primer_byte')
+            ttfb = time.perf_counter() - start
+            # /stress devuelve datos binarios: drenarlos por fragmentos para completar la transferencia
+            recibidos, crc = await consumir_cuerpo(response)
+            tiempos.marcar('ultimo_byte')
+            elapsed = time.perf_counter() - start
 
             # El tiempo del servidor está en el header
             server_time = float(response.headers.get('X-Server-Time', 0))
+            # Desglose cola / servicio desde Server-Timing
+            queue_time, service_time = dividir_latencia(response.headers)
 
             return {
                 'timestamp': datetime.utcnow().isoformat(),
                 'user_id': user_id,
                 'request_num': request_num,
+                'ruta': RUTA,
                 'status': response.status,
                 'response_time': elapsed,
+                'ttfb': ttfb,
                 'server_time': server_time,
-                'success': True
+                'queue_time': queue_time,
+                'service_time': service_time,
+                **tiempos.desglose(),
+                'response_bytes': recibidos,
+                'checksum': crc,
+                # Un 5xx (p.ej. 503 del control de admisión) no cuenta como exitoso
+                'success': response.status < 400
             }
     except Exception as e:
-        elapsed = time.time() - start
+        elapsed = time.perf_counter() - start
         return {
             'timestamp': datetime.utcnow().isoformat(),
             'user_id': user_id,
             'request_num': request_num,
+            'ruta': RUTA,
             'status': f'ERROR: {str(e)}',
             'response_time': elapsed,
+            'ttfb': 0,
             'server_time': 0,
+            'queue_time': 0,
+            'service_time': 0,
+            **dict.fromkeys(FASES_RED, 0),
+            'response_bytes': 0,
+            'checksum': 0,
             'success': False
         }
 
 
-async def simular_usuario(user_id, requests_por_usuario):
-    """Simula un usuario haciendo requests"""
-    async with aiohttp.ClientSession() as session:
-        tasks = [hacer_request(session, user_id, i) for i in range(requests_por_usuario)]
-        return await asyncio.gather(*tasks)
+async def simular_usuario(session, user_id, requests_por_usuario, registro):
+    """Simula un usuario haciendo requests (sobre el pool compartido del proceso)"""
+    async def request_registrado(i):
+        registro.agregar(await hacer_request(session, user_id, i))
+
+    tasks = [request_registrado(i) for i in range(requests_por_usuario)]
+    await asyncio.gather(*tasks)
+
+
+async def simular_usuarios(ids_usuarios, requests_por_usuario, parte=None):
+    """
+    Corre un grupo de usuarios en el loop actual. Retorna su RegistroResultados.
+    Con RAW_RESULTS las filas van al .bin de este proceso desde un hilo escritor.
+    """
+    escritor = None
+    if RAW_RESULTS:
+        escritor = EscritorResultados(ruta_parte(BINARY_FILE, parte), ESQUEMA)
+    registro = RegistroResultados(HISTOGRAM_PRECISION, HISTOGRAM_WINDOW_SECONDS, escritor,
+                                  desglose=FASES_RED)
+    # Una sola sesión (un solo pool de conexiones) para todos los usuarios del proceso
+    session, contador = await sesion_compartida()
+    registro.vivo = crear_publicador("load_test")
+
+    try:
+        tasks = [simular_usuario(session, i, requests_por_usuario, registro) for i in ids_usuarios]
+        await asyncio.gather(*tasks)
+    finally:
+        if registro.vivo is not None:
+            await registro.vivo.detener()
+            registro.vivo = None
+        await cerrar_sesion_compartida()
+        registro.conexiones = contador
+        if escritor is not None:
+            escritor.cerrar()
+            registro.sumidero = None
+    return registro
 
 
 async def ejecutar_prueba():
@@ -88,8 +185,12 @@ async def ejecutar_prueba():
     print(f"Usuarios: {USUARIOS_CONCURRENTES}")
     print(f"Total requests: {TOTAL_REQUESTS}")
     print(f"Params: cpu={STRESS_PARAMS['cpu_iterations']:,}, ram={STRESS_PARAMS['memory_mb']}MB, red={STRESS_PARAMS['response_kb']}KB")
+    print(descripcion_pool())
     print(f"{'='*60}\n")
 
+    if RAW_RESULTS:
+        borrar_archivos(BINARY_FILE)
+
     start_time = time.time()
 
     # Distribuir requests entre usuarios
@@ -97,53 +198,72 @@ async def ejecutar_prueba():
 
     # Ejecutar todos los usuarios en paralelo
     print("Ejecutando requests concurrentes...")
-    tasks = [simular_usuario(i, requests_por_usuario) for i in range(USUARIOS_CONCURRENTES)]
-    resultados_por_usuario = await asyncio.gather(*tasks)
+    if LOAD_TEST_PROCESSES > 1:
+        # Usuarios repartidos en procesos, cada uno con su propio event loop
+        partes = []
+        inicio_ids = 0
+        for cantidad in repartir(USUARIOS_CONCURRENTES, LOAD_TEST_PROCESSES):
+            if cantidad:
+                partes.append((range(inicio_ids, inicio_ids + cantidad), requests_por_usuario,
+                               len(partes)))
+                inicio_ids += cantidad
+        print(f"Procesos generadores: {len(partes)}")
 
-    # Aplanar resultados
-    resultados = [r for usuario in resultados_por_usuario for r in usuario]
+        with GeneradoresCarga(len(partes)) as generadores:
+            start_time = time.time() + MARGEN_INICIO
+            por_proceso = await asyncio.to_thread(generadores.ejecutar, simular_usuarios, partes)
+        registro = por_proceso[0]
+        for otro in por_proceso[1:]:
+            registro.fusionar(otro)
+    else:
+        registro = await simular_usuarios(range(USUARIOS_CONCURRENTES), requests_por_usuario)
 
     end_time = time.time()
     total_time = end_time - start_time
 
-    # Guardar CSV
-    with open(OUTPUT_FILE, 'w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=['timestamp', 'user_id', 'request_num',
-                                                'status', 'response_time', 'server_time', 'success'])
-        writer.writeheader()
-        writer.writerows(resultados)
+    # Exportar el log crudo binario al CSV de siempre (para graficar.py)
+    if RAW_RESULTS and RESULTS_EXPORT_CSV:
+        exportar_csv(archivos_partes(BINARY_FILE), OUTPUT_FILE)
 
-    # Estadísticas
-    exitosos = [r for r in resultados if r['success']]
-    fallidos = [r for r in resultados if not r['success']]
+    # Estadísticas (desde el histograma, sin ordenar la lista de resultados)
+    total = registro.total
 
     print(f"\n{'='*60}")
     print(f"RESULTADOS")
     print(f"{'='*60}")
     print(f"Tiempo total: {total_time:.2f}s")
-    print(f"Throughput: {len(resultados)/total_time:.2f} req/s")
-    print(f"Exitosos: {len(exitosos)} ({len(exitosos)/len(resultados)*100:.1f}%)")
-    print(f"Fallidos: {len(fallidos)} ({len(fallidos)/len(resultados)*100:.1f}%)")
+    print(f"Throughput: {total/total_time:.2f} req/s")
+    print(f"Exitosos: {registro.exitosos} ({registro.exitosos/total*100:.1f}%)")
+    print(f"Fallidos: {registro.fallidos} ({registro.fallidos/total*100:.1f}%)")
+    if registro.conexiones is not None:
+        print(registro.conexiones.resumen())
 
-    if exitosos:
-        tiempos = [r['response_time'] for r in exitosos]
-        tiempos_sorted = sorted(tiempos)
+    latencia = registro.latencia
+    if registro.exitosos:
+        p = latencia.percentiles((50, 90, 95, 99))
 
         print(f"\nTIEMPOS DE RESPUESTA:")
-        print(f"   Mínimo: {min(tiempos):.3f}s")
-        print(f"   Máximo: {max(tiempos):.3f}s")
-        print(f"   Media: {mean(tiempos):.3f}s")
-        print(f"   Mediana: {median(tiempos):.3f}s")
-        print(f"   P90: {tiempos_sorted[int(len(tiempos)*0.9)]:.3f}s")
-        print(f"   P95: {tiempos_sorted[int(len(tiempos)*0.95)]:.3f}s")
-        print(f"   P99: {tiempos_sorted[int(len(tiempos)*0.99)]:.3f}s")
-
-    print(f"\nResultados guardados en: {OUTPUT_FILE}")
+        print(f"   Mínimo: {latencia.valor_min:.3f}s")
+        print(f"   Máximo: {latencia.valor_max:.3f}s")
+        print(f"   Media: {latencia.media():.3f}s")
+        print(f"   Mediana: {p[50]:.3f}s")
+        print(f"   P90: {p[90]:.3f}s")
+        print(f"   P95: {p[95]:.3f}s")
+        print(f"   P99: {p[99]:.3f}s")
+        print(f"   TTFB mediana: {registro.ttfb.percentil(50):.3f}s | P99: {registro.ttfb.percentil(99):.3f}s")
+        print(f"\n   Desglose p50/p99: {resumen_desglose(registro.desglose)}")
+        print(f"\n   Espectro: " + " | ".join(
+            f"p{k:g}={v:.3f}s" for k, v in latencia.percentiles(ESPECTRO).items()))
+
+    if RAW_RESULTS:
+        print(f"\nResultados guardados en: {BINARY_FILE}"
+              + (f" y {OUTPUT_FILE}" if RESULTS_EXPORT_CSV else ""))
     print(f"{'='*60}\n")
 
 
 if __name__ == '__main__':
-    print("\nTip: Puedes editar USUARIOS_CONCURRENTES, TOTAL_REQUESTS y STRESS_PARAMS en el script\n")
+    print("\nTip: Puedes editar USUARIOS_CONCURRENTES, TOTAL_REQUESTS y STRESS_PARAMS en el script")
+    print("     y LOAD_TEST_PROCESSES en config.py\n")
 
     try:
         asyncio.run(ejecutar_prueba())
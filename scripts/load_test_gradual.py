@@ -8,9 +8,11 @@ Usa el endpoint /stress que estresa CPU, RAM y RED simultáneamente.
 
 import asyncio
 import aiohttp
+import random
 import time
 from datetime import datetime
-from statistics import mean, median
+from urllib.parse import urlencode
+from statistics import mean
 import csv
 import sys
 import os
@@ -24,189 +26,554 @@ except ImportError:
     # Valores por defecto si no existe config.py
     SERVER_URL = "http://100.107.204.120"
     RAMPUP_PHASES = [
-        {"nombre": "Baseline",    "usuarios": 10,  "duracion": 30, "cpu": 100000,  "ram": 5,  "red": 256},
-        {"nombre": "Moderada",    "usuarios": 50,  "duracion": 30, "cpu": 300000,  "ram": 10, "red": 512},
-        {"nombre": "Alta",        "usuarios": 100, "duracion": 30, "cpu": 500000,  "ram": 15, "red": 768},
-        {"nombre": "Sobrecarga",  "usuarios": 200, "duracion": 60, "cpu": 750000,  "ram": 20, "red": 1024},
-        {"nombre": "Saturacion",  "usuarios": 500, "duracion": 60, "cpu": 1000000, "ram": 25, "red": 1024},
+        {"nombre": "Baseline",    "usuarios": 10,  "duracion": 30, "cpu": 100000,  "ram": 5,  "red": 256,  "tasa": 5},
+        {"nombre": "Moderada",    "usuarios": 50,  "duracion": 30, "cpu": 300000,  "ram": 10, "red": 512,  "tasa": 20},
+        {"nombre": "Alta",        "usuarios": 100, "duracion": 30, "cpu": 500000,  "ram": 15, "red": 768,  "tasa": 40},
+        {"nombre": "Sobrecarga",  "usuarios": 200, "duracion": 60, "cpu": 750000,  "ram": 20, "red": 1024, "tasa": 80},
+        {"nombre": "Saturacion",  "usuarios": 500, "duracion": 60, "cpu": 1000000, "ram": 25, "red": 1024, "tasa": 200},
     ]
 
+try:
+    from config import LOAD_TEST_MODE, ARRIVAL_PROCESS
+except ImportError:
+    LOAD_TEST_MODE = "cerrado"
+    ARRIVAL_PROCESS = "constante"
+
+try:
+    from config import LOAD_TEST_PROCESSES
+except ImportError:
+    LOAD_TEST_PROCESSES = 1
+
+try:
+    from config import (HISTOGRAM_PRECISION, HISTOGRAM_WINDOW_SECONDS, RAW_RESULTS,
+                        RESULTS_EXPORT_CSV)
+except ImportError:
+    HISTOGRAM_PRECISION = 2
+    HISTOGRAM_WINDOW_SECONDS = 5
+    RAW_RESULTS = True
+    RESULTS_EXPORT_CSV = True
+
+from server_timing import dividir_latencia
+from multiproceso import GeneradoresCarga, repartir
+from histograma import RegistroResultados
+from conexiones import (FASES_RED, ContadorConexiones, TiemposRequest, cerrar_sesion_compartida,
+                        consumir_cuerpo, descripcion_pool, resumen_desglose, sesion_compartida)
+from metricas_vivas import crear_publicador
+from mezcla import Mezcla
+from resultados_binarios import (Esquema, EscritorResultados, borrar_archivos,
+                                 archivos_partes, exportar_csv, ruta_parte)
+
 # Configuración
 ENDPOINT = "/stress"
 OUTPUT_FILE = "load_test_gradual_results.csv"
+BINARY_FILE = "load_test_gradual_results.bin"
+HISTOGRAM_FILE = "load_test_gradual_histograma.txt"
+WINDOWS_FILE = "load_test_gradual_ventanas.csv"
+BREAKDOWN_FILE = "load_test_gradual_desglose.csv"
+CLASSES_FILE = "load_test_gradual_clases.csv"
 TIMEOUT_SECONDS = 300
 
-
-async def hacer_request(session, fase_nombre, user_id, cpu, ram, red):
-    """Hace un request al endpoint /stress y retorna métricas"""
-    url = f"{SERVER_URL}{ENDPOINT}"
-    params = {
-        'cpu_iterations': cpu,
-        'memory_mb': ram,
-        'response_kb': red
-    }
-
-    start = time.time()
+# Segundos entre líneas de progreso en modo abierto
+INTERVALO_PROGRESO = 5
+
+# Separación de user_id entre procesos generadores en modo abierto
+IDS_POR_PROCESO = 1_000_000
+
+# Registro binario de cada request (mismas columnas que el CSV; 's' = texto)
+ESQUEMA = Esquema([
+    ('timestamp', 's'),
+    ('fase', 's'),
+    ('clase', 's'),
+    ('ruta', 's'),
+    ('user_id', 'q'),
+    ('status', 's'),
+    ('response_time', 'd'),
+    ('ttfb', 'd'),
+    ('send_lag', 'd'),
+    ('server_time', 'd'),
+    ('network_time', 'd'),
+    ('queue_time', 'd'),
+    ('service_time', 'd'),
+    *((campo, 'd') for campo in FASES_RED),
+    ('response_bytes', 'q'),
+    ('checksum', 'I'),
+    ('success', '?'),
+    ('error', 's'),
+])
+
+
+async def hacer_request(session, fase_nombre, user_id, peticion, inicio_previsto=None):
+    """
+    Hace un request y retorna métricas. peticion = (clase, endpoint, params),
+    una muestra de la mezcla de la fase (Mezcla.elegir()).
+
+    response_time es hasta el último byte del cuerpo (drenado por fragmentos,
+    ver consumir_cuerpo) y ttfb hasta los headers de la respuesta.
+
+    Con inicio_previsto (perf_counter), response_time se mide desde el instante
+    en que el request DEBÍA salir y send_lag es cuánto salió tarde. Así el
+    retraso del propio generador no desaparece de la latencia (coordinated omission).
+    """
+    clase, endpoint, params = peticion
+    url = f"{SERVER_URL}{endpoint}"
+    # Ruta completa del request, para poder reproducirlo (reproducir.py)
+    ruta = f"{endpoint}?{urlencode(params)}" if params else endpoint
+
+    start = time.perf_counter()
+    if inicio_previsto is None:
+        inicio_previsto = start
+    send_lag = start - inicio_previsto
+
+    # Desglose pool / DNS / connect / envío / espera / transferencia (hooks de trace)
+    tiempos = TiemposRequest()
 
     try:
-        async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=TIMEOUT_SECONDS)) as response:
-            # Leer el contenido para medir el tiempo completo de transferencia
-            data = await response.read()
-            elapsed = time.time() - start
+        async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=TIMEOUT_SECONDS),
+                               trace_request_ctx=tiempos) as response:
+            # Headers recibidos: primer byte de la respuesta
+            tiempos.marcar('primer_byte')
+            ttfb = tiempos.marcas['primer_byte'] - inicio_previsto
+            # Drenar el cuerpo (sin acumularlo) para medir hasta el último byte
+            recibidos, crc = await consumir_cuerpo(response)
+            tiempos.marcar('ultimo_byte')
+            elapsed = tiempos.marcas['ultimo_byte'] - inicio_previsto
 
             # Obtener métricas de los headers
             server_time = float(response.headers.get('X-Server-Time', 0))
+            queue_time, service_time = dividir_latencia(response.headers)
 
             return {
                 'timestamp': datetime.utcnow().isoformat(),
                 'fase': fase_nombre,
+                'clase': clase,
+                'ruta': ruta,
                 'user_id': user_id,
                 'status': response.status,
                 'response_time': round(elapsed, 6),
+                'ttfb': round(ttfb, 6),
+                'send_lag': round(send_lag, 6),
                 'server_time': round(server_time, 6),
                 'network_time': round(elapsed - server_time, 6),
-                'response_bytes': len(data),
-                'success': True,
-                'error': ''
+                'queue_time': round(queue_time, 6),
+                'service_time': round(service_time, 6),
+                **{campo: round(valor, 6) for campo, valor in tiempos.desglose().items()},
+                'response_bytes': recibidos,
+                'checksum': crc,
+                # 503 del control de admisión, 500, 502/504: respuestas, pero fallidas
+                'success': response.status < 400,
+                'error': '' if response.status < 400 else f'HTTP {response.status}'
             }
     except asyncio.TimeoutError:
-        elapsed = time.time() - start
+        elapsed = time.perf_counter() - inicio_previsto
         return {
             'timestamp': datetime.utcnow().isoformat(),
             'fase': fase_nombre,
+            'clase': clase,
+            'ruta': ruta,
             'user_id': user_id,
             'status': 'TIMEOUT',
             'response_time': round(elapsed, 6),
+            'ttfb': 0,
+            'send_lag': round(send_lag, 6),
             'server_time': 0,
             'network_time': 0,
+            'queue_time': 0,
+            'service_time': 0,
+            **dict.fromkeys(FASES_RED, 0),
             'response_bytes': 0,
+            'checksum': 0,
             'success': False,
             'error': 'Timeout'
         }
     except Exception as e:
-        elapsed = time.time() - start
+        elapsed = time.perf_counter() - inicio_previsto
         return {
             'timestamp': datetime.utcnow().isoformat(),
             'fase': fase_nombre,
+            'clase': clase,
+            'ruta': ruta,
             'user_id': user_id,
             'status': 'ERROR',
             'response_time': round(elapsed, 6),
+            'ttfb': 0,
+            'send_lag': round(send_lag, 6),
             'server_time': 0,
             'network_time': 0,
+            'queue_time': 0,
+            'service_time': 0,
+            **dict.fromkeys(FASES_RED, 0),
             'response_bytes': 0,
+            'checksum': 0,
             'success': False,
             'error': str(e)[:100]
         }
 
 
-async def ejecutar_fase(fase, writer, stats):
-    """Ejecuta una fase de la prueba de carga"""
-    nombre = fase['nombre']
-    usuarios = fase['usuarios']
-    duracion = fase['duracion']
-    cpu = fase['cpu']
-    ram = fase['ram']
-    red = fase['red']
-
+def imprimir_encabezado_fase(fase):
     print(f"\n{'='*70}")
-    print(f"FASE: {nombre.upper()}")
+    print(f"FASE: {fase['nombre'].upper()}")
     print(f"{'='*70}")
-    print(f"  Usuarios concurrentes: {usuarios}")
-    print(f"  Duración: {duracion}s")
-    print(f"  Parámetros: cpu={cpu:,} | ram={ram}MB | red={red}KB")
+    if LOAD_TEST_MODE == 'abierto':
+        # Las conexiones las limita el pool compartido (ver descripcion_pool())
+        print(f"  Tasa de llegadas: {fase['tasa']} req/s ({ARRIVAL_PROCESS})")
+    else:
+        print(f"  Usuarios concurrentes: {fase['usuarios']}")
+    print(f"  Duración: {fase['duracion']}s")
+    if fase.get('mezcla'):
+        print(f"  Mezcla: {Mezcla.desde_fase(fase).descripcion()}")
+    else:
+        print(f"  Parámetros: cpu={fase['cpu']:,} | ram={fase['ram']}MB | red={fase['red']}KB")
     print(f"{'='*70}")
 
+
+async def ejecutar_fase_cerrada(fase, session, registro, id_base=0, mostrar_progreso=True):
+    """Oleadas de `usuarios` requests: cada oleada espera a que termine la anterior"""
+    nombre = fase['nombre']
+    usuarios = fase['usuarios']
+    mezcla = Mezcla.desde_fase(fase, ENDPOINT)
     fase_inicio = time.time()
-    resultados_fase = []
     request_count = 0
 
-    # Crear sesión compartida para la fase
-    connector = aiohttp.TCPConnector(limit=usuarios * 2)
-    async with aiohttp.ClientSession(connector=connector) as session:
-        while (time.time() - fase_inicio) < duracion:
-            # Lanzar requests concurrentes
-            tasks = [
-                hacer_request(session, nombre, i, cpu, ram, red)
-                for i in range(usuarios)
-            ]
-
-            resultados = await asyncio.gather(*tasks)
-
-            for r in resultados:
-                writer.writerow(r)
-                resultados_fase.append(r)
-                request_count += 1
-
-            # Mostrar progreso
-            exitosos = sum(1 for r in resultados if r['success'])
-            tiempo_promedio = mean([r['response_time'] for r in resultados])
-            elapsed = time.time() - fase_inicio
-
-            print(f"  [{elapsed:5.1f}s] Requests: {request_count:4d} | "
-                  f"OK: {exitosos}/{usuarios} | "
-                  f"Tiempo promedio: {tiempo_promedio:.3f}s")
-
-    # Estadísticas de la fase
-    exitosos_fase = [r for r in resultados_fase if r['success']]
-    fallidos_fase = len(resultados_fase) - len(exitosos_fase)
-
-    if exitosos_fase:
-        tiempos = [r['response_time'] for r in exitosos_fase]
-        tiempos.sort()
-
-        stats[nombre] = {
-            'total': len(resultados_fase),
-            'exitosos': len(exitosos_fase),
-            'fallidos': fallidos_fase,
-            'tiempo_min': min(tiempos),
-            'tiempo_max': max(tiempos),
-            'tiempo_mean': mean(tiempos),
-            'tiempo_median': median(tiempos),
-            'tiempo_p95': tiempos[int(len(tiempos) * 0.95)] if len(tiempos) > 1 else tiempos[0],
-        }
+    while (time.time() - fase_inicio) < fase['duracion']:
+        # Lanzar requests concurrentes
+        tasks = [
+            hacer_request(session, nombre, id_base + i, mezcla.elegir())
+            for i in range(usuarios)
+        ]
 
-        print(f"\n  Resumen fase {nombre}:")
-        print(f"    Total: {len(resultados_fase)} | Exitosos: {len(exitosos_fase)} | Fallidos: {fallidos_fase}")
-        print(f"    Tiempo min: {min(tiempos):.3f}s | max: {max(tiempos):.3f}s | media: {mean(tiempos):.3f}s")
+        resultados = await asyncio.gather(*tasks)
+
+        for r in resultados:
+            registro.agregar(r)
+        request_count += len(resultados)
+        if not mostrar_progreso:
+            continue
+
+        # Mostrar progreso
+        exitosos = sum(1 for r in resultados if r['success'])
+        tiempo_promedio = mean([r['response_time'] for r in resultados])
+        elapsed = time.time() - fase_inicio
+
+        print(f"  [{elapsed:5.1f}s] Requests: {request_count:4d} | "
+              f"OK: {exitosos}/{usuarios} | "
+              f"Tiempo promedio: {tiempo_promedio:.3f}s")
+
+
+async def ejecutar_fase_abierta(fase, session, registro, id_base=0, desfase=0.0,
+                                mostrar_progreso=True):
+    """
+    Llegadas a `tasa` req/s (constantes o Poisson) durante la fase, sin esperar
+    a los requests en vuelo. Si el generador se atrasa, los requests atrasados
+    salen de inmediato y el atraso queda en send_lag.
+
+    desfase: segundos hasta la primera llegada (intercala procesos generadores).
+    """
+    nombre = fase['nombre']
+    tasa = fase['tasa']
+    mezcla = Mezcla.desde_fase(fase, ENDPOINT)
+    en_vuelo = set()
+
+    def al_completar(tarea):
+        en_vuelo.discard(tarea)
+        registro.agregar(tarea.result())
+
+    fase_inicio = time.perf_counter()
+    proximo = fase_inicio + desfase
+    ultimo_progreso = fase_inicio
+    user_id = 0
+
+    while proximo - fase_inicio < fase['duracion']:
+        espera = proximo - time.perf_counter()
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+        tarea = asyncio.create_task(hacer_request(
+            session, nombre, id_base + user_id, mezcla.elegir(),
+            inicio_previsto=proximo
+        ))
+        en_vuelo.add(tarea)
+        tarea.add_done_callback(al_completar)
+        user_id += 1
+
+        if ARRIVAL_PROCESS == 'poisson':
+            proximo += random.expovariate(tasa)
+        else:
+            proximo += 1 / tasa
+
+        ahora = time.perf_counter()
+        if mostrar_progreso and ahora - ultimo_progreso >= INTERVALO_PROGRESO:
+            ultimo_progreso = ahora
+            atraso = max(0.0, ahora - proximo)
+            print(f"  [{ahora - fase_inicio:5.1f}s] Enviados: {user_id:5d} | "
+                  f"Completados: {registro.total:5d} | En vuelo: {len(en_vuelo):4d} | "
+                  f"Atraso del generador: {atraso:.3f}s")
+
+    # Esperar a los que siguen en vuelo (su latencia también cuenta para la fase)
+    if en_vuelo:
+        await asyncio.gather(*list(en_vuelo))
+
+
+async def correr_fase(fase, id_base=0, desfase=0.0, mostrar_progreso=True, parte=None):
+    """
+    Corre una fase (o la parte `parte` de un proceso generador) sobre la sesión
+    compartida del proceso: las conexiones keep-alive pasan de una fase a la otra.
+    Con RAW_RESULTS (o fase['crudos'], si está) las filas van al .bin de este
+    proceso desde un hilo escritor.
+
+    Retorna el RegistroResultados de la fase (con las conexiones abiertas/reutilizadas).
+    """
+    escritor = None
+    if fase.get('crudos', RAW_RESULTS):
+        escritor = EscritorResultados(ruta_parte(BINARY_FILE, parte), ESQUEMA)
+    registro = RegistroResultados(HISTOGRAM_PRECISION, HISTOGRAM_WINDOW_SECONDS, escritor,
+                                  desglose=FASES_RED)
+    session, contador = await sesion_compartida()
+    antes = contador.copia()
+    # rps y percentiles por segundo hacia el dashboard
+    registro.vivo = crear_publicador(fase['nombre'])
+
+    try:
+        if LOAD_TEST_MODE == 'abierto':
+            await ejecutar_fase_abierta(fase, session, registro, id_base, desfase,
+                                        mostrar_progreso)
+        else:
+            await ejecutar_fase_cerrada(fase, session, registro, id_base,
+                                        mostrar_progreso)
+    finally:
+        if registro.vivo is not None:
+            await registro.vivo.detener()
+            registro.vivo = None
+        registro.conexiones = contador.diferencia(antes)
+        if escritor is not None:
+            escritor.cerrar()
+            registro.sumidero = None
+
+    return registro
+
+
+def repartir_fase(fase, procesos):
+    """
+    Divide la fase entre procesos generadores: usuarios repartidos, tasa / N
+    por proceso, y llegadas constantes intercaladas para que la suma siga pareja.
+
+    Retorna: lista de args de correr_fase por proceso
+    """
+    partes = []
+    id_base = 0
+    for indice, usuarios in enumerate(repartir(fase['usuarios'], procesos)):
+        if LOAD_TEST_MODE == 'abierto':
+            parte = {**fase, 'usuarios': max(1, usuarios), 'tasa': fase['tasa'] / procesos}
+            desfase = indice / fase['tasa'] if ARRIVAL_PROCESS == 'constante' else 0.0
+            partes.append((parte, indice * IDS_POR_PROCESO, desfase, False, indice))
+        elif usuarios > 0:
+            partes.append(({**fase, 'usuarios': usuarios}, id_base, 0.0, False, indice))
+            id_base += usuarios
+    return partes
+
+
+async def ejecutar_fase(fase, stats, generadores=None):
+    """Ejecuta una fase de la prueba de carga (en este proceso o repartida en generadores)"""
+    nombre = fase['nombre']
+    imprimir_encabezado_fase(fase)
+
+    fase_inicio = time.time()
+
+    if generadores is None:
+        registro = await correr_fase(fase)
     else:
-        stats[nombre] = {
-            'total': len(resultados_fase),
-            'exitosos': 0,
-            'fallidos': fallidos_fase,
-        }
-        print(f"\n  ADVERTENCIA: Todos los requests fallaron en esta fase")
+        partes = repartir_fase(fase, generadores.procesos)
+        print(f"  Repartida en {len(partes)} procesos generadores: "
+              f"usuarios {[p[0]['usuarios'] for p in partes]}")
+        # ejecutar() bloquea hasta que terminen todos los procesos
+        por_proceso = await asyncio.to_thread(generadores.ejecutar, correr_fase, partes)
+        registro = por_proceso[0]
+        for otro in por_proceso[1:]:
+            registro.fusionar(otro)
+        # Los procesos arrancan `margen` segundos después de recibir la orden
+        fase_inicio += generadores.margen
+
+    duracion_real = time.time() - fase_inicio
+
+    # Estadísticas de la fase (desde los histogramas, sin ordenar listas)
+    stats[nombre] = {
+        'total': registro.total,
+        'exitosos': registro.exitosos,
+        'fallidos': registro.fallidos,
+        'conexiones_nuevas': registro.conexiones.nuevas,
+        'conexiones_reusadas': registro.conexiones.reusadas,
+        'registro': registro,
+    }
 
-    return resultados_fase
+    # Atraso de envío respecto del calendario (solo relevante en modo abierto)
+    if registro.total:
+        stats[nombre].update({
+            'atraso_mean': registro.atraso.media(),
+            'atraso_p99': registro.atraso.percentil(99),
+            'atraso_max': registro.atraso.valor_max,
+            'tasa_lograda': registro.total / duracion_real,
+        })
+
+    latencia = registro.latencia
+    if registro.exitosos:
+        p = latencia.percentiles()
+        stats[nombre].update({
+            'tiempo_min': latencia.valor_min,
+            'tiempo_max': latencia.valor_max,
+            'tiempo_mean': latencia.media(),
+            'tiempo_median': p[50],
+            'tiempo_p95': p[95],
+            'tiempo_p99': p[99],
+            'ttfb_median': registro.ttfb.percentil(50),
+            'ttfb_p99': registro.ttfb.percentil(99),
+        })
 
+        print(f"\n  Resumen fase {nombre}:")
+        print(f"    Total: {registro.total} | Exitosos: {registro.exitosos} | Fallidos: {registro.fallidos}")
+        print(f"    Tiempo min: {latencia.valor_min:.3f}s | max: {latencia.valor_max:.3f}s | "
+              f"media: {latencia.media():.3f}s")
+        print("    Percentiles: " + " | ".join(f"p{k:g}={v:.3f}s" for k, v in p.items()))
+        s = stats[nombre]
+        print(f"    TTFB mediana: {s['ttfb_median']:.3f}s | p99: {s['ttfb_p99']:.3f}s "
+              f"(último byte: mediana {s['tiempo_median']:.3f}s | p99 {s['tiempo_p99']:.3f}s)")
+        print(f"    Desglose p50/p99: {resumen_desglose(registro.desglose)}")
+        print(f"    {registro.conexiones.resumen()}")
+    else:
+        print(f"\n  ADVERTENCIA: Todos los requests fallaron en esta fase")
 
-async def ejecutar_prueba():
-    """Ejecuta la prueba completa con todas las fases"""
+    if LOAD_TEST_MODE == 'abierto' and registro.total:
+        s = stats[nombre]
+        print(f"    Tasa objetivo: {fase['tasa']} req/s | lograda: {s['tasa_lograda']:.1f} req/s")
+        print(f"    Atraso del generador: media {s['atraso_mean']:.3f}s | "
+              f"p99 {s['atraso_p99']:.3f}s | max {s['atraso_max']:.3f}s")
+
+    # Con una mezcla: cada clase por separado (¿los /health esperan detrás de los /stress?)
+    if len(registro.clases) > 1:
+        print(f"    Por clase:")
+        for clase, resumen in sorted(registro.clases.items()):
+            p = resumen.latencia.percentiles((50, 95, 99))
+            print(f"      {clase:<12} {resumen.total:>7} req | OK {resumen.exitosos:>7} | "
+                  f"p50 {p[50]:.3f}s | p95 {p[95]:.3f}s | p99 {p[99]:.3f}s")
+
+    return registro
+
+
+def guardar_histogramas(stats):
+    """
+    Escribe la distribución completa de latencias por fase (estilo HdrHistogram),
+    los percentiles por ventana de tiempo, los del desglose de cada request y
+    los de cada clase de la mezcla.
+    """
+    with open(HISTOGRAM_FILE, 'w') as f:
+        for nombre, s in stats.items():
+            latencia = s['registro'].latencia
+            f.write(f"# Fase {nombre}: {latencia.total} exitosos, "
+                    f"precisión {HISTOGRAM_PRECISION} dígitos\n")
+            f.write(f"{'Valor(s)':>14} {'Percentil':>12} {'Cuenta':>10} {'1/(1-Percentil)':>16}\n")
+            for valor, percentil, acumulado in latencia.distribucion():
+                inverso = 1 / (1 - percentil / 100) if percentil < 100 else float('inf')
+                f.write(f"{valor:>14.6f} {percentil / 100:>12.6f} {acumulado:>10} {inverso:>16.2f}\n")
+            f.write("\n")
+
+    with open(WINDOWS_FILE, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['fase', 'ventana_inicio_seg', 'exitosos', 'p50', 'p95', 'p99', 'max'])
+        for nombre, s in stats.items():
+            for indice, histograma in sorted(s['registro'].ventanas.items()):
+                p = histograma.percentiles((50, 95, 99))
+                writer.writerow([nombre, indice * HISTOGRAM_WINDOW_SECONDS, histograma.total,
+                                 round(p[50], 6), round(p[95], 6), round(p[99], 6),
+                                 round(histograma.valor_max, 6)])
+
+    # Percentiles de cada componente del request (pool, DNS, connect, envío, espera, transferencia)
+    with open(BREAKDOWN_FILE, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['fase', 'componente', 'media', 'p50', 'p95', 'p99', 'max'])
+        for nombre, s in stats.items():
+            for campo, histograma in s['registro'].desglose.items():
+                if not histograma.total:
+                    continue
+                p = histograma.percentiles((50, 95, 99))
+                writer.writerow([nombre, campo, round(histograma.media(), 6),
+                                 round(p[50], 6), round(p[95], 6), round(p[99], 6),
+                                 round(histograma.valor_max, 6)])
+
+    with open(CLASSES_FILE, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['fase', 'clase', 'total', 'exitosos', 'media', 'p50', 'p95', 'p99', 'max'])
+        for nombre, s in stats.items():
+            for clase, resumen in sorted(s['registro'].clases.items()):
+                latencia = resumen.latencia
+                p = latencia.percentiles((50, 95, 99))
+                writer.writerow([nombre, clase, resumen.total, resumen.exitosos,
+                                 round(latencia.media(), 6), round(p[50], 6), round(p[95], 6),
+                                 round(p[99], 6), round(latencia.valor_max or 0, 6)])
+
+
+def iniciar_generadores():
+    """Procesos generadores (cada uno con su event loop), reutilizados entre fases"""
+    if LOAD_TEST_PROCESSES <= 1:
+        return None
+    print(f"Procesos generadores: {LOAD_TEST_PROCESSES}")
+    generadores = GeneradoresCarga(LOAD_TEST_PROCESSES)
+    generadores.iniciar()
+    return generadores
+
+
+async def cerrar_generadores(generadores):
+    """Cierra el pool de conexiones de cada proceso (el de este y el de los generadores)"""
+    if generadores is None:
+        await cerrar_sesion_compartida()
+        return
+    try:
+        await asyncio.to_thread(generadores.ejecutar, cerrar_sesion_compartida,
+                                [()] * generadores.procesos)
+    except RuntimeError:
+        pass
+    generadores.cerrar()
+
+
+async def ejecutar_prueba(generadores=None):
+    """
+    Ejecuta la prueba completa con todas las fases. `generadores`: algo con la
+    interfaz de GeneradoresCarga (p.ej. CoordinadorAgentes); por defecto se
+    crean según LOAD_TEST_PROCESSES.
+    """
     print(f"\n{'#'*70}")
     print(f"#  PRUEBA DE CARGA CON RAMP-UP GRADUAL")
     print(f"{'#'*70}")
     print(f"\nServidor: {SERVER_URL}{ENDPOINT}")
     print(f"Fases: {len(RAMPUP_PHASES)}")
+    print(f"Modo: {LOAD_TEST_MODE}" + (f" ({ARRIVAL_PROCESS})" if LOAD_TEST_MODE == 'abierto' else ""))
     print(f"Duración total estimada: {sum(f['duracion'] for f in RAMPUP_PHASES)}s")
+    print(descripcion_pool())
 
-    # Preparar CSV
-    fieldnames = ['timestamp', 'fase', 'user_id', 'status', 'response_time',
-                  'server_time', 'network_time', 'response_bytes', 'success', 'error']
-
-    csvfile = open(OUTPUT_FILE, 'w', newline='')
-    writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-    writer.writeheader()
+    # Log crudo por request opcional (RAW_RESULTS) en binario; los histogramas
+    # siempre se guardan. Los .bin se abren en modo append: borrar los anteriores
+    if RAW_RESULTS:
+        borrar_archivos(BINARY_FILE)
 
     stats = {}
     inicio_total = time.time()
 
+    if generadores is None:
+        generadores = iniciar_generadores()
+    # Con agentes remotos los .bin quedan en cada agente, no en este host
+    crudos_locales = generadores is None or generadores.crudos_locales
+
     try:
         for fase in RAMPUP_PHASES:
-            await ejecutar_fase(fase, writer, stats)
-            csvfile.flush()
+            await ejecutar_fase(fase, stats, generadores)
     except KeyboardInterrupt:
         print("\n\nPrueba interrumpida por el usuario")
     finally:
-        csvfile.close()
+        await cerrar_generadores(generadores)
+
+    guardar_histogramas(stats)
+
+    # Exportar al CSV de siempre (fuera de la prueba, para graficar.py)
+    if RAW_RESULTS and RESULTS_EXPORT_CSV and crudos_locales:
+        filas = exportar_csv(archivos_partes(BINARY_FILE), OUTPUT_FILE)
+        print(f"\n{filas} resultados exportados de {BINARY_FILE} a {OUTPUT_FILE}")
 
     tiempo_total = time.time() - inicio_total
 
@@ -216,17 +583,32 @@ async def ejecutar_prueba():
     print(f"{'#'*70}")
     print(f"\nTiempo total de ejecución: {tiempo_total:.1f}s")
     print(f"\nEstadísticas por fase:")
-    print(f"{'Fase':<15} {'Total':>8} {'OK':>8} {'Fail':>8} {'Media':>10} {'P95':>10}")
-    print(f"{'-'*15} {'-'*8} {'-'*8} {'-'*8} {'-'*10} {'-'*10}")
+    abierto = LOAD_TEST_MODE == 'abierto'
+    print(f"{'Fase':<15} {'Total':>8} {'OK':>8} {'Fail':>8} {'Media':>10} {'P95':>10} {'P99':>10}"
+          + (f" {'Atraso p99':>11}" if abierto else ""))
+    print(f"{'-'*15} {'-'*8} {'-'*8} {'-'*8} {'-'*10} {'-'*10} {'-'*10}" + (f" {'-'*11}" if abierto else ""))
 
     for nombre, s in stats.items():
+        atraso = f" {s['atraso_p99']:>10.3f}s" if abierto and 'atraso_p99' in s else ""
         if s['exitosos'] > 0:
             print(f"{nombre:<15} {s['total']:>8} {s['exitosos']:>8} {s['fallidos']:>8} "
-                  f"{s['tiempo_mean']:>9.3f}s {s['tiempo_p95']:>9.3f}s")
+                  f"{s['tiempo_mean']:>9.3f}s {s['tiempo_p95']:>9.3f}s {s['tiempo_p99']:>9.3f}s{atraso}")
         else:
-            print(f"{nombre:<15} {s['total']:>8} {s['exitosos']:>8} {s['fallidos']:>8} {'N/A':>10} {'N/A':>10}")
-
-    print(f"\nResultados guardados en: {OUTPUT_FILE}")
+            print(f"{nombre:<15} {s['total']:>8} {s['exitosos']:>8} {s['fallidos']:>8} "
+                  f"{'N/A':>10} {'N/A':>10} {'N/A':>10}{atraso}")
+
+    nuevas = sum(s['conexiones_nuevas'] for s in stats.values())
+    reusadas = sum(s['conexiones_reusadas'] for s in stats.values())
+    print(f"\n{ContadorConexiones(nuevas, reusadas).resumen()}")
+
+    if RAW_RESULTS and crudos_locales:
+        print(f"\nResultados guardados en: {BINARY_FILE}"
+              + (f" y {OUTPUT_FILE}" if RESULTS_EXPORT_CSV else ""))
+    elif RAW_RESULTS:
+        print(f"\nResultados por request: en cada agente ({ruta_parte(BINARY_FILE, 'N')}); "
+              f"exportarlos allí con resultados_binarios.py")
+    print(f"Distribución de latencias: {HISTOGRAM_FILE} | por ventana: {WINDOWS_FILE} | "
+          f"desglose: {BREAKDOWN_FILE} | por clase: {CLASSES_FILE}")
     print(f"{'#'*70}\n")
 
 
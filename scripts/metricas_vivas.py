@@ -0,0 +1,129 @@
+"""
+Métricas del cliente en vivo hacia el dashboard.
+
+Cada proceso generador junta los resultados de cada intervalo (por defecto 1s)
+en un histograma y, al cerrarse el intervalo, manda un datagrama UDP con el
+total, los errores, la fase activa y las cuentas del histograma. UDP no
+frena al event loop ni a la prueba si el dashboard no está escuchando; el
+dashboard suma los histogramas de todos los procesos y agentes del mismo
+intervalo y calcula rps y p50/p95/p99.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import sys
+import time
+from urllib.parse import urlparse
+
+# Agregar el directorio padre al path para importar config
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from config import SERVER_URL
+except ImportError:
+    SERVER_URL = "http://localhost:5000"
+
+try:
+    from config import (LIVE_METRICS, LIVE_METRICS_HOST, LIVE_METRICS_PORT,
+                        LIVE_METRICS_INTERVAL)
+except ImportError:
+    LIVE_METRICS = True
+    LIVE_METRICS_HOST = None
+    LIVE_METRICS_PORT = 5002
+    LIVE_METRICS_INTERVAL = 1.0
+
+try:
+    from config import HISTOGRAM_PRECISION
+except ImportError:
+    HISTOGRAM_PRECISION = 2
+
+from histograma import Histograma
+
+
+def destino_metricas():
+    """(ip, puerto) del dashboard: LIVE_METRICS_HOST o el host de SERVER_URL"""
+    host = LIVE_METRICS_HOST or urlparse(SERVER_URL).hostname or 'localhost'
+    # Resolver una sola vez: sendto() con un nombre resolvería en cada envío
+    return socket.gethostbyname(host), LIVE_METRICS_PORT
+
+
+class PublicadorMetricas:
+    """Agrega los resultados por intervalo y los publica por UDP"""
+
+    def __init__(self, fase, destino=None, intervalo=LIVE_METRICS_INTERVAL,
+                 digitos=HISTOGRAM_PRECISION):
+        self.fase = fase
+        self.destino = destino or destino_metricas()
+        self.intervalo = intervalo
+        self.digitos = digitos
+        self.origen = f"{socket.gethostname()}:{os.getpid()}"
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.tarea = None
+        self._reiniciar(time.time())
+
+    def _reiniciar(self, ahora):
+        # Intervalos alineados al reloj: el dashboard junta los de todos los procesos
+        self.inicio = ahora - ahora % self.intervalo
+        self.total = 0
+        self.errores = 0
+        self.latencia = Histograma(self.digitos)
+
+    def registrar(self, r):
+        self.total += 1
+        if r['success']:
+            self.latencia.registrar(r['response_time'])
+        else:
+            self.errores += 1
+
+    def publicar(self):
+        ahora = time.time()
+        datos = {
+            'origen': self.origen,
+            'fase': self.fase,
+            'inicio': self.inicio,
+            'intervalo': self.intervalo,
+            'total': self.total,
+            'errores': self.errores,
+            'latencia': self.latencia.a_dict(),
+        }
+        try:
+            self.sock.sendto(json.dumps(datos, separators=(',', ':')).encode(), self.destino)
+        except OSError:
+            # Sin dashboard (o datagrama muy grande): la prueba sigue igual
+            pass
+        self._reiniciar(ahora)
+
+    async def _bucle(self):
+        while True:
+            await asyncio.sleep(self.inicio + self.intervalo - time.time())
+            self.publicar()
+
+    def iniciar(self):
+        self.tarea = asyncio.get_running_loop().create_task(self._bucle())
+        return self
+
+    async def detener(self):
+        """Publica el intervalo en curso y libera el socket"""
+        if self.tarea is not None:
+            self.tarea.cancel()
+            try:
+                await self.tarea
+            except asyncio.CancelledError:
+                pass
+        if self.total:
+            self.publicar()
+        self.sock.close()
+
+
+def crear_publicador(fase):
+    """PublicadorMetricas en marcha para la fase, o None si está desactivado"""
+    if not LIVE_METRICS:
+        return None
+    try:
+        return PublicadorMetricas(fase).iniciar()
+    except OSError as e:
+        print(f"Métricas en vivo desactivadas: {e}")
+        return None
@@ -0,0 +1,118 @@
+"""
+Mezclas ponderadas de endpoints para las fases de carga.
+
+Una fase de RAMPUP_PHASES puede llevar "mezcla": una lista de clases de
+request con su peso, endpoint y parámetros. Cada parámetro es un valor fijo
+o una distribución:
+
+    {"dist": "fija", "valor": 512}
+    {"dist": "uniforme", "min": 5, "max": 20}
+    {"dist": "lognormal", "mediana": 256, "sigma": 1.0, "min": 1, "max": 4096}
+
+Elegir la clase de cada request usa una tabla de alias (Vose): O(1) por
+muestra sin importar cuántas clases tenga la mezcla. Sin "mezcla", la fase
+es una sola clase "stress" con sus cpu / ram / red fijos, como siempre.
+"""
+
+import math
+import random
+
+
+class TablaAlias:
+    """Muestreo O(1) de una distribución discreta (método de alias de Vose)"""
+
+    def __init__(self, pesos):
+        n = len(pesos)
+        total = sum(pesos)
+        if n == 0 or total <= 0 or any(p < 0 for p in pesos):
+            raise ValueError("la mezcla necesita pesos no negativos con suma > 0")
+
+        self.n = n
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        escalados = [p * n / total for p in pesos]
+        chicos = [i for i, p in enumerate(escalados) if p < 1.0]
+        grandes = [i for i, p in enumerate(escalados) if p >= 1.0]
+
+        # Cada casilla se completa con lo que le sobra a una clase "grande"
+        while chicos and grandes:
+            chico = chicos.pop()
+            grande = grandes.pop()
+            self.prob[chico] = escalados[chico]
+            self.alias[chico] = grande
+            escalados[grande] -= 1.0 - escalados[chico]
+            (chicos if escalados[grande] < 1.0 else grandes).append(grande)
+        # Lo que queda es 1.0 salvo error de redondeo
+
+    def muestrear(self, rng=random):
+        i = int(rng.random() * self.n)
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+
+def crear_muestreador(spec):
+    """Función rng -> valor para un parámetro (valor fijo o dict con 'dist')"""
+    if not isinstance(spec, dict):
+        return lambda rng: spec
+
+    dist = spec.get('dist', 'fija')
+    if dist == 'fija':
+        valor = spec['valor']
+        return lambda rng: valor
+
+    if dist == 'uniforme':
+        minimo, maximo = spec['min'], spec['max']
+        if isinstance(minimo, int) and isinstance(maximo, int):
+            return lambda rng: rng.randint(minimo, maximo)
+        return lambda rng: rng.uniform(minimo, maximo)
+
+    if dist == 'lognormal':
+        mu = math.log(spec['mediana'])
+        sigma = spec['sigma']
+        minimo = spec.get('min', 0)
+        maximo = spec.get('max', math.inf)
+        entero = isinstance(spec['mediana'], int)
+
+        def lognormal(rng):
+            valor = min(max(rng.lognormvariate(mu, sigma), minimo), maximo)
+            return int(round(valor)) if entero else valor
+        return lognormal
+
+    raise ValueError(f"distribución desconocida: {dist} (fija | uniforme | lognormal)")
+
+
+class Mezcla:
+    """Clases de request con peso; elegir() retorna (clase, endpoint, params)"""
+
+    def __init__(self, entradas, semilla=None):
+        if not entradas:
+            raise ValueError("mezcla vacía")
+        self.clases = []
+        for entrada in entradas:
+            if 'endpoint' not in entrada:
+                raise ValueError(f"entrada de mezcla sin endpoint: {entrada}")
+            nombre = entrada.get('nombre') or entrada['endpoint'].strip('/').replace('/', '_') or 'raiz'
+            params = {clave: crear_muestreador(spec) for clave, spec in entrada.get('params', {}).items()}
+            self.clases.append((nombre, entrada['endpoint'], params))
+        self.pesos = [entrada.get('peso', 1) for entrada in entradas]
+        self.tabla = TablaAlias(self.pesos)
+        self.rng = random.Random(semilla)
+
+    @classmethod
+    def desde_fase(cls, fase, endpoint='/stress'):
+        """La mezcla de la fase, o `endpoint` con cpu / ram / red fijos si no tiene"""
+        if fase.get('mezcla'):
+            return cls(fase['mezcla'], fase.get('semilla'))
+        return cls([{
+            'nombre': 'stress', 'endpoint': endpoint,
+            'params': {'cpu_iterations': fase['cpu'], 'memory_mb': fase['ram'],
+                       'response_kb': fase['red']},
+        }], fase.get('semilla'))
+
+    def elegir(self):
+        nombre, endpoint, params = self.clases[self.tabla.muestrear(self.rng)]
+        return nombre, endpoint, {clave: muestrear(self.rng) for clave, muestrear in params.items()}
+
+    def descripcion(self):
+        total = sum(self.pesos)
+        return " | ".join(f"{nombre} {endpoint} {peso / total * 100:.0f}%"
+                          for (nombre, endpoint, _), peso in zip(self.clases, self.pesos))
@@ -0,0 +1,153 @@
+"""
+Generador de carga repartido en varios procesos.
+
+Con un solo event loop el cliente satura su propio núcleo antes que el
+servidor (500 usuarios con respuestas de 1MB). Aquí cada proceso hijo corre
+su parte de los usuarios con su propio event loop (el mismo en todas las
+órdenes) y su propio pool de conexiones; el proceso padre reparte el
+trabajo, sincroniza el inicio de cada fase y junta los resultados.
+
+Uso:
+    with GeneradoresCarga(4) as generadores:
+        resultados = generadores.ejecutar(funcion_async, [args_p0, args_p1, ...])
+
+`funcion_async` debe ser una función de nivel de módulo (se envía por pickle).
+"""
+
+import asyncio
+import multiprocessing
+import queue
+import signal
+import time
+
+# Margen (s) para que todos los procesos reciban la orden antes del inicio común
+MARGEN_INICIO = 0.5
+
+
+def repartir(total, partes):
+    """Reparte `total` en `partes` enteros que difieren a lo sumo en 1"""
+    base, resto = divmod(total, partes)
+    return [base + (1 if i < resto else 0) for i in range(partes)]
+
+
+def _bucle_proceso(indice, ordenes, resultados):
+    """Cuerpo de cada proceso generador: ejecuta órdenes hasta recibir None"""
+    # Ctrl+C lo maneja el padre, que termina a los hijos
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Un solo event loop por proceso: lo que se cree en una orden (p.ej. la
+    # sesión HTTP compartida y sus conexiones keep-alive) sirve para las siguientes
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    resultados.put((indice, 'listo', None))
+
+    try:
+        while True:
+            orden = ordenes.get()
+            if orden is None:
+                return
+            funcion, args, inicio = orden
+
+            # Inicio sincronizado: todos arrancan en el mismo instante de reloj
+            espera = inicio - time.time()
+            if espera > 0:
+                time.sleep(espera)
+
+            try:
+                resultados.put((indice, 'ok', loop.run_until_complete(funcion(*args))))
+            except Exception as e:
+                resultados.put((indice, 'error', repr(e)))
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+class GeneradoresCarga:
+    """Procesos generadores persistentes (se reutilizan entre fases)"""
+
+    def __init__(self, procesos):
+        self.procesos = procesos
+        # spawn: funciona igual en Linux y Windows y no hereda el estado de asyncio
+        self.contexto = multiprocessing.get_context('spawn')
+        self.ordenes = []
+        self.resultados = None
+        self.hijos = []
+        self.cerrado = False
+        # Segundos entre la orden y el inicio común de cada ejecución
+        self.margen = MARGEN_INICIO
+        # Los .bin de cada proceso quedan en este host (se pueden exportar aquí)
+        self.crudos_locales = True
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def iniciar(self):
+        """Lanza los procesos y espera a que todos terminen de importar"""
+        self.resultados = self.contexto.Queue()
+        for indice in range(self.procesos):
+            ordenes = self.contexto.Queue()
+            hijo = self.contexto.Process(
+                target=_bucle_proceso, args=(indice, ordenes, self.resultados),
+                name=f"generador-{indice}", daemon=True
+            )
+            hijo.start()
+            self.ordenes.append(ordenes)
+            self.hijos.append(hijo)
+
+        for _ in range(self.procesos):
+            self._recibir()
+
+    def _recibir(self):
+        """Siguiente mensaje de los hijos; falla si alguno murió o se cerró el pool"""
+        while True:
+            if self.cerrado:
+                raise RuntimeError("generadores cerrados")
+            try:
+                return self.resultados.get(timeout=1.0)
+            except queue.Empty:
+                muertos = [h.name for h in self.hijos if not h.is_alive()]
+                if muertos:
+                    raise RuntimeError(f"procesos generadores terminados: {', '.join(muertos)}")
+
+    def ejecutar(self, funcion, args_por_proceso):
+        """
+        Ejecuta funcion(*args) en cada proceso (uno por elemento de
+        args_por_proceso) con inicio sincronizado.
+
+        Retorna: lista de resultados en el orden de args_por_proceso
+        """
+        if len(args_por_proceso) > self.procesos:
+            raise ValueError("más partes que procesos generadores")
+
+        inicio = time.time() + self.margen
+        for ordenes, args in zip(self.ordenes, args_por_proceso):
+            ordenes.put((funcion, args, inicio))
+
+        # Recibir TODAS las respuestas antes de fallar: si quedaran en la cola,
+        # la próxima ejecución las tomaría como propias
+        resultados = [None] * len(args_por_proceso)
+        errores = []
+        for _ in args_por_proceso:
+            indice, estado, valor = self._recibir()
+            if estado == 'error':
+                errores.append(f"generador {indice}: {valor}")
+            else:
+                resultados[indice] = valor
+        if errores:
+            raise RuntimeError("; ".join(errores))
+        return resultados
+
+    def cerrar(self):
+        self.cerrado = True
+        for ordenes in self.ordenes:
+            ordenes.put(None)
+        for hijo in self.hijos:
+            hijo.join(timeout=2)
+            if hijo.is_alive():
+                hijo.terminate()
+                hijo.join()
+        self.hijos = []
+        self.ordenes = []
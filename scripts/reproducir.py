@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Reproducción de una prueba de carga grabada.
+
+Lee los resultados de una prueba anterior (el .bin de load_test_gradual.py o
+load_test.py con sus partes .pN.bin, o el CSV exportado) o un log de requests
+con timestamp, y vuelve a mandar los mismos requests en los mismos instantes
+relativos, con un factor de escala de tiempo (2.0 = el doble de rápido).
+
+- Cada fila se lee cuando hace falta (nunca el archivo entero en memoria).
+  El log se escribe al COMPLETAR cada request: el envío es
+  timestamp - response_time, y un buffer de REPLAY_REORDER_WINDOW segundos
+  vuelve a ordenar las filas por instante de envío. Las partes de cada
+  proceso generador se intercalan con heapq.merge.
+- El request sale de la columna 'ruta' (o 'url', de la que solo se usa la
+  ruta: el host es SERVER_URL). Sin esa columna (resultados anteriores) se
+  usan cpu / ram / red de la fase en RAMPUP_PHASES; las filas que no se
+  pueden reconstruir (sin ruta ni fase conocida) se omiten y se cuentan.
+- Los requests salen en modo abierto con inicio_previsto (como
+  ejecutar_fase_abierta): si el reproductor se atrasa, el atraso queda en
+  send_lag y en la latencia, y se reporta como deriva de la reproducción.
+
+Un log propio necesita 'timestamp' (ISO o segundos epoch) y 'ruta' o 'url';
+'fase', 'clase' y 'response_time' son opcionales. Sin 'response_time' el
+timestamp es el instante de envío y las filas deben venir en orden.
+
+Uso:
+    python reproducir.py <resultados.bin | resultados.csv | log.csv> [escala]
+"""
+
+import asyncio
+import csv
+import heapq
+import math
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from operator import itemgetter
+from urllib.parse import parse_qsl, urlsplit
+
+# Agregar el directorio padre al path para importar config
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from config import REPLAY_SPEED, REPLAY_REORDER_WINDOW
+except ImportError:
+    REPLAY_SPEED = 1.0
+    REPLAY_REORDER_WINDOW = 310
+
+from histograma import Histograma, RegistroResultados
+from conexiones import (FASES_RED, cerrar_sesion_compartida, descripcion_pool,
+                        resumen_desglose, sesion_compartida)
+from metricas_vivas import crear_publicador
+from resultados_binarios import (EscritorResultados, archivos_partes, borrar_archivos,
+                                 exportar_csv, leer_registros)
+from load_test_gradual import (ENDPOINT, ESQUEMA, HISTOGRAM_PRECISION, HISTOGRAM_WINDOW_SECONDS,
+                               INTERVALO_PROGRESO, RAMPUP_PHASES, RAW_RESULTS, RESULTS_EXPORT_CSV,
+                               SERVER_URL, hacer_request)
+
+OUTPUT_FILE = "replay_results.csv"
+BINARY_FILE = "replay_results.bin"
+
+# Fase de las filas sin columna 'fase' (load_test.py, logs propios)
+FASE_SIN_NOMBRE = "replay"
+
+
+def abrir_traza(ruta):
+    """Un generador de filas por archivo: el .bin y sus partes, o el CSV"""
+    if ruta.endswith('.bin'):
+        archivos = archivos_partes(ruta)
+        if not archivos:
+            raise FileNotFoundError(ruta)
+        return [leer_registros(archivo) for archivo in archivos]
+    if not os.path.exists(ruta):
+        raise FileNotFoundError(ruta)
+    return [leer_csv(ruta)]
+
+
+def leer_csv(ruta):
+    with open(ruta, newline='') as f:
+        yield from csv.DictReader(f)
+
+
+def instante(valor):
+    """Timestamp ISO (UTC, como datetime.utcnow().isoformat()) o segundos epoch"""
+    try:
+        return float(valor)
+    except ValueError:
+        return datetime.fromisoformat(valor).replace(tzinfo=timezone.utc).timestamp()
+
+
+def exito(valor):
+    if isinstance(valor, bool):
+        return valor
+    return str(valor).strip().lower() in ('true', '1')
+
+
+def resolver_peticion(fila, fases):
+    """(fase, (clase, endpoint, params)) de la fila, o None si no se puede reconstruir"""
+    fase = fila.get('fase') or FASE_SIN_NOMBRE
+    ruta = fila.get('ruta') or fila.get('url')
+    if ruta:
+        partes = urlsplit(ruta)
+        endpoint = partes.path or '/'
+        params = dict(parse_qsl(partes.query))
+    else:
+        # Resultados grabados antes de la columna 'ruta': parámetros fijos de la fase
+        config_fase = fases.get(fase)
+        if config_fase is None or config_fase.get('mezcla'):
+            return None
+        endpoint = ENDPOINT
+        params = {'cpu_iterations': config_fase['cpu'], 'memory_mb': config_fase['ram'],
+                  'response_kb': config_fase['red']}
+    clase = fila.get('clase') or endpoint.strip('/').replace('/', '_') or 'raiz'
+    return fase, (clase, endpoint, params)
+
+
+def ordenar_por_envio(filas, ventana, cuentas, fases):
+    """
+    Genera (envio, n, fase, peticion, response_time, exito) en orden de envío.
+
+    Una fila completada en `fin` salió en fin - response_time, y ninguna fila
+    posterior del mismo archivo salió antes de fin - ventana: hasta ahí el
+    heap ya está en orden y se puede soltar. En memoria quedan solo las
+    filas de los últimos `ventana` segundos.
+    """
+    pendientes = []
+    for n, fila in enumerate(filas):
+        cuentas['leidas'] += 1
+        try:
+            fin = instante(fila['timestamp'])
+            peticion = resolver_peticion(fila, fases)
+        except (KeyError, ValueError):
+            peticion = None
+        if peticion is None:
+            cuentas['omitidas'] += 1
+            continue
+
+        fase, peticion = peticion
+        if fila.get('response_time') not in (None, ''):
+            response_time = float(fila['response_time'])
+            limite = fin - ventana
+        else:
+            # Log sin duración: el timestamp ya es el envío
+            response_time = None
+            limite = fin
+        heapq.heappush(pendientes, (fin - (response_time or 0.0), n, fase, peticion,
+                                    response_time, exito(fila.get('success', True))))
+
+        while pendientes and pendientes[0][0] <= limite:
+            yield heapq.heappop(pendientes)
+
+    while pendientes:
+        yield heapq.heappop(pendientes)
+
+
+async def reproducir(ruta, escala=REPLAY_SPEED):
+    """Reproduce la traza y retorna {fase: RegistroResultados}"""
+    if escala <= 0:
+        raise ValueError("la escala de tiempo debe ser > 0")
+
+    fases = {fase['nombre']: fase for fase in RAMPUP_PHASES}
+    cuentas = {'leidas': 0, 'omitidas': 0, 'desordenadas': 0}
+    # Las partes de cada proceso generador, intercaladas por instante de envío
+    flujo = heapq.merge(*(ordenar_por_envio(filas, REPLAY_REORDER_WINDOW, cuentas, fases)
+                          for filas in abrir_traza(ruta)), key=itemgetter(0))
+
+    escritor = None
+    if RAW_RESULTS:
+        borrar_archivos(BINARY_FILE)
+        escritor = EscritorResultados(BINARY_FILE, ESQUEMA)
+
+    registros = {}
+    originales = {}
+    session, contador = await sesion_compartida()
+    antes = contador.copia()
+    vivo = crear_publicador(FASE_SIN_NOMBRE)
+    en_vuelo = set()
+
+    def al_completar(tarea):
+        en_vuelo.discard(tarea)
+        r = tarea.result()
+        registros[r['fase']].agregar(r)
+
+    inicio = None
+    traza_inicio = None
+    ultimo_envio = -math.inf
+    ultimo_previsto = ultimo_real = 0.0
+    ultimo_progreso = 0.0
+    enviados = 0
+
+    try:
+        for envio, _, fase, peticion, response_time, ok in flujo:
+            if inicio is None:
+                inicio = ultimo_progreso = time.perf_counter()
+                traza_inicio = envio
+            if envio < ultimo_envio:
+                # La ventana de reordenamiento no alcanzó: sale de inmediato
+                cuentas['desordenadas'] += 1
+            ultimo_envio = max(ultimo_envio, envio)
+
+            if fase not in registros:
+                registro = registros[fase] = RegistroResultados(
+                    HISTOGRAM_PRECISION, HISTOGRAM_WINDOW_SECONDS, escritor, desglose=FASES_RED)
+                registro.vivo = vivo
+                originales[fase] = Histograma(HISTOGRAM_PRECISION)
+            if ok and response_time is not None:
+                originales[fase].registrar(response_time)
+
+            previsto = inicio + (envio - traza_inicio) / escala
+            espera = previsto - time.perf_counter()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            ultimo_previsto = previsto
+            ultimo_real = time.perf_counter()
+
+            tarea = asyncio.create_task(hacer_request(
+                session, fase, enviados, peticion, inicio_previsto=previsto
+            ))
+            en_vuelo.add(tarea)
+            tarea.add_done_callback(al_completar)
+            enviados += 1
+
+            ahora = time.perf_counter()
+            if ahora - ultimo_progreso >= INTERVALO_PROGRESO:
+                ultimo_progreso = ahora
+                completados = sum(r.total for r in registros.values())
+                print(f"  [{ahora - inicio:6.1f}s] Traza: {(envio - traza_inicio):6.1f}s | "
+                      f"Enviados: {enviados:6d} | Completados: {completados:6d} | "
+                      f"En vuelo: {len(en_vuelo):4d} | Atraso: {max(0.0, ahora - previsto):.3f}s")
+
+        # Esperar a los que siguen en vuelo
+        if en_vuelo:
+            await asyncio.gather(*list(en_vuelo))
+    finally:
+        if vivo is not None:
+            await vivo.detener()
+        for registro in registros.values():
+            registro.vivo = None
+            registro.sumidero = None
+        if escritor is not None:
+            escritor.cerrar()
+        conexiones = contador.diferencia(antes)
+        await cerrar_sesion_compartida()
+
+    if inicio is not None:
+        imprimir_deriva(registros, originales, cuentas, escala,
+                        (ultimo_envio - traza_inicio) / escala,
+                        ultimo_real - inicio, ultimo_real - ultimo_previsto)
+        print(f"\n  {conexiones.resumen()}")
+    else:
+        print(f"\n  La traza no tiene requests reproducibles "
+              f"({cuentas['leidas']} filas leídas, {cuentas['omitidas']} omitidas)")
+    return registros
+
+
+def imprimir_deriva(registros, originales, cuentas, escala, prevista, real, atraso_final):
+    """Qué tan fiel fue la reproducción al calendario de la traza, y latencias original vs ahora"""
+    atraso = Histograma(HISTOGRAM_PRECISION)
+    for registro in registros.values():
+        atraso.fusionar(registro.atraso)
+
+    print(f"\n  Deriva de la reproducción (escala {escala:g}x):")
+    print(f"    Filas leídas: {cuentas['leidas']} | omitidas: {cuentas['omitidas']} | "
+          f"fuera de orden: {cuentas['desordenadas']}")
+    print(f"    Duración prevista: {prevista:.1f}s | real: {real:.1f}s | "
+          f"deriva final: {atraso_final:+.3f}s")
+    if atraso.total:
+        p = atraso.percentiles((50, 99))
+        print(f"    Atraso de envío (send_lag): p50 {p[50]:.3f}s | p99 {p[99]:.3f}s | "
+              f"max {atraso.valor_max:.3f}s")
+
+    print(f"\n  {'Fase':<15} {'Total':>8} {'OK':>8} {'P50 orig':>10} {'P50 ahora':>10} "
+          f"{'P99 orig':>10} {'P99 ahora':>10}")
+    print(f"  {'-'*15} {'-'*8} {'-'*8} {'-'*10} {'-'*10} {'-'*10} {'-'*10}")
+    for fase, registro in registros.items():
+        original = originales[fase]
+        celdas = []
+        for p in (50, 99):
+            celdas.append(f"{original.percentil(p):>9.3f}s" if original.total else f"{'N/A':>10}")
+            celdas.append(f"{registro.latencia.percentil(p):>9.3f}s" if registro.exitosos else f"{'N/A':>10}")
+        print(f"  {fase:<15} {registro.total:>8} {registro.exitosos:>8} " + " ".join(celdas))
+
+    total = [r for r in registros.values() if r.exitosos]
+    if total:
+        combinado = RegistroResultados(HISTOGRAM_PRECISION, desglose=FASES_RED)
+        for registro in total:
+            combinado.fusionar(registro)
+        print(f"\n    Desglose p50/p99: {resumen_desglose(combinado.desglose)}")
+
+
+async def ejecutar_reproduccion(ruta, escala=REPLAY_SPEED):
+    print(f"\n{'#'*70}")
+    print(f"#  REPRODUCCIÓN DE UNA PRUEBA GRABADA")
+    print(f"{'#'*70}")
+    print(f"\nTraza: {ruta}")
+    print(f"Servidor: {SERVER_URL}")
+    print(f"Escala de tiempo: {escala:g}x | ventana de reordenamiento: {REPLAY_REORDER_WINDOW}s")
+    print(descripcion_pool())
+
+    await reproducir(ruta, escala)
+
+    if RAW_RESULTS:
+        print(f"\nResultados guardados en: {BINARY_FILE}", end="")
+        if RESULTS_EXPORT_CSV:
+            filas = exportar_csv(archivos_partes(BINARY_FILE), OUTPUT_FILE)
+            print(f" y {OUTPUT_FILE} ({filas} filas)", end="")
+        print()
+    print(f"{'#'*70}\n")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Uso: python reproducir.py <resultados.bin | resultados.csv | log.csv> [escala]")
+        sys.exit(1)
+
+    try:
+        escala = float(sys.argv[2]) if len(sys.argv) > 2 else REPLAY_SPEED
+        asyncio.run(ejecutar_reproduccion(sys.argv[1], escala))
+    except KeyboardInterrupt:
+        print("\n\nReproducción cancelada\n")
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Resultados por request en formato binario compacto, escritos fuera del event loop.
+
+Formatear CSV y escribir a disco en el mismo loop que lanza los requests lo
+frena justo cuando más carga tiene que generar. Aquí:
+
+- EscritorResultados junta filas en lotes y los pasa por una cola acotada a
+  un hilo que los empaqueta (struct) y los escribe de a un bloque. Si el
+  disco no da abasto y la cola se llena, el lote se descarta (y se cuenta)
+  en vez de frenar al event loop, que atrasaría los envíos.
+- El archivo .bin es: MAGIA, cabecera JSON con el esquema, y lotes de
+  [uint32 cantidad][uint32 textos][tabla de textos][registros de ancho fijo].
+  Los números van en el registro; cada texto (ruta, fase, status...) va una
+  sola vez por lote en la tabla, como [uint32 largo][UTF-8], y el registro
+  guarda su índice. Así nada se recorta y los textos repetidos no pesan.
+- exportar_csv() lo convierte al CSV de siempre (lo usa graficar.py).
+
+Uso directo:
+    python resultados_binarios.py load_test_gradual_results.bin [salida.csv]
+"""
+
+import csv
+import json
+import os
+import queue
+import struct
+import sys
+import threading
+
+MAGIA = b'PRBIN2\n'
+# Formato anterior: textos de ancho fijo dentro del registro, sin tabla
+MAGIA_V1 = b'PRBIN1\n'
+LARGO = struct.Struct('<I')
+
+# Filas por lote y lotes que pueden esperar en la cola antes de descartar filas
+TAM_LOTE = 2048
+MAX_LOTES = 32
+
+
+class Esquema:
+    """
+    Campos (nombre, formato struct) de un registro.
+
+    Un campo de texto usa el formato 's' (sin ancho): en el registro va un
+    uint32 con su índice en la tabla de textos del lote. Los formatos de ancho
+    fijo ('26s') solo aparecen al leer archivos PRBIN1.
+    """
+
+    def __init__(self, campos):
+        self.campos = [(nombre, formato) for nombre, formato in campos]
+        self.nombres = [nombre for nombre, _ in self.campos]
+        # Posiciones de los campos que van en la tabla de textos
+        self._textos = [i for i, (_, formato) in enumerate(self.campos) if formato == 's']
+        self.struct = struct.Struct('<' + ''.join(
+            'I' if formato == 's' else formato for _, formato in self.campos
+        ))
+        self._convertir = [(nombre, self._conversor(formato)) for nombre, formato in self.campos]
+
+    @staticmethod
+    def _conversor(formato):
+        if formato.endswith('s'):
+            return lambda v: str(v).encode('utf-8')
+        if formato == '?':
+            return bool
+        if formato in ('d', 'f'):
+            return lambda v: float(v or 0)
+        return lambda v: int(v or 0)
+
+    def empaquetar_lote(self, filas):
+        """Filas -> bytes del lote: cantidad, tabla de textos y registros"""
+        indices = {}
+        textos = []
+        registros = []
+        for fila in filas:
+            valores = [convertir(fila.get(nombre, 0)) for nombre, convertir in self._convertir]
+            for i in self._textos:
+                indice = indices.get(valores[i])
+                if indice is None:
+                    indice = indices[valores[i]] = len(textos)
+                    textos.append(valores[i])
+                valores[i] = indice
+            registros.append(self.struct.pack(*valores))
+
+        tabla = b''.join(LARGO.pack(len(texto)) + texto for texto in textos)
+        return LARGO.pack(len(filas)) + LARGO.pack(len(textos)) + tabla + b''.join(registros)
+
+    def a_fila(self, valores, textos=()):
+        fila = {}
+        for (nombre, formato), valor in zip(self.campos, valores):
+            if formato == 's':
+                valor = textos[valor]
+            elif formato.endswith('s'):
+                # PRBIN1: un recorte puede partir un carácter multibyte al final
+                valor = valor.rstrip(b'\0').decode('utf-8', errors='ignore')
+            fila[nombre] = valor
+        return fila
+
+    def cabecera(self):
+        return json.dumps({'campos': self.campos}).encode()
+
+    @classmethod
+    def desde_cabecera(cls, datos):
+        return cls([tuple(campo) for campo in json.loads(datos)['campos']])
+
+
+class EscritorResultados:
+    """Sumidero de filas: acumula lotes y un hilo los escribe al archivo"""
+
+    def __init__(self, ruta, esquema, tam_lote=TAM_LOTE, max_lotes=MAX_LOTES):
+        self.ruta = ruta
+        self.esquema = esquema
+        self.tam_lote = tam_lote
+        self.cola = queue.Queue(maxsize=max_lotes)
+        self.pendientes = []
+        self.escritos = 0
+        # Filas perdidas porque el hilo escritor llevaba max_lotes lotes de atraso
+        self.descartadas = 0
+        self.error = None
+        self.hilo = threading.Thread(target=self._escribir, name="escritor-resultados", daemon=True)
+        self.hilo.start()
+
+    def escribir(self, fila):
+        """Agrega una fila (barato: solo un append salvo al completar un lote)"""
+        self.pendientes.append(fila)
+        if len(self.pendientes) >= self.tam_lote:
+            # Nunca bloquear al event loop: bloquearlo atrasaría los envíos del
+            # modo abierto. Si el hilo lleva MAX_LOTES lotes de atraso, descartar
+            try:
+                self.cola.put_nowait(self.pendientes)
+            except queue.Full:
+                self.descartadas += len(self.pendientes)
+            self.pendientes = []
+
+    def cerrar(self):
+        """Escribe lo pendiente y espera al hilo"""
+        if self.pendientes:
+            self.cola.put(self.pendientes)
+            self.pendientes = []
+        self.cola.put(None)
+        self.hilo.join()
+        if self.error is not None:
+            raise self.error
+        if self.descartadas:
+            print(f"  ADVERTENCIA: {self.descartadas} filas descartadas de {self.ruta} "
+                  f"(el disco no daba abasto); los histogramas las incluyen")
+
+    def _escribir(self):
+        try:
+            # Modo append: varias fases (o corridas del mismo proceso) en un archivo
+            with open(self.ruta, 'ab') as f:
+                if f.tell() == 0:
+                    cabecera = self.esquema.cabecera()
+                    f.write(MAGIA + LARGO.pack(len(cabecera)) + cabecera)
+                while True:
+                    lote = self.cola.get()
+                    if lote is None:
+                        return
+                    f.write(self.esquema.empaquetar_lote(lote))
+                    self.escritos += len(lote)
+        except Exception as e:
+            self.error = e
+            # Seguir vaciando la cola para no bloquear al productor
+            while self.cola.get() is not None:
+                pass
+
+
+def _abrir(f, ruta):
+    """Lee MAGIA y cabecera. Retorna: (esquema, con_tabla)"""
+    magia = f.read(len(MAGIA))
+    if magia not in (MAGIA, MAGIA_V1):
+        raise ValueError(f"{ruta}: no es un archivo de resultados binario")
+    (largo,) = LARGO.unpack(f.read(LARGO.size))
+    return Esquema.desde_cabecera(f.read(largo)), magia == MAGIA
+
+
+def _leer_largo(f):
+    (valor,) = LARGO.unpack(f.read(LARGO.size))
+    return valor
+
+
+def leer_registros(ruta):
+    """Genera las filas (dict) de un archivo .bin, lote por lote"""
+    with open(ruta, 'rb') as f:
+        esquema, con_tabla = _abrir(f, ruta)
+
+        while True:
+            dato = f.read(LARGO.size)
+            if len(dato) < LARGO.size:
+                return
+            (cantidad,) = LARGO.unpack(dato)
+            textos = []
+            if con_tabla:
+                textos = [f.read(_leer_largo(f)).decode('utf-8')
+                          for _ in range(_leer_largo(f))]
+            bloque = f.read(cantidad * esquema.struct.size)
+            for valores in esquema.struct.iter_unpack(bloque):
+                yield esquema.a_fila(valores, textos)
+
+
+def leer_esquema(ruta):
+    with open(ruta, 'rb') as f:
+        return _abrir(f, ruta)[0]
+
+
+def ruta_parte(ruta, parte):
+    """Archivo de un proceso generador: resultados.bin -> resultados.p2.bin"""
+    if parte is None:
+        return ruta
+    base, extension = os.path.splitext(ruta)
+    return f"{base}.p{parte}{extension}"
+
+
+def archivos_partes(ruta):
+    """El archivo principal y los de cada proceso generador que existan"""
+    base, extension = os.path.splitext(ruta)
+    directorio = os.path.dirname(ruta) or '.'
+    prefijo = os.path.basename(base) + '.p'
+    partes = sorted(
+        os.path.join(os.path.dirname(ruta), nombre) for nombre in os.listdir(directorio)
+        if nombre.startswith(prefijo) and nombre.endswith(extension)
+        and nombre[len(prefijo):-len(extension)].isdigit()
+    )
+    return ([ruta] if os.path.exists(ruta) else []) + partes
+
+
+def borrar_archivos(ruta):
+    for archivo in archivos_partes(ruta):
+        os.remove(archivo)
+
+
+def exportar_csv(rutas, ruta_csv):
+    """Convierte uno o varios .bin (mismo esquema) al CSV original. Retorna las filas escritas"""
+    if isinstance(rutas, str):
+        rutas = [rutas]
+    filas = 0
+    with open(ruta_csv, 'w', newline='') as f:
+        writer = None
+        for ruta in rutas:
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=leer_esquema(ruta).nombres)
+                writer.writeheader()
+            for fila in leer_registros(ruta):
+                writer.writerow(fila)
+                filas += 1
+    return filas
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Uso: python resultados_binarios.py <resultados.bin> [salida.csv]")
+        sys.exit(1)
+
+    entrada = sys.argv[1]
+    salida = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(entrada)[0] + '.csv'
+    total = exportar_csv(archivos_partes(entrada), salida)
+    print(f"{total} filas exportadas a {salida}")
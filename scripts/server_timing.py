@@ -0,0 +1,36 @@
+"""
+Lectura del header Server-Timing que envían /cpu y /stress.
+Permite dividir la latencia del servidor en tiempo en cola y tiempo de servicio.
+"""
+
+# Etapas que cuentan como espera (cola del event loop + threadpool/pool de procesos)
+ETAPAS_COLA = ('queue', 'pool')
+# Etapas que cuentan como trabajo real ('total' es la suma, no una etapa)
+ETAPAS_SERVICIO = ('cpu', 'mem', 'payload', 'compress')
+
+
+def parsear_server_timing(header):
+    """Convierte 'queue;dur=1.2, cpu;dur=3.4' en {'queue': 0.0012, 'cpu': 0.0034} (segundos)"""
+    etapas = {}
+    if not header:
+        return etapas
+
+    for metrica in header.split(','):
+        partes = metrica.strip().split(';')
+        nombre = partes[0].strip()
+        for parametro in partes[1:]:
+            clave, _, valor = parametro.strip().partition('=')
+            if clave == 'dur':
+                try:
+                    etapas[nombre] = float(valor) / 1000
+                except ValueError:
+                    pass
+    return etapas
+
+
+def dividir_latencia(headers):
+    """Retorna (tiempo_cola, tiempo_servicio) en segundos a partir de los headers"""
+    etapas = parsear_server_timing(headers.get('Server-Timing', ''))
+    cola = sum(etapas.get(e, 0) for e in ETAPAS_COLA)
+    servicio = sum(etapas.get(e, 0) for e in ETAPAS_SERVICIO)
+    return cola, servicio
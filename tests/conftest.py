@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Los módulos de api/ y scripts/ se importan por nombre (como en main.py)
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'api'))
+sys.path.insert(0, os.path.join(RAIZ, 'scripts'))
+sys.path.insert(0, RAIZ)
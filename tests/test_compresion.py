@@ -0,0 +1,22 @@
+from compresion import negociar_codificacion
+
+
+def test_q_values_por_parametro():
+    assert negociar_codificacion('gzip;q=0.5;x=1') == 'gzip'
+    assert negociar_codificacion('gzip;x=1;q=0') == 'identity'
+    assert negociar_codificacion('deflate;q=0.8, gzip;q=0.3') == 'deflate'
+
+
+def test_comodin_no_anula_un_rechazo_explicito():
+    assert negociar_codificacion('gzip;q=0, *') == 'deflate'
+
+
+def test_comodin_solo_para_codificaciones_no_nombradas():
+    assert negociar_codificacion('*;q=0.5, gzip;q=0.2') == 'deflate'
+
+
+def test_sin_header_o_todo_rechazado():
+    assert negociar_codificacion('') == 'identity'
+    assert negociar_codificacion(None) == 'identity'
+    assert negociar_codificacion('*;q=0') == 'identity'
+    assert negociar_codificacion('*') == 'gzip'
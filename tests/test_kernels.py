@@ -0,0 +1,54 @@
+import pytest
+
+from kernels import BUFFER_KERNEL, BYTES_POR_ITERACION, ejecutar_kernel, kernel_por_pasos, np
+
+
+def ejecutar_por_pasos(nombre, iteraciones, coseno=False, muestreo=0, paso=2000):
+    """Consume el generador como el modo cooperativo"""
+    pasos = kernel_por_pasos(nombre, iteraciones, coseno, muestreo, paso)
+    while True:
+        try:
+            next(pasos)
+        except StopIteration as fin:
+            return fin.value
+
+
+# Más de 1 MiB de bytes para que el buffer del kernel dé la vuelta
+ITERACIONES_BYTES = len(BUFFER_KERNEL) // BYTES_POR_ITERACION + 12345
+
+
+@pytest.mark.parametrize('nombre', ['hashlib', 'zlib'])
+def test_kernels_de_bytes_iguales_en_todos_los_modos(nombre):
+    # thread, process y blocking llaman a ejecutar_kernel; cooperative va por pasos
+    directo, _, _ = ejecutar_kernel(nombre, ITERACIONES_BYTES)
+    por_pasos, _ = ejecutar_por_pasos(nombre, ITERACIONES_BYTES)
+    assert por_pasos == directo
+
+
+def test_kernel_python_igual_en_todos_los_modos():
+    directo, muestras, _ = ejecutar_kernel('python', 50001, True, 1000)
+    por_pasos, muestras_pasos = ejecutar_por_pasos('python', 50001, True, 1000)
+    assert por_pasos == directo
+    assert muestras_pasos == muestras
+
+
+@pytest.mark.skipif(np is None, reason="NumPy no instalado")
+def test_kernel_numpy_igual_en_todos_los_modos():
+    directo, muestras, _ = ejecutar_kernel('numpy', 150001, True, 1000)
+    por_pasos, muestras_pasos = ejecutar_por_pasos('numpy', 150001, True, 1000)
+    assert por_pasos == directo
+    assert np.array_equal(muestras_pasos, muestras)
+
+
+
+def test_resultado_en_cache_vale_para_cualquier_modo():
+    from cache import CacheLRU, clave_carga
+
+    cache = CacheLRU(max_entradas=4, ttl=60)
+    clave = clave_carga('hashlib', ITERACIONES_BYTES, False, 0)
+
+    # Lo guarda un request cooperativo y lo lee uno en modo thread
+    por_pasos, _ = ejecutar_por_pasos('hashlib', ITERACIONES_BYTES)
+    cache.guardar(clave, (por_pasos, 0, 0))
+    directo, _, _ = ejecutar_kernel('hashlib', ITERACIONES_BYTES)
+    assert cache.obtener(clave) == (directo, 0, 0)
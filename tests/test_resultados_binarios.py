@@ -0,0 +1,46 @@
+from resultados_binarios import EscritorResultados, Esquema, exportar_csv, leer_registros
+
+ESQUEMA = Esquema([
+    ('timestamp', 's'),
+    ('fase', 's'),
+    ('ruta', 's'),
+    ('user_id', 'q'),
+    ('response_time', 'd'),
+    ('success', '?'),
+    ('error', 's'),
+])
+
+
+def test_ruta_mas_larga_que_el_ancho_anterior_se_conserva(tmp_path):
+    # El formato PRBIN1 guardaba la ruta en 256 bytes y la dejaba vacía si no entraba
+    ruta = "/stress?" + "&".join(f"param_{i}=ñ{i:04d}" for i in range(40))
+    assert len(ruta.encode()) > 256
+
+    archivo = str(tmp_path / "resultados.bin")
+    escritor = EscritorResultados(archivo, ESQUEMA, tam_lote=3)
+    filas = [
+        {'timestamp': f"2026-01-01T00:00:0{i}", 'fase': 'Baseline',
+         'ruta': ruta if i % 2 else '/stress', 'user_id': i,
+         'response_time': i / 10, 'success': True, 'error': ''}
+        for i in range(7)
+    ]
+    for fila in filas:
+        escritor.escribir(fila)
+    escritor.cerrar()
+
+    assert escritor.descartadas == 0
+    assert list(leer_registros(archivo)) == filas
+
+
+def test_exportar_csv_con_textos_de_la_tabla(tmp_path):
+    archivo = str(tmp_path / "resultados.bin")
+    escritor = EscritorResultados(archivo, ESQUEMA)
+    escritor.escribir({'timestamp': 't0', 'fase': 'Pico', 'ruta': '/cpu', 'user_id': 1,
+                       'response_time': 0.5, 'success': False, 'error': 'HTTP 503'})
+    escritor.cerrar()
+
+    csv_salida = tmp_path / "resultados.csv"
+    assert exportar_csv(archivo, str(csv_salida)) == 1
+    lineas = csv_salida.read_text().splitlines()
+    assert lineas[0] == 'timestamp,fase,ruta,user_id,response_time,success,error'
+    assert lineas[1] == 't0,Pico,/cpu,1,0.5,False,HTTP 503'